@@ -0,0 +1,308 @@
+"""
+Dashboard Aggregates
+Incrementally maintained file totals plus ring-buffer time series of transfers,
+so the analytics dashboard never rescans the upload folder
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from file_catalog import CatalogListener
+
+SERIES_DB = 'data/dashboard_series.json'
+
+# Dashboard file type buckets
+FILE_TYPE_GROUPS = {}
+for _group, _extensions in {
+    'images': ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg', 'webp'],
+    'documents': ['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'ppt', 'pptx'],
+    'videos': ['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm'],
+    'archives': ['zip', 'rar', '7z', 'tar', 'gz', 'bz2'],
+}.items():
+    for _ext in _extensions:
+        FILE_TYPE_GROUPS[_ext] = _group
+
+
+def file_type_group(filename):
+    """Dashboard bucket for a file name"""
+    ext = filename.lower().split('.')[-1] if '.' in filename else ''
+    return FILE_TYPE_GROUPS.get(ext, 'other')
+
+
+class RingSeries:
+    """Fixed number of time buckets; old buckets are overwritten in place"""
+
+    FIELDS = ('uploads', 'downloads', 'bytes_in', 'bytes_out', 'timed_bytes', 'timed_ms')
+
+    def __init__(self, resolution, slots):
+        self.resolution = resolution
+        self.slots = slots
+        self.starts = [0] * slots
+        self.values = [[0] * len(self.FIELDS) for _ in range(slots)]
+
+    def _bucket(self, ts):
+        start = int(ts // self.resolution) * self.resolution
+        i = (start // self.resolution) % self.slots
+        if self.starts[i] != start:
+            self.starts[i] = start
+            self.values[i] = [0] * len(self.FIELDS)
+        return self.values[i]
+
+    def add(self, ts, **amounts):
+        """Add amounts (by field name) to the bucket containing ts"""
+        bucket = self._bucket(ts)
+        for name, amount in amounts.items():
+            bucket[self.FIELDS.index(name)] += amount
+
+    def window(self, end_ts, count):
+        """The last count buckets up to end_ts as (start, values) pairs, oldest first"""
+        last = int(end_ts // self.resolution) * self.resolution
+        result = []
+        for n in range(count - 1, -1, -1):
+            start = last - n * self.resolution
+            i = (start // self.resolution) % self.slots
+            values = self.values[i] if self.starts[i] == start else [0] * len(self.FIELDS)
+            result.append((start, values))
+        return result
+
+    def to_dict(self):
+        return {'resolution': self.resolution, 'starts': self.starts, 'values': self.values}
+
+    def load(self, data):
+        """Restore buckets saved by to_dict (ignored if the layout changed)"""
+        if data.get('resolution') != self.resolution or len(data.get('starts', [])) != self.slots:
+            return
+        self.starts = data['starts']
+        self.values = data['values']
+
+
+def mbps(timed_bytes, timed_ms):
+    """Average throughput in Mbps from bytes moved over measured milliseconds"""
+    if timed_ms <= 0:
+        return 0
+    return (timed_bytes * 8) / (timed_ms / 1000) / 1000000
+
+
+def _sum_windows(windows):
+    """Add up aligned RingSeries.window results bucket by bucket"""
+    result = []
+    for buckets in zip(*windows):
+        result.append((buckets[0][0], [sum(values) for values in zip(*(v for _, v in buckets))]))
+    return result
+
+
+class DashboardAggregates(CatalogListener):
+    def __init__(self, series_file=SERIES_DB, flush_interval=60, peer_files=()):
+        self.lock = threading.RLock()
+        self.series_file = series_file
+        self.peer_files = list(peer_files)  # Other workers' series, merged into queries
+        self.file_count = 0
+        self.total_size = 0
+        self.type_counts = dict.fromkeys(['images', 'documents', 'videos', 'archives', 'other'], 0)
+        self.by_mtime = []  # sorted (mtime, filename) for the recent activity feed
+        self.minute = RingSeries(60, 24 * 60)       # 24 hours of minutes
+        self.hour = RingSeries(3600, 35 * 24)       # 5 weeks of hours
+        self.users = defaultdict(lambda: dict.fromkeys(RingSeries.FIELDS[:4], 0))
+        self.dirty = False
+        self.load()
+
+        if flush_interval:
+            self.start_flusher(flush_interval)
+            atexit.register(self.save)
+
+    # ---- catalog maintenance ----
+
+    def catalog_reset(self, entries):
+        with self.lock:
+            self.file_count = 0
+            self.total_size = 0
+            self.type_counts = dict.fromkeys(self.type_counts, 0)
+            self.by_mtime = []
+            for filename, entry in entries.items():
+                self._count(filename, entry, 1)
+                self.by_mtime.append((entry['mtime'], filename))
+            self.by_mtime.sort()
+
+    def catalog_added(self, filename, entry):
+        with self.lock:
+            self._count(filename, entry, 1)
+            insort(self.by_mtime, (entry['mtime'], filename))
+
+    def catalog_removed(self, filename, entry):
+        with self.lock:
+            self._count(filename, entry, -1)
+            key = (entry['mtime'], filename)
+            pos = bisect_left(self.by_mtime, key)
+            if pos < len(self.by_mtime) and self.by_mtime[pos] == key:
+                del self.by_mtime[pos]
+
+    def _count(self, filename, entry, sign):
+        self.file_count += sign
+        self.total_size += sign * entry['size']
+        self.type_counts[file_type_group(filename)] += sign
+
+    # ---- transfer recording ----
+
+    def _record(self, username, seconds, size, **amounts):
+        now = time.time()
+        if seconds:
+            amounts['timed_bytes'] = size
+            amounts['timed_ms'] = int(seconds * 1000)
+        with self.lock:
+            self.minute.add(now, **amounts)
+            self.hour.add(now, **amounts)
+            if username:
+                user = self.users[username]
+                for name in user:
+                    user[name] += amounts.get(name, 0)
+            self.dirty = True
+
+    def record_upload(self, username, size, seconds=None):
+        """Record a finished upload (seconds=None when the duration wasn't measured)"""
+        self._record(username, seconds, size, uploads=1, bytes_in=size)
+
+    def record_download(self, username, size, seconds=None, count=1):
+        """Record finished downloads (seconds=None when the duration wasn't measured)"""
+        self._record(username, seconds, size, downloads=count, bytes_out=size)
+
+    # ---- persistence ----
+
+    def load(self):
+        """Restore time series and per-user counters from disk"""
+        try:
+            if os.path.exists(self.series_file):
+                with open(self.series_file, 'r') as f:
+                    data = json.load(f)
+                self.minute.load(data.get('minute', {}))
+                self.hour.load(data.get('hour', {}))
+                for username, counters in data.get('users', {}).items():
+                    self.users[username].update(counters)
+        except (OSError, ValueError) as e:
+            print(f"Error loading dashboard series: {e}")
+
+    def save(self):
+        """Write time series and per-user counters to disk if they changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                'minute': self.minute.to_dict(),
+                'hour': self.hour.to_dict(),
+                'users': dict(self.users)
+            }
+            self.dirty = False
+        temp_file = self.series_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(temp_file, self.series_file)
+
+    def start_flusher(self, interval):
+        """Persist the series in the background every interval seconds"""
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Error saving dashboard series: {e}")
+
+        threading.Thread(target=flush, daemon=True).start()
+
+    # ---- queries ----
+
+    def _peers(self):
+        """Saved series of the other workers (as fresh as their last flush)"""
+        peers = []
+        for path in self.peer_files:
+            try:
+                with open(path, 'r') as f:
+                    peers.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Worker hasn't flushed yet
+        return peers
+
+    def _series(self, name, peers):
+        series = [getattr(self, name)]
+        for data in peers:
+            peer = RingSeries(series[0].resolution, series[0].slots)
+            peer.load(data.get(name, {}))
+            series.append(peer)
+        return series
+
+    def user_counters(self, username):
+        """Upload/download counters for one user"""
+        peers = self._peers()
+        with self.lock:
+            counters = dict(self.users.get(username) or dict.fromkeys(RingSeries.FIELDS[:4], 0))
+        for data in peers:
+            for name, value in data.get('users', {}).get(username, {}).items():
+                counters[name] = counters.get(name, 0) + value
+        return counters
+
+    def recent_files(self, count=10):
+        """(mtime, filename) pairs of the newest files, newest first"""
+        with self.lock:
+            return list(reversed(self.by_mtime[-count:]))
+
+    def summary(self, now=None):
+        """Everything the dashboard charts need, from fixed-size windows"""
+        now = now or time.time()
+        peers = self._peers()
+        with self.lock:
+            hours = _sum_windows([s.window(now, 7 * 24) for s in self._series('hour', peers)])
+            minutes = _sum_windows([s.window(now, 60) for s in self._series('minute', peers)])
+
+            # Daily upload/download trend over the last 7 local days
+            today = datetime.fromtimestamp(now).date()
+            days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+            day_index = {day: i for i, day in enumerate(days)}
+            uploads = [0] * 7
+            downloads = [0] * 7
+            weekday_activity = [0] * 7  # Mon..Sun
+            for start, values in hours:
+                day = datetime.fromtimestamp(start).date()
+                if day in day_index:
+                    uploads[day_index[day]] += values[0]
+                    downloads[day_index[day]] += values[1]
+                    weekday_activity[day.weekday()] += values[0] + values[1]
+
+            # Average speed over the last 24 hours in 4-hour blocks
+            last_day = hours[-24:]
+            speed_labels = []
+            speeds = []
+            for block in range(0, 24, 4):
+                chunk = last_day[block:block + 4]
+                speed_labels.append(datetime.fromtimestamp(chunk[0][0]).strftime('%H:%M'))
+                speeds.append(round(mbps(sum(v[4] for _, v in chunk), sum(v[5] for _, v in chunk)), 1))
+
+            return {
+                'totalFiles': self.file_count,
+                'totalSize': self.total_size,
+                'fileTypes': dict(self.type_counts),
+                'avgSpeed': round(mbps(sum(v[4] for _, v in last_day), sum(v[5] for _, v in last_day)), 1),
+                'uploadTrend': {
+                    'labels': [day.strftime('%b %d') for day in days],
+                    'uploads': uploads,
+                    'downloads': downloads
+                },
+                'transferSpeeds': {
+                    'labels': speed_labels,
+                    'speeds': speeds
+                },
+                'userActivity': {
+                    'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+                    'activity': weekday_activity
+                },
+                'lastHour': {
+                    'labels': [datetime.fromtimestamp(start).strftime('%H:%M') for start, _ in minutes],
+                    'uploads': [v[0] for _, v in minutes],
+                    'downloads': [v[1] for _, v in minutes],
+                    'speeds': [round(mbps(v[4], v[5]), 1) for _, v in minutes]
+                }
+            }
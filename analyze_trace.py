@@ -0,0 +1,155 @@
+"""
+Transfer Trace Analyzer
+Reads a JSONL dump from /api/admin/transfer-trace (or transfer_trace.dump) and
+rebuilds per-transfer throughput timelines, stalls and out-of-order chunks
+
+    python analyze_trace.py logs/transfer_trace_20250101_120000.jsonl --stall 2
+"""
+
+import sys
+import json
+import argparse
+from collections import defaultdict
+
+
+def load_records(path):
+    """Trace records from a JSONL file (torn or blank lines are skipped)"""
+    records = []
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def _stall_cause(chunk, gap):
+    """Best guess at where a gap before this chunk was spent"""
+    if chunk is None:
+        return 'unknown'
+    if chunk.get('io', 0) >= gap / 2:
+        return 'disk'
+    if chunk.get('wait', 0) >= gap / 2:
+        return 'network'
+    return 'client'  # Nothing arrived or was requested (WebSocket client idle or throttled)
+
+
+def analyze_transfer(transfer_id, records, bucket=1.0, stall=2.0):
+    """Timeline, stalls and ordering for one transfer's records"""
+    start = next((r for r in records if r['ev'] == 'start'), None)
+    end = next((r for r in records if r['ev'] == 'end'), None)
+    chunks = sorted((r for r in records if r['ev'] == 'chunk'), key=lambda r: r['t'])
+    info = (start or {}).get('info', {})
+
+    t0 = start['t'] if start else (chunks[0]['t'] if chunks else 0)
+    t1 = end['t'] if end else (chunks[-1]['t'] if chunks else t0)
+    total = sum(r.get('n', 0) for r in chunks)
+    duration = max(t1 - t0, 0)
+
+    # Throughput per bucket, relative to the transfer start
+    buckets = defaultdict(int)
+    for r in chunks:
+        buckets[int((r['t'] - t0) // bucket)] += r.get('n', 0)
+    timeline = [round(buckets.get(i, 0) * 8 / bucket / 1000000, 2)
+                for i in range(int(duration // bucket) + 1)] if chunks else []
+
+    # Gaps with no chunk progress longer than the stall threshold
+    stalls = []
+    previous = t0
+    for r in chunks + ([end] if end else []):
+        gap = r['t'] - previous
+        if gap >= stall:
+            stalls.append({
+                'at': round(previous - t0, 3),
+                'seconds': round(gap, 3),
+                'cause': _stall_cause(r if r['ev'] == 'chunk' else None, gap)
+            })
+        previous = r['t']
+
+    # Arrival order (index order is the order the client sends or requests in)
+    seen = set()
+    highest = -1
+    out_of_order = 0
+    duplicates = 0
+    for r in chunks:
+        index = r.get('i', 0)
+        if index in seen:
+            duplicates += 1
+        elif index < highest:
+            out_of_order += 1
+        seen.add(index)
+        highest = max(highest, index)
+
+    expected = None
+    if start and start.get('n') and info.get('chunk_size'):
+        expected = (start['n'] + info['chunk_size'] - 1) // info['chunk_size']
+
+    io_ms = sorted(r.get('io', 0) * 1000 for r in chunks)
+    return {
+        'id': transfer_id,
+        'transport': info.get('transport'),
+        'direction': info.get('direction'),
+        'filename': info.get('filename'),
+        'status': (end or {}).get('info', {}).get('status', 'incomplete'),
+        'bytes': total,
+        'seconds': round(duration, 3),
+        'avg_mbps': round(total * 8 / duration / 1000000, 2) if duration > 0 else 0,
+        'chunks': len(chunks),
+        'expected_chunks': expected,
+        'missing_chunks': (expected - len(seen)) if expected is not None else None,
+        'out_of_order': out_of_order,
+        'duplicates': duplicates,
+        'io_ms_avg': round(sum(io_ms) / len(io_ms), 2) if io_ms else 0,
+        'io_ms_max': round(io_ms[-1], 2) if io_ms else 0,
+        'wait_s_total': round(sum(r.get('wait', 0) for r in chunks), 3),
+        'finalize_ms': round((end or {}).get('io', 0) * 1000, 2),
+        'stalls': stalls,
+        'timeline_mbps': timeline
+    }
+
+
+def analyze(records, bucket=1.0, stall=2.0):
+    """Analyze every transfer in a trace, in start order"""
+    by_transfer = defaultdict(list)
+    for r in records:
+        if 'id' in r and 'ev' in r:
+            by_transfer[r['id']].append(r)
+    return [analyze_transfer(transfer_id, by_transfer[transfer_id], bucket, stall)
+            for transfer_id in sorted(by_transfer)]
+
+
+def format_report(results):
+    lines = []
+    for r in results:
+        lines.append(f"#{r['id']} {r['transport']} {r['direction']} {r['filename']} [{r['status']}]")
+        lines.append(f"    {r['bytes']} bytes in {r['seconds']}s = {r['avg_mbps']} Mbps, "
+                     f"{r['chunks']} chunks (expected {r['expected_chunks']}, missing {r['missing_chunks']})")
+        lines.append(f"    out of order {r['out_of_order']}, duplicates {r['duplicates']}, "
+                     f"disk io avg {r['io_ms_avg']} ms / max {r['io_ms_max']} ms, "
+                     f"network wait {r['wait_s_total']}s, finalize {r['finalize_ms']} ms")
+        for s in r['stalls']:
+            lines.append(f"    STALL at +{s['at']}s for {s['seconds']}s ({s['cause']})")
+        if r['timeline_mbps']:
+            lines.append(f"    Mbps: {' '.join(str(v) for v in r['timeline_mbps'])}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze a NetShare transfer trace dump')
+    parser.add_argument('trace', help='JSONL trace file')
+    parser.add_argument('--bucket', type=float, default=1.0, help='Timeline bucket in seconds')
+    parser.add_argument('--stall', type=float, default=2.0, help='Gap in seconds reported as a stall')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    results = analyze(load_records(args.trace), args.bucket, args.stall)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results) or 'No transfers in trace')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
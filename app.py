@@ -1,11 +1,10 @@
 import os
 import socket
-import qrcode
 import io
-import base64
 import json
-from flask import Flask, render_template, request, send_file, jsonify, send_from_directory, Response, stream_with_context, session, redirect
+from flask import Flask, render_template, request, send_file, jsonify, send_from_directory, Response, stream_with_context, session, redirect, g
 from werkzeug.utils import secure_filename
+from werkzeug.routing import PathConverter
 from datetime import datetime
 import mimetypes
 import threading
@@ -15,22 +14,51 @@ from functools import wraps
 import gzip
 import shutil
 import zipfile
-from base64 import b64encode, b64decode
+import tarfile
 import subprocess
 import platform
 
 # Import auth system
-from auth_system import auth_system, require_login, require_permission
+from auth_system import auth_system, require_login, require_permission, FILE_METADATA_DB, PERMISSIONS
 
 # Import high-speed transfer module
 from high_speed_transfer import HighSpeedTransfer
 
+# Import file catalog and indexes
+from file_catalog import FileCatalog, SHARED_PATH_PATTERN, is_shared_path, prune_empty_dirs
+from permission_index import PermissionIndex
+from search_index import SearchIndex
+from aggregates import DashboardAggregates
+from thumbnails import ThumbnailCache, DEFAULT_WIDTH
+from text_preview import TextPreview, is_text, MAX_RESPONSE_BYTES
+from batch_delete import BatchDelete, DELETED, NOT_FOUND, INVALID
+from trash import Trash
+from upload_stream import UploadReceiver, clean_relative_path
+from server_address import ServerAddress, get_local_ip
+from network_discovery import NetworkDiscovery
+from text_store import TextStore, SharedTextStore, PAGE_SIZE
+
+# Import persistent stats counters, Prometheus metrics and transfer tracing
+from counters import Counters, STAT_NAMES
+from shared_state import (open_store, SharedDict, SharedCounters, ChangeFeed, CatalogPublisher,
+                          publish_worker, live_workers, release as release_shared_values)
+import metrics
+from transfer_trace import transfer_trace
+from profiler import SamplingProfiler, MemoryTracker
+from config import Config
+
 # Import logging system
-from logger import ApplicationLogger, SecurityLogger, AuditLogger, PerformanceLogger
+from logger import ApplicationLogger, SecurityLogger, AuditLogger, PerformanceLogger, log_pipeline
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # Secret key for sessions
 
+class SharedPathConverter(PathConverter):
+    """A shared file name, or a path into a folder uploaded with its tree (no hidden or parent parts)"""
+    regex = SHARED_PATH_PATTERN
+
+app.url_map.converters['shared'] = SharedPathConverter
+
 # Initialize loggers
 app_logger = ApplicationLogger()
 security_logger = SecurityLogger()
@@ -76,23 +104,193 @@ os.makedirs(TEMP_FOLDER, exist_ok=True)
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Multi-worker mode (serve_workers.py): state every worker must see lives in a shared store
+shared_store = open_store(Config.SHARED_STATE_DB) if Config.WORKERS > 1 else None
+if shared_store:
+    auth_system.use_store(shared_store)
+
+# In-memory catalog of the shared folder (one scan at startup, then kept in sync)
+file_catalog = FileCatalog(UPLOAD_FOLDER)
+
+# Per-user visibility sets and totals follow the catalog and file permissions
+permission_index = PermissionIndex()
+permission_index.load_metadata(auth_system.file_metadata)
+file_catalog.add_listener(permission_index)
+auth_system.add_metadata_listener(permission_index.metadata_changed)
+
+# Filename search index follows the catalog
+search_index = SearchIndex(permission_index)
+file_catalog.add_listener(search_index)
+
+# Dashboard totals and transfer time series (persisted to data/, one series file per worker)
+if shared_store:
+    dashboard_aggregates = DashboardAggregates(
+        series_file=f"data/dashboard_series.{Config.WORKER_ID}.json", flush_interval=10,
+        peer_files=[f"data/dashboard_series.{i}.json" for i in range(Config.WORKERS) if i != Config.WORKER_ID])
+else:
+    dashboard_aggregates = DashboardAggregates()
+file_catalog.add_listener(dashboard_aggregates)
+
+# Grid thumbnails and video posters (rendered on upload, cached in data/thumbnails)
+thumbnail_cache = ThumbnailCache(UPLOAD_FOLDER)
+file_catalog.add_listener(thumbnail_cache)
+
+# Network URL and QR code for the landing page (re-checked every 30 s)
+server_address = ServerAddress(port=5001)
+server_address.start()
+
+# Devices on the LAN, swept in the background once someone asks for them
+network_discovery = NetworkDiscovery(server_address, port=5001)
+
+# Line windows, tails and search for large text files (indexes built on demand)
+text_preview = TextPreview()
+
 # Initialize high-speed transfer system
-high_speed = HighSpeedTransfer(app, UPLOAD_FOLDER)
-
-# Statistics tracking with thread lock
-stats = {
-    'total_uploads': 0,
-    'total_downloads': 0,
-    'total_size': 0,
-    'total_resumed': 0,
-    'total_compressed': 0,
-    'total_versions': 0
-}
-stats_lock = threading.Lock()
-active_transfers = {}  # Track active uploads/downloads with speeds
+high_speed = HighSpeedTransfer(app, UPLOAD_FOLDER, catalog=file_catalog, aggregates=dashboard_aggregates,
+                               perf_logger=performance_logger,
+                               message_queue=Config.SOCKETIO_MESSAGE_QUEUE if shared_store else None,
+                               cleanup=not shared_store, monitor=Config.WORKER_ID == 0)
+
+# Statistics tracking (per-thread counters journaled to data/, or shared between workers)
+stats = SharedCounters(shared_store, STAT_NAMES) if shared_store else Counters()
+
+# Deleted files wait in shared_files/.trash until the purge worker unlinks them (rate-limited)
+trash = Trash(UPLOAD_FOLDER)
+if Config.WORKER_ID == 0:
+    trash.start()
+
+# Deletes, single or bulk: one permission pass, renames into the trash, one metadata save
+batch_delete = BatchDelete(UPLOAD_FOLDER, file_catalog, auth_system, stats, trash=trash)
+
+# Scrape-time gauges for the /metrics endpoint
+metrics.registry.gauge(
+    'netshare_active_transfers', 'WebSocket transfers in progress, by direction',
+    lambda: {('upload',): cluster_transfer_stats()['active_uploads'],
+             ('download',): cluster_transfer_stats()['active_downloads']},
+    ('direction',))
+metrics.registry.gauge('netshare_sessions', 'Logged-in sessions', lambda: len(auth_system.sessions))
+metrics.registry.gauge('netshare_shared_files', 'Files in the shared folder', lambda: len(file_catalog))
+metrics.registry.gauge('netshare_shared_bytes', 'Bytes in the shared folder', file_catalog.total_size)
+metrics.registry.gauge(
+    'netshare_disk_bytes', 'Disk usage of the volume holding the shared folder',
+    lambda: dict(zip([('used',), ('free',), ('total',)], _disk_usage())),
+    ('state',))
+metrics.registry.gauge(
+    'netshare_disk_io_operations', 'WebSocket disk operations running on native threads or waiting for one',
+    lambda: {('running',): high_speed.disk.in_flight, ('waiting',): high_speed.disk.waiting},
+    ('state',))
+metrics.registry.gauge('netshare_log_queue_depth', 'Log records waiting for the writer thread',
+                       lambda: log_pipeline.stats()['queued'])
+metrics.registry.gauge('netshare_log_records_dropped_total', 'Log records shed because the queue was full, by level',
+                       lambda: {(level,): count for level, count in log_pipeline.stats()['dropped'].items()},
+                       ('level',), kind='counter')
+for _name in stats.names:
+    if _name == 'total_size':
+        metrics.registry.gauge('netshare_uploaded_bytes', 'Bytes uploaded over HTTP (reset by clear-all)',
+                               lambda: stats.get('total_size'))
+    else:
+        metrics.registry.gauge(f"netshare_{_name[len('total_'):]}_total", f"Persistent {_name.replace('_', ' ')} counter",
+                               lambda _name=_name: stats.get(_name), kind='counter')
+
+
+def _disk_usage():
+    usage = shutil.disk_usage(UPLOAD_FOLDER)
+    return usage.used, usage.free, usage.total
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    bytes_in = request.content_length or 0
+    bytes_out = response.content_length or 0  # None for streamed downloads
+    metrics.transfer_bytes.inc(bytes_in, ('http', 'in'))
+    metrics.transfer_bytes.inc(bytes_out, ('http', 'out'))
+    if start is None:
+        return response
+    
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    metrics.request_latency.observe(elapsed, (request.method, route, str(response.status_code)))
+    performance_logger.record_request(
+        route, request.method, elapsed * 1000, response.status_code,
+        bytes_in=bytes_in, bytes_out=bytes_out)
+    return response
+
+active_transfers = {}  # Track active uploads/downloads with speeds (this worker's)
 
 # File version tracking
-file_versions = {}  # {filename: [version1, version2, ...]}
+file_versions = SharedDict(shared_store, 'file_versions') if shared_store else {}  # {filename: [version1, ...]}
+
+
+def _publish_heartbeat(interval=2):
+    """Share this worker's in-flight transfers, which stay in process memory"""
+    while True:
+        try:
+            publish_worker(shared_store, Config.WORKER_ID, {
+                'ws_stats': high_speed.get_stats(),
+                'ws_transfers': high_speed.get_active_transfers(),
+                'http_transfers': list(active_transfers.values())
+            })
+        except Exception as e:
+            print(f"Error publishing worker heartbeat: {e}")
+        time.sleep(interval)
+
+
+def cluster_transfer_stats():
+    """WebSocket transfer counts across all workers"""
+    if not shared_store:
+        return high_speed.get_stats()
+    totals = dict.fromkeys(('active_uploads', 'active_downloads', 'total_active'), 0)
+    for info in live_workers(shared_store).values():
+        for name in totals:
+            totals[name] += info['ws_stats'].get(name, 0)
+    return totals
+
+
+def cluster_active_transfers():
+    """Detailed WebSocket transfers across all workers"""
+    if not shared_store:
+        return high_speed.get_active_transfers()
+    return [t for info in live_workers(shared_store).values() for t in info['ws_transfers']]
+
+
+def cluster_http_transfers():
+    """HTTP transfers in progress across all workers"""
+    if not shared_store:
+        return list(active_transfers.values())
+    return [t for info in live_workers(shared_store).values() for t in info['http_transfers']]
+
+
+if shared_store:
+    # Apply other workers' file and metadata changes to this worker's catalog and indexes
+    shared_feed = ChangeFeed(shared_store)
+    shared_feed.on('files', lambda name: file_catalog.scan() if name == '*' else file_catalog.refresh(name))
+    shared_feed.on('file_metadata', lambda name: auth_system._notify_metadata(
+        name, auth_system.file_metadata.get(name)))
+    file_catalog.add_listener(CatalogPublisher(shared_store, shared_feed))
+    shared_feed.start()
+
+    high_speed.transfers_view = cluster_active_transfers
+    threading.Thread(target=_publish_heartbeat, name='worker-heartbeat', daemon=True).start()
+
+
+@app.teardown_request
+def release_shared_state(exc):
+    release_shared_values()
+
+# On-demand profiling for the admin API (watched structures are looked up when measured)
+sampling_profiler = SamplingProfiler()
+memory_tracker = MemoryTracker({
+    'active_transfers': lambda: active_transfers,
+    'high_speed.active_transfers': lambda: high_speed.active_transfers,
+    'shared_texts': lambda: shared_texts.texts,
+    'file_versions': lambda: file_versions
+})
 
 # Authentication decorator
 def require_auth(f):
@@ -141,33 +339,6 @@ def limit_bandwidth(f):
         return response
     return decorated
 
-def get_local_ip():
-    """Get the local IP address of the machine"""
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except Exception:
-        return "127.0.0.1"
-
-def generate_qr_code(url):
-    """Generate QR code for the URL"""
-    qr = qrcode.QRCode(version=1, box_size=10, border=5)
-    qr.add_data(url)
-    qr.make(fit=True)
-    
-    # Create the QR code image
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    # Convert to base64
-    buf = io.BytesIO()
-    img.save(buf)
-    buf.seek(0)
-    img_base64 = base64.b64encode(buf.getvalue()).decode()
-    return f"data:image/png;base64,{img_base64}"
-
 def get_file_info(filename):
     """Get file information"""
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -184,26 +355,26 @@ def get_file_info(filename):
 @require_login
 def index():
     """Main page - requires authentication"""
-    local_ip = get_local_ip()
-    port = 5001
-    url = f"http://{local_ip}:{port}"
-    qr_code = generate_qr_code(url)
-    
-    # Get statistics
-    total_files = len([f for f in os.listdir(app.config['UPLOAD_FOLDER']) 
-                       if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], f))])
-    total_size = sum(os.path.getsize(os.path.join(app.config['UPLOAD_FOLDER'], f)) 
-                     for f in os.listdir(app.config['UPLOAD_FOLDER']) 
-                     if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], f)))
+    local_ip, url, _, qr_etag = server_address.snapshot()
+    total_files, total_size = permission_index.totals(None)  # Running totals, no walk over the catalog
     
     return render_template('index.html', 
                          local_ip=local_ip, 
-                         port=port, 
-                         qr_code=qr_code,
+                         port=server_address.port, 
+                         qr_code=f"/qr.png?v={qr_etag}",
                          url=url,
                          total_files=total_files,
                          total_size=total_size,
-                         stats=stats)
+                         stats=stats.snapshot())
+
+@app.route('/qr.png')
+def qr_code_png():
+    """QR code of the server URL; ?v= changes with the address, so it can be cached"""
+    _, _, png, etag = server_address.snapshot()
+    response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable' if 'v' in request.args else 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/login')
 def login_page():
@@ -354,7 +525,7 @@ def admin_dashboard():
                     })
         
         # Get transfer statistics
-        transfer_stats = high_speed.get_stats() if high_speed else {'active_uploads': 0, 'active_downloads': 0}
+        transfer_stats = cluster_transfer_stats() if high_speed else {'active_uploads': 0, 'active_downloads': 0}
         
         # Get recent activity (last 10 activities from file metadata)
         recent_activity = []
@@ -381,7 +552,9 @@ def admin_dashboard():
             'users': [{
                 'username': user['username'],
                 'role': user['role'],
-                'file_count': len([f for f in files_list if f['owner'] == user['username']]),
+                'file_count': permission_index.owned_count(user['username']),
+                'uploads': dashboard_aggregates.user_counters(user['username'])['uploads'],
+                'downloads': dashboard_aggregates.user_counters(user['username'])['downloads'],
                 'last_active': 'Recently'
             } for user in users],
             'files': files_list,
@@ -390,6 +563,89 @@ def admin_dashboard():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/admin/performance', methods=['GET', 'PUT', 'DELETE'])
+@require_permission('delete_any')
+def admin_performance():
+    """Per-route latency percentiles; PUT changes sampling, DELETE clears the window"""
+    if request.method == 'PUT':
+        data = request.get_json(silent=True) or {}
+        try:
+            if 'sample_rate' in data:
+                performance_logger.sample_rate = min(max(float(data['sample_rate']), 0.0), 1.0)
+            if 'slow_ms' in data:
+                performance_logger.slow_ms = max(float(data['slow_ms']), 0.0)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid sampling settings'}), 400
+    elif request.method == 'DELETE':
+        performance_logger.reset()
+        high_speed.loop_lag.reset()
+    
+    return jsonify({
+        'sample_rate': performance_logger.sample_rate,
+        'slow_ms': performance_logger.slow_ms,
+        'routes': performance_logger.summary(),
+        'logging': log_pipeline.stats(),
+        'event_loop': high_speed.loop_lag.stats(),
+        'disk_io': high_speed.disk.stats(),
+        'thumbnails': thumbnail_cache.stats(),
+        'text_preview': text_preview.stats(),
+        'trash': trash.stats()
+    })
+
+@app.route('/api/admin/transfer-trace', methods=['GET', 'POST'])
+@require_permission('delete_any')
+def admin_transfer_trace():
+    """Per-chunk transfer trace: GET downloads the ring buffer as JSONL, POST dumps it to logs/"""
+    if request.method == 'POST':
+        path = transfer_trace.dump()
+        return jsonify({'success': True, 'path': path, 'records': len(transfer_trace)})
+    
+    response = Response(transfer_trace.lines(), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=transfer_trace.jsonl'
+    return response
+
+@app.route('/api/admin/profile', methods=['GET', 'POST'])
+@require_permission('delete_any')
+def admin_profile():
+    """Sampling profiler: POST starts a run, GET returns the result (collapsed stacks with ?format=collapsed)"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            seconds = float(data.get('seconds', 10))
+            interval = float(data.get('interval', 0.005))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid seconds or interval'}), 400
+        if not sampling_profiler.start(seconds, interval):
+            return jsonify({'error': 'A profile is already running', **sampling_profiler.status()}), 409
+        return jsonify({'success': True, **sampling_profiler.status()}), 202
+    
+    status = sampling_profiler.status()
+    if status['running']:
+        return jsonify(status), 202
+    if request.args.get('format') == 'collapsed':
+        return Response(sampling_profiler.collapsed(), mimetype='text/plain')
+    return jsonify({**status, 'top': sampling_profiler.top_functions()})
+
+@app.route('/api/admin/profile/memory', methods=['GET', 'POST', 'DELETE'])
+@require_permission('delete_any')
+def admin_profile_memory():
+    """tracemalloc: POST takes a baseline, GET diffs against it, DELETE stops tracing"""
+    try:
+        limit = min(max(int(request.args.get('limit', 25)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    
+    if request.method == 'POST':
+        memory_tracker.start()
+    elif request.method == 'DELETE':
+        memory_tracker.stop()
+        return jsonify({'success': True})
+    
+    return jsonify({
+        'watched': memory_tracker.watched_sizes(),
+        'diff': memory_tracker.diff(limit)
+    })
+
 @app.route('/api/admin/users/<username>', methods=['DELETE'])
 @require_permission('delete_any')
 def admin_delete_user(username):
@@ -402,18 +658,17 @@ def admin_delete_user(username):
         return jsonify({'success': True})
     return jsonify({'error': 'User not found'}), 404
 
-@app.route('/api/admin/files/<filename>', methods=['DELETE'])
+@app.route('/api/admin/files/<shared:filename>', methods=['DELETE'])
 @require_permission('delete_any')
 def admin_delete_file(filename):
     """Delete a file (admin only)"""
     try:
-        filepath = os.path.join(UPLOAD_FOLDER, secure_filename(filename))
-        if os.path.exists(filepath):
-            os.remove(filepath)
-            # Remove metadata
-            auth_system.delete_file_metadata(filename)
+        result = batch_delete.delete([filename], request.current_user['username'])[filename]
+        if result == DELETED:
             return jsonify({'success': True})
-        return jsonify({'error': 'File not found'}), 404
+        if result in (NOT_FOUND, INVALID):
+            return jsonify({'error': 'File not found'}), 404
+        return jsonify({'error': 'The file could not be deleted'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -483,19 +738,28 @@ def save_settings():
 
 # ==================== TEXT SHARING ENDPOINTS ====================
 
-# In-memory storage for shared texts (you can replace with database)
-shared_texts_storage = []
-text_id_counter = 0
+# Shared texts (logged to data/, or in the shared store when running several workers)
+if shared_store:
+    shared_texts = SharedTextStore(shared_store, SharedDict(shared_store, 'shared_texts'))
+else:
+    shared_texts = TextStore()
+
+
+def text_for_client(entry):
+    """Copy of a text with the username field the frontend expects"""
+    text_copy = entry.copy()
+    text_copy['username'] = entry.get('author', 'Anonymous')
+    return text_copy
 
 @app.route('/api/share-text', methods=['POST'])
 def share_text():
     """Share a text snippet"""
-    global text_id_counter
     data = request.get_json()
     text = data.get('text', '').strip()
     
-    if not text:
-        return jsonify({'error': 'Text cannot be empty'}), 400
+    error = shared_texts.check(text)
+    if error:
+        return jsonify({'error': error}), 413 if text else 400
     
     # Get user info if authenticated
     author = 'Anonymous'
@@ -505,19 +769,8 @@ def share_text():
         if user_session:
             author = user_session.get('username', 'Anonymous')
     
-    text_id_counter += 1
-    text_entry = {
-        'id': str(text_id_counter),
-        'text': text,
-        'author': author,
-        'timestamp': datetime.now().isoformat()
-    }
-    
-    shared_texts_storage.insert(0, text_entry)  # Add to beginning
-    
-    # Keep only last 100 texts
-    if len(shared_texts_storage) > 100:
-        shared_texts_storage.pop()
+    text_entry = shared_texts.add(text, author)
+    high_speed.socketio.emit('shared_text', {'action': 'added', 'text': text_for_client(text_entry)})
     
     return jsonify({
         'success': True,
@@ -527,49 +780,54 @@ def share_text():
 
 @app.route('/api/shared-texts', methods=['GET'])
 def get_shared_texts():
-    """Get all shared texts"""
-    # Transform texts to include username field for frontend compatibility
-    texts = []
-    for text in shared_texts_storage:
-        text_copy = text.copy()
-        text_copy['username'] = text.get('author', 'Anonymous')
-        texts.append(text_copy)
-    return jsonify({'texts': texts})
+    """Shared texts newest first; ?before= cursor and ?limit= page, ?author= or ?mine=1 filter"""
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = min(max(int(request.args.get('limit', PAGE_SIZE)), 1), shared_texts.limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    author = request.args.get('author')
+    if request.args.get('mine'):
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        user_session = auth_system.validate_session(token)
+        author = user_session['username'] if user_session else 'Anonymous'
+    
+    texts, next_cursor = shared_texts.page(before, limit, author)
+    return jsonify({'texts': [text_for_client(text) for text in texts], 'next_cursor': next_cursor})
 
 @app.route('/api/shared-texts/<text_id>', methods=['DELETE'])
 def delete_shared_text(text_id):
     """Delete a shared text"""
-    global shared_texts_storage
-    
-    # Find and remove the text
-    for i, text in enumerate(shared_texts_storage):
-        if text['id'] == text_id:
-            # Check if user is author or admin
-            author = text['author']
-            token = request.headers.get('Authorization', '').replace('Bearer ', '')
-            can_delete = False
-            
-            if token:
-                user_session = auth_system.validate_session(token)
-                if user_session:
-                    username = user_session.get('username')
-                    is_admin = auth_system.has_permission(username, 'delete_any')
-                    can_delete = username == author or is_admin
-            else:
-                # Allow deletion if author is Anonymous
-                can_delete = author == 'Anonymous'
-            
-            if not can_delete:
-                return jsonify({'error': 'Permission denied'}), 403
-            
-            shared_texts_storage.pop(i)
-            return jsonify({'success': True, 'message': 'Text deleted successfully'})
-    
+    text = shared_texts.get(text_id)
+    if text:
+        # Check if user is author or admin
+        author = text['author']
+        token = request.headers.get('Authorization', '').replace('Bearer ', '')
+        can_delete = False
+        
+        if token:
+            user_session = auth_system.validate_session(token)
+            if user_session:
+                username = user_session.get('username')
+                is_admin = auth_system.has_permission(username, 'delete_any')
+                can_delete = username == author or is_admin
+        else:
+            # Allow deletion if author is Anonymous
+            can_delete = author == 'Anonymous'
+        
+        if not can_delete:
+            return jsonify({'error': 'Permission denied'}), 403
+        
+        shared_texts.delete(text_id)
+        high_speed.socketio.emit('shared_text', {'action': 'deleted', 'id': text_id})
+        return jsonify({'success': True, 'message': 'Text deleted successfully'})
+
     return jsonify({'error': 'Text not found'}), 404
 
 # ==================== FILE PERMISSION ENDPOINTS ====================
 
-@app.route('/api/files/<filename>/permissions', methods=['GET'])
+@app.route('/api/files/<shared:filename>/permissions', methods=['GET'])
 @require_login
 def get_file_permissions(filename):
     """Get file permissions"""
@@ -583,7 +841,7 @@ def get_file_permissions(filename):
         'owner': metadata.get('owner')
     })
 
-@app.route('/api/files/<filename>/permissions', methods=['PUT'])
+@app.route('/api/files/<shared:filename>/permissions', methods=['PUT'])
 @require_login
 def update_file_permissions(filename):
     """Update file permissions (owner only)"""
@@ -607,7 +865,7 @@ def update_file_permissions(filename):
 
 # ==================== DELETE REQUEST ENDPOINTS ====================
 
-@app.route('/api/files/<filename>/delete-request', methods=['POST'])
+@app.route('/api/files/<shared:filename>/delete-request', methods=['POST'])
 @require_login
 def request_file_deletion(filename):
     """Request file deletion"""
@@ -624,28 +882,69 @@ def request_file_deletion(filename):
 @app.route('/api/delete-requests', methods=['GET'])
 @require_permission('approve_delete')
 def get_delete_requests():
-    """Get all delete requests (admin only)"""
+    """Delete requests newest first (admin only); ?status= filter, ?before= cursor, ?limit="""
     status = request.args.get('status', None)
-    requests = auth_system.get_delete_requests(status)
-    return jsonify({'requests': requests})
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    requests, next_cursor = auth_system.get_delete_requests(status, before, limit)
+    return jsonify({'requests': requests, 'next_cursor': next_cursor,
+                    'counts': auth_system.delete_requests.counts()})
+
+def remove_requested_file(filename):
+    """Move a file to the trash for an approved request; True if it is gone"""
+    if not is_shared_path(filename):
+        return False
+    moved = trash.move_many(app.config['UPLOAD_FOLDER'], [(filename, auth_system.get_file_metadata(filename))],
+                            request_username())
+    if filename not in moved:
+        return True  # Already gone
+    if moved[filename] is None:
+        return False
+    file_catalog.remove(filename)
+    stats.add('total_size', -moved[filename]['size'])
+    return True
+
+def resolve_delete_requests(approve_ids, reject_ids, approver, reason=''):
+    """Approve and reject requests in bulk; metadata of removed files is saved once"""
+    approved = auth_system.approve_delete_requests(approve_ids, approver, remove_requested_file)
+    auth_system.delete_files_metadata(sorted(set(approved.values())))
+    rejected = auth_system.reject_delete_requests(reject_ids, approver, reason)
+    return approved, rejected
+
+@app.route('/api/delete-requests/batch', methods=['POST'])
+@require_permission('approve_delete')
+def batch_resolve_delete_requests():
+    """Approve and/or reject many requests at once (admin only)"""
+    data = request.get_json() or {}
+    approve_ids = data.get('approve', [])
+    reject_ids = data.get('reject', [])
+    if not isinstance(approve_ids, list) or not isinstance(reject_ids, list):
+        return jsonify({'error': 'approve and reject must be lists of request ids'}), 400
+    
+    approved, rejected = resolve_delete_requests(approve_ids, reject_ids, request.current_user['username'],
+                                                 data.get('reason', ''))
+    return jsonify({
+        'success': True,
+        'approved': approved,
+        'rejected': rejected,
+        'not_pending': [rid for rid in approve_ids + reject_ids if rid not in approved and rid not in rejected]
+    })
 
 @app.route('/api/delete-requests/<request_id>/approve', methods=['POST'])
 @require_permission('approve_delete')
 def approve_delete_request(request_id):
     """Approve delete request (admin only)"""
-    success = auth_system.approve_delete_request(request_id, request.current_user['username'])
-    if success:
-        # Get the request details and delete the file
-        requests = auth_system.get_delete_requests()
-        if request_id in requests:
-            filename = requests[request_id]['filename']
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                auth_system.delete_file_metadata(filename)
+    approved, _ = resolve_delete_requests([request_id], [], request.current_user['username'])
+    if approved:
         return jsonify({'success': True})
-    else:
-        return jsonify({'error': 'Request not found'}), 404
+    pending = auth_system.delete_requests.get(request_id)
+    if pending and pending['status'] == 'pending':
+        return jsonify({'error': 'The file could not be deleted'}), 500
+    return jsonify({'error': 'Request not found'}), 404
 
 @app.route('/api/delete-requests/<request_id>/reject', methods=['POST'])
 @require_permission('approve_delete')
@@ -660,20 +959,104 @@ def reject_delete_request(request_id):
     else:
         return jsonify({'error': 'Request not found'}), 404
 
+# ==================== TRASH ENDPOINTS ====================
+
+def can_manage_trash_entry(entry, username):
+    """Admins, the file's owner and whoever deleted it may restore or purge it"""
+    return auth_system.has_permission(username, 'delete_any') or username in (entry['owner'], entry['deleted_by'])
+
+@app.route('/api/trash', methods=['GET'])
+@require_login
+def list_trash():
+    """Deleted files newest first (admins see all, users what they owned or deleted); ?before= cursor, ?limit="""
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    username = request.current_user['username']
+    scope = None if auth_system.has_permission(username, 'delete_any') else username
+    entries, next_cursor = trash.list(scope, before, limit)
+    for entry in entries:
+        del entry['metadata']  # Permissions and allowed users stay private
+    return jsonify({'files': entries, 'next_cursor': next_cursor})
+
+@app.route('/api/trash/<trash_id>/restore', methods=['POST'])
+@require_login
+def restore_from_trash(trash_id):
+    """Put a deleted file back, optionally under a new name ({"filename": ...})"""
+    entry = trash.get(trash_id)
+    if not entry:
+        return jsonify({'error': 'Not in the trash'}), 404
+    if not can_manage_trash_entry(entry, request.current_user['username']):
+        return jsonify({'error': 'Permission denied'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    filename = clean_relative_path(data['filename']) if data.get('filename') else entry['filename']
+    if not filename:
+        return jsonify({'error': 'Invalid filename'}), 400
+    try:
+        entry = trash.restore(trash_id, app.config['UPLOAD_FOLDER'], filename)
+    except FileExistsError:
+        return jsonify({'error': f'{filename} already exists; restore it under another name'}), 409
+    except FileNotFoundError:
+        return jsonify({'error': 'Not in the trash'}), 404
+    
+    file_catalog.refresh(filename)
+    stats.add('total_size', entry['size'])
+    if entry['metadata']:
+        auth_system.restore_file_metadata(filename, entry['metadata'])
+    return jsonify({'success': True, 'filename': filename})
+
+@app.route('/api/trash/<trash_id>', methods=['DELETE'])
+@require_login
+def purge_from_trash(trash_id):
+    """Delete a file for good (the purge worker unlinks it shortly)"""
+    entry = trash.get(trash_id)
+    if not entry:
+        return jsonify({'error': 'Not in the trash'}), 404
+    if not can_manage_trash_entry(entry, request.current_user['username']):
+        return jsonify({'error': 'Permission denied'}), 403
+    trash.expire([trash_id])
+    return jsonify({'success': True})
+
 # ==================== COMMENT ENDPOINTS ====================
 
-@app.route('/api/files/<filename>/comments', methods=['GET'])
+@app.route('/api/files/<shared:filename>/comments', methods=['GET'])
 @require_login
 def get_file_comments(filename):
-    """Get all comments for a file"""
+    """Comments on a file oldest first; pass next_cursor back as ?after= for the next page"""
     # Check access permission
     if not auth_system.can_access_file(filename, request.current_user['username']):
         return jsonify({'error': 'Access denied'}), 403
     
-    comments = auth_system.get_comments(filename)
-    return jsonify({'comments': comments})
+    try:
+        after = int(request.args.get('after', 0))
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    comments, next_cursor = auth_system.get_comments(filename, after, limit)
+    return jsonify({'comments': comments, 'next_cursor': next_cursor})
+
+@app.route('/api/comments/mentions', methods=['GET'])
+@require_login
+def get_my_mentions():
+    """Comments that @mention the current user, newest first (?before= cursor)"""
+    username = request.current_user['username']
+    try:
+        before = int(request.args['before']) if request.args.get('before') else None
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    
+    comments, next_cursor = auth_system.get_mentions(username, before, limit)
+    # Only mentions on files the user can still see
+    comments = [c for c in comments if auth_system.can_access_file(c['filename'], username)]
+    return jsonify({'comments': comments, 'next_cursor': next_cursor})
 
-@app.route('/api/files/<filename>/comments', methods=['POST'])
+@app.route('/api/files/<shared:filename>/comments', methods=['POST'])
 @require_login
 def add_file_comment(filename):
     """Add comment to file"""
@@ -727,16 +1110,13 @@ def upload_file():
             version_path = os.path.join(VERSION_FOLDER, version_filename)
             shutil.copy2(old_path, version_path)
             
-            if filename not in file_versions:
-                file_versions[filename] = []
-            file_versions[filename].append({
+            file_versions[filename] = file_versions.get(filename, []) + [{
                 'version': version_num,
                 'filename': version_filename,
                 'timestamp': datetime.now().isoformat()
-            })
+            }]
             
-            with stats_lock:
-                stats['total_versions'] += 1
+            stats.add('total_versions')
         else:
             # Handle duplicate filenames (non-versioned)
             base_name, extension = os.path.splitext(filename)
@@ -757,19 +1137,27 @@ def upload_file():
         last_update = time.time()
         transfer_id = str(hash(filename + str(start_time)))
         
+        trace_id = transfer_trace.start('http', 'upload', filename, request.content_length, CHUNK_SIZE)
+        chunk_index = 0
+        
         with open(target_file, mode) as f:
             if resume_offset > 0:
                 f.seek(resume_offset)
-                with stats_lock:
-                    stats['total_resumed'] += 1
+                stats.add('total_resumed')
             
             while True:
+                read_start = time.perf_counter()
                 chunk = file.stream.read(CHUNK_SIZE)
                 if not chunk:
                     break
+                received_at = time.time()
+                write_start = time.perf_counter()
                 
                 f.write(chunk)
                 bytes_written += len(chunk)
+                transfer_trace.chunk(trace_id, chunk_index, len(chunk), received_at,
+                                     io=time.perf_counter() - write_start, wait=write_start - read_start)
+                chunk_index += 1
                 
                 # Update speed every second
                 current_time = time.time()
@@ -789,8 +1177,10 @@ def upload_file():
                     time.sleep(len(chunk) / BANDWIDTH_LIMIT)
         
         # Move from temp to final location if resumed
+        move_start = time.perf_counter()
         if resume_offset > 0 and os.path.exists(temp_filepath):
             shutil.move(temp_filepath, filepath)
+        transfer_trace.end(trace_id, bytes_written, io=time.perf_counter() - move_start)
         
         # Compression (if enabled and file is not already compressed)
         final_filepath = filepath
@@ -805,8 +1195,7 @@ def upload_file():
                 final_filepath = compressed_filepath
                 filename = filename + '.gz'
                 
-                with stats_lock:
-                    stats['total_compressed'] += 1
+                stats.add('total_compressed')
         
         # Calculate upload speed
         elapsed_time = time.time() - start_time
@@ -814,15 +1203,18 @@ def upload_file():
         speed = total_bytes / elapsed_time if elapsed_time > 0 else 0
         
         # Update statistics
-        with stats_lock:
-            stats['total_uploads'] += 1
-            stats['total_size'] += total_bytes
-            stats['upload_speed'] = speed
+        stats.add('total_uploads')
+        stats.add('total_size', bytes_written)
+        dashboard_aggregates.record_upload(request.current_user['username'], bytes_written, elapsed_time)
+        performance_logger.log_file_transfer(filename, 'upload', bytes_written, elapsed_time,
+                                             bytes_written * 8 / elapsed_time / 1000000 if elapsed_time > 0 else 0)
         
         # Clean up transfer tracking
         if transfer_id in active_transfers:
             del active_transfers[transfer_id]
         
+        file_catalog.refresh(filename)
+        
         # Add file metadata for auth system
         auth_system.add_file_metadata(
             filename,
@@ -836,7 +1228,7 @@ def upload_file():
         if metadata:
             metadata['size'] = total_bytes
             metadata['type'] = file.content_type or ''
-            auth_system._save_json(auth_system.FILE_METADATA_DB, auth_system.file_metadata)
+            auth_system._save_json(FILE_METADATA_DB, auth_system.file_metadata)
         
         file_info = get_file_info(filename)
         file_info['upload_speed'] = format_speed(speed)
@@ -864,51 +1256,55 @@ def list_files():
     user_session = auth_system.validate_session(token)
     current_username = user_session['username'] if user_session else None
     
+    # Admins can delete and re-share anything; check once instead of per file
+    is_admin = bool(current_username) and auth_system.has_permission(current_username, 'delete_any')
+    visible = permission_index.visible_files(current_username)
+    comment_counts = auth_system.comments.counts()  # One small query, no comment bodies
+    
     files = []
-    for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if os.path.isfile(filepath):
-            # Check if user can access this file
-            if current_username and not auth_system.can_access_file(filename, current_username):
-                continue  # Skip files user can't access
-            
-            file_info = get_file_info(filename)
-            
-            # Add metadata
-            metadata = auth_system.get_file_metadata(filename)
-            if metadata:
-                file_info['owner'] = metadata.get('owner', 'Unknown')
-                file_info['owner_display'] = metadata.get('owner', 'Unknown')
-                file_info['permission'] = metadata.get('permission', 'public')
-                file_info['created_at'] = metadata.get('created_at', file_info['modified'])
-            else:
-                file_info['owner'] = 'Unknown'
-                file_info['owner_display'] = 'Unknown'
-                file_info['permission'] = 'public'
-                file_info['created_at'] = file_info['modified']
-            
-            # Add delete permission check
-            if current_username:
-                file_info['can_delete'] = auth_system.can_delete_file(filename, current_username)
-                file_info['can_edit_permissions'] = (metadata and metadata.get('owner') == current_username) or auth_system.has_permission(current_username, 'delete_any')
-            else:
-                file_info['can_delete'] = False
-                file_info['can_edit_permissions'] = False
-            
-            files.append(file_info)
+    for filename in visible:
+        entry = file_catalog.get(filename)
+        if entry is None:
+            continue  # Removed while we were listing
+        
+        file_info = FileCatalog.file_info(entry)
+        file_info['comment_count'] = comment_counts.get(filename, 0)
+        
+        # Add metadata
+        metadata = auth_system.get_file_metadata(filename)
+        if metadata:
+            file_info['owner'] = metadata.get('owner', 'Unknown')
+            file_info['owner_display'] = metadata.get('owner', 'Unknown')
+            file_info['permission'] = metadata.get('permission', 'public')
+            file_info['created_at'] = metadata.get('created_at', file_info['modified'])
+        else:
+            file_info['owner'] = 'Unknown'
+            file_info['owner_display'] = 'Unknown'
+            file_info['permission'] = 'public'
+            file_info['created_at'] = file_info['modified']
+        
+        # Add delete permission check
+        if current_username:
+            is_owner = bool(metadata) and metadata.get('owner') == current_username
+            file_info['can_delete'] = is_admin or is_owner
+            file_info['can_edit_permissions'] = is_admin or is_owner
+        else:
+            file_info['can_delete'] = False
+            file_info['can_edit_permissions'] = False
+        
+        files.append(file_info)
     
     # Sort by modified time (newest first)
     files.sort(key=lambda x: x['modified'], reverse=True)
     return jsonify(files)
 
-@app.route('/download/<filename>')
+@app.route('/download/<shared:filename>')
 @require_auth
 def download_file(filename):
     """Download a file with optimized streaming and permission check"""
     try:
         # Check if user has permission to access this file
-        current_user = request.current_user
-        username = current_user.get('username') if current_user else None
+        username = request_username()
         
         if not auth_system.can_access_file(filename, username):
             return jsonify({'error': 'You do not have permission to access this file'}), 403
@@ -917,8 +1313,8 @@ def download_file(filename):
         if not os.path.exists(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        with stats_lock:
-            stats['total_downloads'] += 1
+        stats.add('total_downloads')
+        dashboard_aggregates.record_download(username, os.path.getsize(filepath))
         
         # Use send_file with optimized settings
         return send_from_directory(
@@ -931,7 +1327,46 @@ def download_file(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
-@app.route('/delete/<filename>', methods=['DELETE'])
+def request_username():
+    """Username of the session in ?token= or the Bearer header, None for anonymous requests"""
+    token = request.args.get('token') or request.headers.get('Authorization', '').replace('Bearer ', '')
+    user_session = auth_system.validate_session(token)
+    return user_session['username'] if user_session else None
+
+@app.route('/thumb/<shared:filename>')
+@require_auth
+def thumbnail(filename):
+    """Resized preview of an image or video; ?w= width, ?v= version for immutable caching"""
+    if not auth_system.can_access_file(filename, request_username()):
+        return jsonify({'error': 'You do not have permission to access this file'}), 403
+    if file_catalog.get(filename) is None:
+        return jsonify({'error': 'File not found'}), 404
+    
+    try:
+        width = int(request.args.get('w', DEFAULT_WIDTH))
+    except ValueError:
+        return jsonify({'error': 'Invalid width'}), 400
+    fmt = thumbnail_cache.thumbnail_format('image/webp' in request.headers.get('Accept', ''))
+    
+    try:
+        result = thumbnail_cache.get(filename, width, fmt)
+    except Exception as e:
+        print(f"Error creating thumbnail for {filename}: {e}")
+        result = None
+    if result is None:
+        return jsonify({'error': 'No thumbnail for this file'}), 404
+    
+    path, etag, fmt = result
+    response = send_file(path, mimetype=f'image/{fmt}', etag=etag, conditional=True)
+    # A versioned URL (?v=size-mtime) changes whenever the file does, so it can be cached forever
+    if 'v' in request.args:
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, max-age=3600'
+    response.headers['Vary'] = 'Accept'
+    return response
+
+@app.route('/delete/<shared:filename>', methods=['DELETE'])
 @require_login
 def delete_file(filename):
     """Delete a file (owner or admin only)"""
@@ -940,17 +1375,12 @@ def delete_file(filename):
         if not auth_system.can_delete_file(filename, request.current_user['username']):
             return jsonify({'error': 'You do not have permission to delete this file. You can request deletion instead.'}), 403
         
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if os.path.exists(filepath):
-            file_size = os.path.getsize(filepath)
-            os.remove(filepath)
-            stats['total_size'] -= file_size
-            
-            # Delete metadata
-            auth_system.delete_file_metadata(filename)
-            
-            return jsonify({'success': True, 'message': f'File {filename} deleted'})
-        return jsonify({'error': 'File not found'}), 404
+        result = batch_delete.delete([filename], request.current_user['username'])[filename]
+        if result == DELETED:
+            return jsonify({'success': True, 'message': f'File {filename} moved to the trash'})
+        if result in (NOT_FOUND, INVALID):
+            return jsonify({'error': 'File not found'}), 404
+        return jsonify({'error': 'The file could not be deleted'}), 500
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -962,67 +1392,73 @@ def get_stats():
     user_session = auth_system.validate_session(token)
     current_username = user_session['username'] if user_session else None
     
-    # Count only files the user can access
-    accessible_files = []
-    total_size = 0
-    
-    for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if os.path.isfile(filepath):
-            # Check if user can access this file
-            if current_username and not auth_system.can_access_file(filename, current_username):
-                continue  # Skip files user can't access
-            
-            accessible_files.append(filename)
-            total_size += os.path.getsize(filepath)
+    # Count only files the user can access (maintained incrementally by the permission index)
+    total_files, total_size = permission_index.totals(current_username)
+    counters = stats.snapshot()
     
     return jsonify({
-        'total_files': len(accessible_files),
+        'total_files': total_files,
         'total_size': total_size,
-        'total_uploads': stats.get('total_uploads', 0),
-        'total_downloads': stats.get('total_downloads', 0),
-        'total_resumed': stats.get('total_resumed', 0),
-        'total_compressed': stats.get('total_compressed', 0),
-        'total_versions': stats.get('total_versions', 0)
+        'total_uploads': counters['total_uploads'],
+        'total_downloads': counters['total_downloads'],
+        'total_resumed': counters['total_resumed'],
+        'total_compressed': counters['total_compressed'],
+        'total_versions': counters['total_versions']
     })
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request, transfer, storage and counter metrics in Prometheus text format (scrape token or admin)"""
+    if not Config.ENABLE_METRICS:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    if not metrics.token_matches(request.headers.get('Authorization'), Config.METRICS_TOKEN):
+        username = request_username()
+        if not username:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not auth_system.has_permission(username, 'delete_any'):
+            return jsonify({'error': 'Insufficient permissions'}), 403
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/search')
 def search_files():
-    """Search files by name"""
-    query = request.args.get('q', '').lower()
-    files = []
+    """Search files by name (prefix, substring and typo-tolerant, best matches first)"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
     
-    for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        if os.path.isfile(filepath) and query in filename.lower():
-            files.append(get_file_info(filename))
+    # Get current user if authenticated
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    user_session = auth_system.validate_session(token)
+    current_username = user_session['username'] if user_session else None
     
-    files.sort(key=lambda x: x['modified'], reverse=True)
-    return jsonify(files)
+    total, entries = search_index.search(query, current_username, limit, offset)
+    files = [FileCatalog.file_info(entry) for entry in entries]
+    
+    response = jsonify(files)
+    response.headers['X-Total-Count'] = str(total)
+    return response
 
 @app.route('/delete-multiple', methods=['POST'])
+@require_login
 def delete_multiple():
-    """Delete multiple files"""
+    """Delete multiple files (own files, or any file for admins) with a result per file"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         filenames = data.get('filenames', [])
-        deleted = []
-        errors = []
+        if not isinstance(filenames, list):
+            return jsonify({'error': 'filenames must be a list'}), 400
         
-        for filename in filenames:
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.exists(filepath):
-                file_size = os.path.getsize(filepath)
-                os.remove(filepath)
-                stats['total_size'] -= file_size
-                deleted.append(filename)
-            else:
-                errors.append(filename)
+        results = batch_delete.delete(filenames, request.current_user['username'])
+        deleted = [filename for filename, result in results.items() if result == DELETED]
         
         return jsonify({
             'success': True,
             'deleted': deleted,
-            'errors': errors,
+            'errors': [filename for filename, result in results.items() if result != DELETED],
+            'results': results,
             'message': f'Deleted {len(deleted)} files'
         })
     except Exception as e:
@@ -1038,9 +1474,15 @@ def rename_file():
         
         if not old_name or not new_name:
             return jsonify({'success': False, 'message': 'Missing filename'}), 400
+        if not is_shared_path(old_name):
+            return jsonify({'success': False, 'message': 'Original file not found'}), 404
         
-        # Secure the new filename
-        new_name = secure_filename(new_name)
+        # Secure the new name; a bare name keeps the file in its folder, a path moves it
+        new_name = clean_relative_path(new_name)
+        if new_name and '/' not in new_name and '/' in old_name:
+            new_name = f"{old_name.rsplit('/', 1)[0]}/{new_name}"
+        if not new_name or not is_shared_path(new_name):
+            return jsonify({'success': False, 'message': 'Invalid file name'}), 400
         
         old_path = os.path.join(app.config['UPLOAD_FOLDER'], old_name)
         new_path = os.path.join(app.config['UPLOAD_FOLDER'], new_name)
@@ -1052,26 +1494,20 @@ def rename_file():
             return jsonify({'success': False, 'message': 'A file with that name already exists'}), 409
         
         # Rename the file
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
         os.rename(old_path, new_path)
+        prune_empty_dirs(app.config['UPLOAD_FOLDER'], old_name)
+        file_catalog.rename(old_name, new_name)
         
-        # Update file metadata if it exists
-        metadata_file = 'data/file_metadata.json'
-        if os.path.exists(metadata_file):
-            with open(metadata_file, 'r') as f:
-                metadata = json.load(f)
-            
-            if old_name in metadata:
-                metadata[new_name] = metadata.pop(old_name)
-                
-                with open(metadata_file, 'w') as f:
-                    json.dump(metadata, f, indent=2)
+        # Update file metadata and comments if they exist
+        auth_system.rename_file_metadata(old_name, new_name)
         
         # Log the rename action
-        audit_logger.log_action(
-            action='file_renamed',
-            username=session.get('username', 'anonymous'),
-            details={'old_name': old_name, 'new_name': new_name}
-        )
+        audit_logger.log_event('file_renamed', {
+            'username': request_username() or 'anonymous',
+            'old_name': old_name,
+            'new_name': new_name
+        })
         
         return jsonify({
             'success': True,
@@ -1080,18 +1516,15 @@ def rename_file():
         })
     
     except Exception as e:
-        app_logger.log_error(f'Error renaming file: {str(e)}')
+        app_logger.error(f'Error renaming file: {str(e)}')
         return jsonify({'success': False, 'message': str(e)}), 500
 
-@app.route('/preview/<filename>')
+@app.route('/preview/<shared:filename>')
 @require_auth
 def preview_file_enhanced(filename):
     """Preview file (PDF, audio, video, images, text) in browser with permission check"""
     # Check if user has permission to access this file
-    current_user = request.current_user
-    username = current_user.get('username') if current_user else None
-    
-    if not auth_system.can_access_file(filename, username):
+    if not auth_system.can_access_file(filename, request_username()):
         return jsonify({'error': 'You do not have permission to access this file'}), 403
     
     filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
@@ -1108,57 +1541,121 @@ def preview_file_enhanced(filename):
     
     is_previewable = any(mime_type and mime_type.startswith(t) for t in previewable_types)
     
+    # Large text (including logs with no known type): only the first window,
+    # the rest is paged through /api/text-preview
+    if os.path.getsize(filepath) > MAX_RESPONSE_BYTES:
+        is_text_type = mime_type in ('application/json', 'application/javascript') or (
+            mime_type.startswith('text/') if mime_type else is_text(filepath))
+        if is_text_type:
+            window = text_preview.window(filepath)
+            response = Response('\n'.join(window['lines']) + '\n', mimetype='text/plain; charset=utf-8')
+            response.headers['X-Preview-Truncated'] = 'true'
+            return response
+    
     if not is_previewable:
         # Try to serve it anyway
         return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
     
     return send_file(filepath, mimetype=mime_type, as_attachment=False)
 
+def _text_file(filename):
+    """Path of a readable text file, or an error response"""
+    if not auth_system.can_access_file(filename, request_username()):
+        return None, (jsonify({'error': 'You do not have permission to access this file'}), 403)
+    if file_catalog.get(filename) is None:
+        return None, (jsonify({'error': 'File not found'}), 404)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    if not is_text(filepath):
+        return None, (jsonify({'error': 'Not a text file'}), 415)
+    return filepath, None
+
+@app.route('/api/text-preview/<shared:filename>')
+@require_auth
+def text_preview_window(filename):
+    """Lines of a text file: ?line=&count= for a window, ?tail=N for the end"""
+    filepath, error = _text_file(filename)
+    if error:
+        return error
+    try:
+        if 'tail' in request.args:
+            result = text_preview.tail(filepath, request.args.get('tail', 200))
+        else:
+            result = text_preview.window(filepath, request.args.get('line', 1), request.args.get('count', 200))
+    except ValueError:
+        return jsonify({'error': 'Invalid line or count'}), 400
+    return jsonify(result)
+
+@app.route('/api/text-preview/<shared:filename>/search')
+@require_auth
+def text_preview_search(filename):
+    """Matching lines; pass next_cursor back as ?cursor= to continue through large files"""
+    query = request.args.get('q', '')
+    if not query:
+        return jsonify({'error': 'Search text is required'}), 400
+    filepath, error = _text_file(filename)
+    if error:
+        return error
+    try:
+        result = text_preview.search(filepath, query, request.args.get('cursor', 0), request.args.get('limit', 50),
+                                     ignore_case=request.args.get('case') != 'sensitive')
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor or limit'}), 400
+    return jsonify(result)
+
+def receive_uploads(receive):
+    """Stream the request body to disk with an UploadReceiver, then catalog, count and
+    record owners for everything it saved in one batch; returns (receiver, error)"""
+    receiver = UploadReceiver(app.config['UPLOAD_FOLDER'])
+    username = request_username()
+    error = None
+    try:
+        receive(receiver)
+    except (ValueError, EOFError, tarfile.TarError) as e:
+        error = str(e) or 'Malformed upload'
+    finally:
+        total = 0
+        for name, size in receiver.saved:
+            file_catalog.refresh(name)
+            dashboard_aggregates.record_upload(username, size)
+            total += size
+        if receiver.saved:
+            stats.add('total_uploads', len(receiver.saved))
+            stats.add('total_size', total)
+        
+        options = dict(request.args.items(), **receiver.fields)
+        permission = options.get('permission', 'public').strip().lower()
+        if permission not in PERMISSIONS:
+            print(f"Unknown upload permission {options['permission']!r}; saving files as private")
+            permission = 'private'  # A typo must not publish the files
+        if receiver.saved and username:
+            allowed_users = [u.strip() for u in options.get('allowed_users', '').split(',') if u.strip()]
+            auth_system.add_files_metadata([name for name, _ in receiver.saved], username,
+                                           permission, allowed_users)
+    return receiver, error
+
+def receive_multipart(receiver):
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
+        raise ValueError('Expected a multipart/form-data body')
+    receiver.receive_multipart(request.stream, boundary)
+
 @app.route('/bulk-upload', methods=['POST'])
 def bulk_upload():
-    """Handle multiple file uploads simultaneously"""
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files provided'}), 400
-    
-    files = request.files.getlist('files')
-    results = []
-    
-    for file in files:
-        if file.filename != '':
-            try:
-                filename = secure_filename(file.filename)
-                
-                # Handle duplicate filenames
-                base_name, extension = os.path.splitext(filename)
-                counter = 1
-                while os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], filename)):
-                    filename = f"{base_name}_{counter}{extension}"
-                    counter += 1
-                
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                
-                with stats_lock:
-                    stats['total_uploads'] += 1
-                    stats['total_size'] += os.path.getsize(filepath)
-                
-                results.append({
-                    'success': True,
-                    'filename': filename,
-                    'size': os.path.getsize(filepath)
-                })
-            except Exception as e:
-                results.append({
-                    'success': False,
-                    'filename': file.filename,
-                    'error': str(e)
-                })
-    
-    return jsonify({
-        'success': True,
-        'message': f'Uploaded {len(results)} files',
+    """Handle multiple file uploads, each written to disk as it arrives"""
+    receiver, error = receive_uploads(receive_multipart)
+    if not receiver.saved and not receiver.errors:
+        return jsonify({'error': error or 'No files provided'}), 400
+    
+    results = [{'success': True, 'filename': name, 'size': size} for name, size in receiver.saved]
+    results += [{'success': False, 'filename': e['file'], 'error': e['error']} for e in receiver.errors]
+    response = {
+        'success': error is None,
+        'message': f'Uploaded {len(receiver.saved)} files',
         'results': results
-    })
+    }
+    if error:
+        response['error'] = error
+    return jsonify(response), 400 if error else 200
 
 @app.route('/bulk-download', methods=['POST'])
 def bulk_download():
@@ -1183,8 +1680,8 @@ def bulk_download():
         
         memory_file.seek(0)
         
-        with stats_lock:
-            stats['total_downloads'] += len(filenames)
+        stats.add('total_downloads', len(filenames))
+        dashboard_aggregates.record_download(None, memory_file.getbuffer().nbytes, count=len(filenames))
         
         return send_file(
             memory_file,
@@ -1195,7 +1692,7 @@ def bulk_download():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/file-info/<filename>')
+@app.route('/file-info/<shared:filename>')
 def file_info_endpoint(filename):
     """Get detailed file information"""
     try:
@@ -1221,12 +1718,13 @@ def file_info_endpoint(filename):
 def transfer_status():
     """Get current transfer status"""
     # Count active transfers by type
-    upload_count = sum(1 for t in active_transfers.values() if t.get('type') == 'upload')
-    download_count = sum(1 for t in active_transfers.values() if t.get('type') == 'download')
+    transfers = cluster_http_transfers()
+    upload_count = sum(1 for t in transfers if t.get('type') == 'upload')
+    download_count = sum(1 for t in transfers if t.get('type') == 'download')
     
     # Calculate average speeds
-    upload_speeds = [t['speed'] for t in active_transfers.values() if t.get('type') == 'upload' and 'speed' in t]
-    download_speeds = [t['speed'] for t in active_transfers.values() if t.get('type') == 'download' and 'speed' in t]
+    upload_speeds = [t['speed'] for t in transfers if t.get('type') == 'upload' and 'speed' in t]
+    download_speeds = [t['speed'] for t in transfers if t.get('type') == 'download' and 'speed' in t]
     
     avg_upload_speed = sum(upload_speeds) / len(upload_speeds) if upload_speeds else 0
     avg_download_speed = sum(download_speeds) / len(download_speeds) if download_speeds else 0
@@ -1236,31 +1734,23 @@ def transfer_status():
         'active_downloads': download_count,
         'upload_speed': format_speed(avg_upload_speed),
         'download_speed': format_speed(avg_download_speed),
-        'total_active': len(active_transfers)
+        'total_active': len(transfers)
     })
 
 @app.route('/clear-all', methods=['POST'])
+@require_permission('delete_any')
 def clear_all_files():
-    """Clear all files (with confirmation)"""
+    """Clear all files (admin only)"""
     try:
-        import shutil
-        
-        # Get file count before clearing
-        file_count = len([f for f in os.listdir(app.config['UPLOAD_FOLDER']) 
-                         if os.path.isfile(os.path.join(app.config['UPLOAD_FOLDER'], f))])
-        
-        # Remove all files
-        for filename in os.listdir(app.config['UPLOAD_FOLDER']):
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            if os.path.isfile(filepath):
-                os.remove(filepath)
-        
-        with stats_lock:
-            stats['total_size'] = 0
+        results = batch_delete.clear(request.current_user['username'])
+        deleted = sum(1 for result in results.values() if result == DELETED)
+        if deleted == len(results):
+            stats.reset('total_size')
         
         return jsonify({
             'success': True,
-            'message': f'Cleared {file_count} files'
+            'results': {filename: result for filename, result in results.items() if result != DELETED},
+            'message': f'Cleared {deleted} files'
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -1297,7 +1787,7 @@ def format_speed(bytes_per_second):
 
 # New endpoints for advanced features
 
-@app.route('/file-versions/<filename>', methods=['GET'])
+@app.route('/file-versions/<shared:filename>', methods=['GET'])
 @require_auth
 def get_file_versions(filename):
     """Get all versions of a file"""
@@ -1331,6 +1821,8 @@ def restore_version():
     
     if not filename or version_num is None:
         return jsonify({'error': 'Missing filename or version'}), 400
+    if not is_shared_path(filename):
+        return jsonify({'error': 'Invalid filename'}), 400
     
     versions = file_versions.get(filename, [])
     version_info = next((v for v in versions if v['version'] == version_num), None)
@@ -1349,14 +1841,16 @@ def restore_version():
         backup_version = len(versions) + 1
         backup_filename = f"{os.path.splitext(filename)[0]}_v{backup_version}{os.path.splitext(filename)[1]}"
         backup_path = os.path.join(VERSION_FOLDER, backup_filename)
+        os.makedirs(os.path.dirname(backup_path), exist_ok=True)
         shutil.copy2(current_path, backup_path)
         
-        file_versions[filename].append({
+        file_versions[filename] = versions + [{
             'version': backup_version,
             'filename': backup_filename,
             'timestamp': datetime.now().isoformat()
-        })
+        }]
     shutil.copy2(version_path, current_path)
+    file_catalog.refresh(filename)
     
     return jsonify({
         'success': True,
@@ -1366,45 +1860,37 @@ def restore_version():
 @app.route('/upload-folder', methods=['POST'])
 @require_auth
 def upload_folder():
-    """Handle folder upload with multiple files"""
-    if 'files' not in request.files:
-        return jsonify({'error': 'No files provided'}), 400
-    
-    files = request.files.getlist('files')
-    paths = request.form.getlist('paths')  # Relative paths to maintain folder structure
-    
-    uploaded_files = []
-    failed_files = []
-    
-    for file, relative_path in zip(files, paths):
-        try:
-            # Secure the relative path
-            safe_path = secure_filename(relative_path)
-            full_path = os.path.join(UPLOAD_FOLDER, safe_path)
-            
-            # Create subdirectories if needed
-            os.makedirs(os.path.dirname(full_path), exist_ok=True)
-            
-            # Save the file
-            file.save(full_path)
-            uploaded_files.append(safe_path)
-            
-            with stats_lock:
-                stats['total_uploads'] += 1
-                stats['total_size'] += os.path.getsize(full_path)
-                
-        except Exception as e:
-            failed_files.append({'file': relative_path, 'error': str(e)})
-    
-    return jsonify({
-        'success': True,
-        'uploaded': len(uploaded_files),
-        'failed': len(failed_files),
-        'files': uploaded_files,
-        'errors': failed_files
-    })
+    """Handle folder upload, keeping each file's relative folder ('paths' field before each file)"""
+    receiver, error = receive_uploads(receive_multipart)
+    return folder_upload_response(receiver, error)
+
+@app.route('/upload-tar', methods=['POST'])
+@require_auth
+def upload_tar():
+    """Unpack a tar stream (optionally gzipped) into the shared folder, keeping its folders.
+
+    Lets a client send thousands of small files in one request; ?permission= and
+    ?allowed_users= apply to every file.
+    """
+    receiver, error = receive_uploads(lambda receiver: receiver.receive_tar(request.stream))
+    return folder_upload_response(receiver, error)
+
+def folder_upload_response(receiver, error):
+    if not receiver.saved and not receiver.errors:
+        return jsonify({'error': error or 'No files provided'}), 400
+    
+    response = {
+        'success': error is None,
+        'uploaded': len(receiver.saved),
+        'failed': len(receiver.errors),
+        'files': [name for name, _ in receiver.saved],
+        'errors': receiver.errors
+    }
+    if error:
+        response['error'] = error
+    return jsonify(response), 400 if error else 200
 
-@app.route('/download-progress/<filename>', methods=['GET'])
+@app.route('/download-progress/<shared:filename>', methods=['GET'])
 @require_auth
 @limit_bandwidth
 def download_with_progress(filename):
@@ -1442,6 +1928,8 @@ def download_with_progress(filename):
         transfer_id = str(hash(filename + str(time.time())))
         bytes_sent = 0
         start_time = time.time()
+        trace_id = transfer_trace.start('http', 'download', filename, end - start + 1, CHUNK_SIZE)
+        chunk_index = 0
         
         with open(filepath, 'rb') as f:
             f.seek(start)
@@ -1449,12 +1937,18 @@ def download_with_progress(filename):
             
             while remaining > 0:
                 chunk_size = min(CHUNK_SIZE, remaining)
+                read_start = time.perf_counter()
                 chunk = f.read(chunk_size)
                 
                 if not chunk:
                     break
                 
+                read_at = time.time()
+                yield_start = time.perf_counter()
                 yield chunk
+                transfer_trace.chunk(trace_id, chunk_index, len(chunk), read_at,
+                                     io=yield_start - read_start, wait=time.perf_counter() - yield_start)
+                chunk_index += 1
                 bytes_sent += len(chunk)
                 remaining -= len(chunk)
                 
@@ -1480,8 +1974,12 @@ def download_with_progress(filename):
         if transfer_id in active_transfers:
             del active_transfers[transfer_id]
         
-        with stats_lock:
-            stats['total_downloads'] += 1
+        elapsed = time.time() - start_time
+        transfer_trace.end(trace_id, bytes_sent)
+        stats.add('total_downloads')
+        dashboard_aggregates.record_download(None, bytes_sent, elapsed)
+        performance_logger.log_file_transfer(filename, 'download', bytes_sent, elapsed,
+                                             bytes_sent * 8 / elapsed / 1000000 if elapsed > 0 else 0)
     
     # Build response
     status_code = 206 if range_header else 200
@@ -1561,38 +2059,25 @@ def manage_legacy_settings():
 
 # ==================== NETWORK DEVICES ENDPOINT ====================
 
+def _push_network_devices():
+    """Send the device list to connected clients whenever a sweep changes it"""
+    version = network_discovery.version
+    while True:
+        high_speed.socketio.sleep(1)
+        if network_discovery.version != version:
+            version = network_discovery.version
+            high_speed.socketio.emit('network_devices', network_discovery.snapshot())
+
 @app.route('/api/network/devices', methods=['GET'])
 def get_network_devices():
-    """Scan local subnet for active devices (ping sweep)"""
-    import ipaddress
-    import threading
-
-    local_ip = get_local_ip()
-    net = ipaddress.ip_network(local_ip + '/24', strict=False)
-    devices = []
-    threads = []
-    lock = threading.Lock()
-
-    def ping(ip):
-        param = '-n' if platform.system().lower() == 'windows' else '-c'
-        command = ['ping', param, '1', '-w', '500', str(ip)]
-        try:
-            result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if result.returncode == 0:
-                with lock:
-                    devices.append(str(ip))
-        except Exception:
-            pass
-
-    # Only scan first 50 IPs for speed
-    for ip in list(net.hosts())[:50]:
-        t = threading.Thread(target=ping, args=(ip,))
-        threads.append(t)
-        t.start()
-    for t in threads:
-        t.join()
-
-    return jsonify({'devices': devices, 'local_ip': local_ip})
+    """Latest devices found on the local subnet; ?refresh=1 starts a new sweep"""
+    if network_discovery.thread is None:
+        high_speed.socketio.start_background_task(_push_network_devices)
+    if request.args.get('refresh'):
+        network_discovery.refresh()
+    else:
+        network_discovery.start()
+    return jsonify(network_discovery.snapshot())
 
 # ==================== USER ROLE ASSIGNMENT ENDPOINT ====================
 
@@ -1625,80 +2110,38 @@ def dashboard_enhanced():
 @app.route('/api/dashboard/stats')
 @require_login
 def get_dashboard_stats():
-    """Get dashboard statistics for charts"""
+    """Get dashboard statistics for charts (from incrementally maintained aggregates)"""
     try:
-        # Get file statistics
-        files = []
-        total_size = 0
-        file_types = {'images': 0, 'documents': 0, 'videos': 0, 'archives': 0, 'other': 0}
-        
-        if os.path.exists(UPLOAD_FOLDER):
-            for filename in os.listdir(UPLOAD_FOLDER):
-                filepath = os.path.join(UPLOAD_FOLDER, filename)
-                if os.path.isfile(filepath):
-                    file_size = os.path.getsize(filepath)
-                    total_size += file_size
-                    
-                    # Categorize file type
-                    ext = filename.lower().split('.')[-1] if '.' in filename else ''
-                    if ext in ['jpg', 'jpeg', 'png', 'gif', 'bmp', 'svg', 'webp']:
-                        file_types['images'] += 1
-                    elif ext in ['pdf', 'doc', 'docx', 'txt', 'xlsx', 'xls', 'ppt', 'pptx']:
-                        file_types['documents'] += 1
-                    elif ext in ['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv', 'webm']:
-                        file_types['videos'] += 1
-                    elif ext in ['zip', 'rar', '7z', 'tar', 'gz', 'bz2']:
-                        file_types['archives'] += 1
-                    else:
-                        file_types['other'] += 1
-                    
-                    files.append({
-                        'name': filename,
-                        'size': file_size,
-                        'modified': os.path.getmtime(filepath)
-                    })
+        summary = dashboard_aggregates.summary()
+        total_size = summary['totalSize']
         
         # Get user statistics
         users = auth_system.get_all_users()
         active_users = len([u for u in users if u.get('last_login')])
         
-        # Calculate average transfer speed (mock data for now)
-        avg_speed = 450  # Mbps
-        
         # Recent activity (last 10 items)
         recent_activity = []
-        if os.path.exists(UPLOAD_FOLDER):
-            sorted_files = sorted(files, key=lambda x: x['modified'], reverse=True)[:10]
-            for file in sorted_files:
-                recent_activity.append({
-                    'type': 'upload',
-                    'title': 'File Uploaded',
-                    'description': f"{file['name']} uploaded",
-                    'timestamp': datetime.fromtimestamp(file['modified']).isoformat()
-                })
+        for mtime, filename in dashboard_aggregates.recent_files(10):
+            recent_activity.append({
+                'type': 'upload',
+                'title': 'File Uploaded',
+                'description': f"{filename} uploaded",
+                'timestamp': datetime.fromtimestamp(mtime).isoformat()
+            })
         
         return jsonify({
             'success': True,
-            'totalFiles': len(files),
+            'totalFiles': summary['totalFiles'],
             'totalUsers': len(users),
             'activeUsers': active_users,
             'totalStorage': round(total_size / (1024**3), 2),  # GB
-            'avgSpeed': avg_speed,
-            'fileTypes': file_types,
+            'avgSpeed': summary['avgSpeed'],  # Mbps over the last 24 hours
+            'fileTypes': summary['fileTypes'],
             'recentActivity': recent_activity,
-            'uploadTrend': {
-                'labels': getLast7Days(),
-                'uploads': [12, 19, 15, 25, 22, 30, 28],
-                'downloads': [8, 15, 12, 18, 20, 25, 23]
-            },
-            'transferSpeeds': {
-                'labels': ['00:00', '04:00', '08:00', '12:00', '16:00', '20:00'],
-                'speeds': [120, 450, 380, 520, 480, 350]
-            },
-            'userActivity': {
-                'labels': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-                'activity': [85, 92, 78, 95, 88, 45, 35]
-            },
+            'uploadTrend': summary['uploadTrend'],
+            'transferSpeeds': summary['transferSpeeds'],
+            'userActivity': summary['userActivity'],
+            'lastHour': summary['lastHour'],
             'storageUsage': {
                 'used': round(total_size / (1024**3), 2),  # GB
                 'total': 1000,  # GB (1TB)
@@ -1708,14 +2151,6 @@ def get_dashboard_stats():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
-def getLast7Days():
-    """Get last 7 days as formatted strings"""
-    days = []
-    for i in range(6, -1, -1):
-        date = datetime.now() - timedelta(days=i)
-        days.append(date.strftime('%b %d'))
-    return days
-
 @app.route('/api/export/report')
 @require_login
 def export_report():
@@ -1813,6 +2248,10 @@ if __name__ == '__main__':
     elif local_ip.startswith('169.254.'):
         print(f"\n⚠️  WARNING: No DHCP - check network connection")
     
+    if Config.ENABLE_METRICS and os.environ.get('METRICS_PORT'):
+        metrics.start_server(Config.METRICS_PORT, Config.METRICS_HOST, Config.METRICS_TOKEN)
+        print(f"\n📈 METRICS: http://{Config.METRICS_HOST}:{Config.METRICS_PORT}/metrics")
+    
     print("\n" + "=" * 70)
     print("🔄 Starting server...\n")
     print("💡 Responsive UI: Works perfectly on mobile, tablet, and desktop!")
@@ -0,0 +1,431 @@
+"""
+Async Transfer Server
+asyncio (aiohttp) service for uploads, downloads and the chunked upload protocol,
+with disk I/O on a bounded thread pool and streaming paced by socket backpressure
+
+    python async_transfer.py --port 5002
+
+Runs instead of the Flask app for transfer-heavy deployments, or next to it:
+with NETSHARE_WORKERS > 1 both use the shared state store (see serve_workers.py),
+so sessions, file metadata, stats and catalog changes stay coherent.
+"""
+
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from werkzeug.utils import secure_filename
+
+import metrics
+from auth_system import auth_system, FILE_METADATA_DB
+from config import Config
+from counters import Counters, STAT_NAMES
+from file_catalog import TEMP_PREFIX
+from shared_state import open_store, SharedCounters
+from upload_stream import MAX_FIELD_BYTES
+
+IO_THREADS = int(os.environ.get('ASYNC_IO_THREADS', 16))
+IO_CHUNK = 1024 * 1024         # Bytes per disk read/write handed to the pool
+UPLOAD_IDLE_SECONDS = 3600     # Chunked uploads with no activity for this long are dropped
+UPLOAD_FIELDS = ('permission', 'allowed_users')  # Form fields kept from /upload; other parts are discarded
+
+
+class TransferService:
+    """Transfer endpoints; every blocking call runs on one of two executors.
+
+    Disk reads and writes use a bounded pool (io_threads), so thousands of slow
+    clients cost one coroutine each rather than one thread. AuthSystem isn't
+    thread-safe, so metadata reads and writes go through a single thread.
+    """
+
+    def __init__(self, upload_folder=Config.UPLOAD_FOLDER, io_threads=IO_THREADS, chunk_size=IO_CHUNK,
+                 store=None):
+        self.upload_folder = upload_folder
+        self.chunk_size = chunk_size
+        self.io = ThreadPoolExecutor(io_threads, thread_name_prefix='async-io')
+        self.meta = ThreadPoolExecutor(1, thread_name_prefix='async-meta')
+        self.store = store
+        if store is not None:
+            auth_system.use_store(store)
+        self.stats = SharedCounters(store, STAT_NAMES) if store is not None else Counters()
+        self.uploads = {}       # upload id -> chunked upload state
+        self.claimed = set()    # Final names reserved by uploads that haven't been renamed yet
+        self.active = 0
+        os.makedirs(upload_folder, exist_ok=True)
+
+    async def _io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.io, func, *args)
+
+    async def _meta(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.meta, func, *args)
+
+    async def _user(self, request):
+        """Session of the bearer token (header or ?token=), or None"""
+        token = request.headers.get('Authorization', '').replace('Bearer ', '') or request.query.get('token')
+        return await self._meta(auth_system.validate_session, token) if token else None
+
+    # ---- shared helpers ----
+
+    def _claim_name(self, filename):
+        """Pick a free name the way /upload does (name_1.ext, name_2.ext, ...) and reserve it"""
+        base_name, extension = os.path.splitext(filename)
+        counter = 1
+        while filename in self.claimed or os.path.exists(os.path.join(self.upload_folder, filename)):
+            filename = f"{base_name}_{counter}{extension}"
+            counter += 1
+        self.claimed.add(filename)
+        return filename
+
+    def _record_upload(self, filename, owner, size, permission, allowed_users):
+        """Metadata, stats and catalog change for a finished upload (metadata thread)"""
+        auth_system.add_file_metadata(filename, owner, permission, allowed_users)
+        metadata = auth_system.get_file_metadata(filename)
+        if metadata:
+            metadata['size'] = size
+            metadata['type'] = mimetypes.guess_type(filename)[0] or ''
+            auth_system._save_json(FILE_METADATA_DB, auth_system.file_metadata)
+        self.stats.add('total_uploads')
+        self.stats.add('total_size', size)
+        if self.store is not None:
+            self.store.notify('files', filename)  # Flask workers refresh their catalogs
+
+    async def _finish_upload(self, temp_path, filename, owner, size, permission, allowed_users, started):
+        filename = self._claim_name(secure_filename(filename) or 'upload')
+        try:
+            await self._io(os.replace, temp_path, os.path.join(self.upload_folder, filename))
+        finally:
+            self.claimed.discard(filename)
+        await self._meta(self._record_upload, filename, owner, size, permission, allowed_users)
+        metrics.transfer_bytes.inc(size, ('async', 'in'))
+
+        elapsed = time.time() - started
+        return {
+            'name': filename,
+            'size': size,
+            'type': mimetypes.guess_type(filename)[0] or 'unknown',
+            'owner': owner,
+            'permission': permission,
+            'upload_speed_mbps': round(size * 8 / elapsed / 1000000, 2) if elapsed > 0 else 0
+        }
+
+    def _temp_path(self):
+        return os.path.join(self.upload_folder, f"{TEMP_PREFIX}{uuid.uuid4().hex}")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # ---- multipart upload (same form fields as Flask /upload) ----
+
+    async def upload(self, request):
+        user = await self._user(request)
+        if not user:
+            return web.json_response({'error': 'Authentication required'}, status=401)
+        if not auth_system.has_permission(user['username'], 'upload'):
+            return web.json_response({'error': 'Permission denied'}, status=403)
+
+        started = time.time()
+        fields = {}
+        received = None  # (temp path, client filename, size)
+        too_large = None
+        reader = await request.multipart()
+        self.active += 1
+        try:
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                if part.name == 'file' and part.filename and received is None:
+                    temp_path = self._temp_path()
+                    received = (temp_path, part.filename, await self._receive(part, temp_path))
+                elif part.name in UPLOAD_FIELDS and not part.filename:
+                    value = await self._read_field(part)  # Fields may come before or after the file
+                    if value is None:
+                        too_large = part.name
+                        break
+                    fields[part.name] = value
+                else:
+                    await self._drain(part)  # Extra files and unknown parts are skipped, not buffered
+        except Exception:
+            if received:
+                await self._io(self._remove, received[0])
+            raise
+        finally:
+            self.active -= 1
+
+        if too_large:
+            if received:
+                await self._io(self._remove, received[0])
+            return web.json_response({'error': f'Form field {too_large} is too large'}, status=400)
+        if received is None:
+            return web.json_response({'error': 'No file provided'}, status=400)
+        allowed_users = [u.strip() for u in fields.get('allowed_users', '').split(',') if u.strip()]
+        info = await self._finish_upload(received[0], received[1], user['username'], received[2],
+                                         fields.get('permission', 'public'), allowed_users, started)
+        return web.json_response({'success': True, 'message': f"File {info['name']} uploaded successfully",
+                                  'file': info})
+
+    async def _read_field(self, part):
+        """A small form field's text, or None if it exceeds MAX_FIELD_BYTES"""
+        data = bytearray()
+        while True:
+            chunk = await part.read_chunk(self.chunk_size)
+            if not chunk:
+                return data.decode('utf-8', 'replace')
+            data += chunk
+            if len(data) > MAX_FIELD_BYTES:
+                return None
+
+    async def _drain(self, part):
+        while await part.read_chunk(self.chunk_size):
+            pass
+
+    async def _receive(self, stream, temp_path):
+        """Copy a multipart file part to disk; the socket is read only as fast as the disk writes"""
+        f = await self._io(open, temp_path, 'wb')
+        size = 0
+        try:
+            while True:
+                chunk = await stream.read_chunk(self.chunk_size)
+                if not chunk:
+                    break
+                await self._io(f.write, chunk)
+                size += len(chunk)
+        except BaseException:
+            await self._io(f.close)
+            await self._io(self._remove, temp_path)
+            raise
+        await self._io(f.close)
+        return size
+
+    # ---- download ----
+
+    async def download(self, request):
+        filename = request.match_info['filename']
+        if os.path.basename(filename) != filename or filename.startswith(TEMP_PREFIX):
+            return web.json_response({'error': 'File not found'}, status=404)
+        user = await self._user(request)
+        username = user['username'] if user else None
+        if not await self._meta(auth_system.can_access_file, filename, username):
+            return web.json_response({'error': 'You do not have permission to access this file'}, status=403)
+
+        filepath = os.path.join(self.upload_folder, filename)
+        try:
+            size = (await self._io(os.stat, filepath)).st_size
+        except OSError:
+            return web.json_response({'error': 'File not found'}, status=404)
+
+        try:
+            first_request = not request.http_range.start  # Count a download once, not per resumed range
+        except ValueError:
+            first_request = True  # Malformed Range: FileResponse sends the whole file
+        if first_request:
+            await self._meta(self.stats.add, 'total_downloads')
+        metrics.transfer_bytes.inc(size, ('async', 'out'))
+        # sendfile() from the kernel page cache: no per-client buffers, paced by the socket
+        return web.FileResponse(filepath, chunk_size=self.chunk_size, headers={
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Cache-Control': 'no-cache'
+        })
+
+    # ---- chunked upload protocol (HTTP form of the WebSocket chunk protocol) ----
+
+    async def start_chunked(self, request):
+        user = await self._user(request)
+        if not user or not auth_system.has_permission(user['username'], 'upload'):
+            return web.json_response({'error': 'Permission denied'}, status=403)
+        data = await request.json()
+        size = int(data.get('size', 0))
+        chunk_size = int(data.get('chunk_size') or self.chunk_size)
+        if size < 0 or chunk_size <= 0 or not data.get('filename'):
+            return web.json_response({'error': 'filename, size and chunk_size are required'}, status=400)
+
+        temp_path = self._temp_path()
+        fd = await self._io(os.open, temp_path, os.O_CREAT | os.O_WRONLY, 0o644)
+        await self._io(os.ftruncate, fd, size)  # Chunks can arrive in any order
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {
+            'owner': user['username'],
+            'filename': data['filename'],
+            'size': size,
+            'chunk_size': chunk_size,
+            'chunk_count': max((size + chunk_size - 1) // chunk_size, 1),
+            'received': set(),
+            'temp_path': temp_path,
+            'fd': fd,
+            'permission': data.get('permission', 'public'),
+            'allowed_users': data.get('allowed_users') or [],
+            'started': time.time(),
+            'touched': time.time()
+        }
+        return web.json_response({'upload_id': upload_id, 'chunk_size': chunk_size,
+                                  'chunk_count': self.uploads[upload_id]['chunk_count']})
+
+    async def _owned_upload(self, request):
+        user = await self._user(request)
+        upload = self.uploads.get(request.match_info['upload_id'])
+        if upload is None or not user or user['username'] != upload['owner']:
+            raise web.HTTPNotFound(text='{"error": "Upload not found"}', content_type='application/json')
+        upload['touched'] = time.time()
+        return upload
+
+    async def put_chunk(self, request):
+        upload = await self._owned_upload(request)
+        index = int(request.match_info['index'])
+        offset = index * upload['chunk_size']
+        expected = min(upload['chunk_size'], upload['size'] - offset)
+        if index < 0 or index >= upload['chunk_count'] or request.content_length != expected:
+            return web.json_response({'error': f'Chunk {index} must be {expected} bytes'}, status=400)
+
+        self.active += 1
+        try:
+            written = 0
+            while written < expected:
+                chunk = await request.content.read(min(self.chunk_size, expected - written))
+                if not chunk:
+                    break
+                await self._io(os.pwrite, upload['fd'], chunk, offset + written)
+                written += len(chunk)
+        finally:
+            self.active -= 1
+        if written != expected:
+            return web.json_response({'error': 'Incomplete chunk'}, status=400)
+
+        upload['received'].add(index)
+        metrics.transfer_bytes.inc(written, ('async', 'in'))
+        return web.json_response({'received': len(upload['received']), 'chunk_count': upload['chunk_count']})
+
+    async def chunked_status(self, request):
+        upload = await self._owned_upload(request)
+        missing = [i for i in range(upload['chunk_count']) if i not in upload['received']]
+        return web.json_response({'received': len(upload['received']), 'chunk_count': upload['chunk_count'],
+                                  'missing': missing})
+
+    async def complete_chunked(self, request):
+        upload = await self._owned_upload(request)
+        missing = [i for i in range(upload['chunk_count']) if i not in upload['received']]
+        if missing and upload['size']:
+            return web.json_response({'error': 'Missing chunks', 'missing': missing}, status=409)
+
+        del self.uploads[request.match_info['upload_id']]
+        await self._io(os.close, upload['fd'])
+        info = await self._finish_upload(upload['temp_path'], upload['filename'], upload['owner'], upload['size'],
+                                         upload['permission'], upload['allowed_users'], upload['started'])
+        return web.json_response({'success': True, 'file': info})
+
+    async def cancel_chunked(self, request):
+        upload = await self._owned_upload(request)
+        del self.uploads[request.match_info['upload_id']]
+        await self._discard(upload)
+        return web.json_response({'success': True})
+
+    async def _discard(self, upload):
+        await self._io(os.close, upload['fd'])
+        await self._io(self._remove, upload['temp_path'])
+
+    async def sweep_idle(self, interval=60):
+        """Drop chunked uploads abandoned by their clients"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.time()
+            for upload_id, upload in list(self.uploads.items()):
+                if now - upload['touched'] > UPLOAD_IDLE_SECONDS:
+                    del self.uploads[upload_id]
+                    await self._discard(upload)
+
+    # ---- monitoring ----
+
+    async def health(self, request):
+        return web.json_response({'active_transfers': self.active, 'chunked_uploads': len(self.uploads)})
+
+    async def prometheus_metrics(self, request):
+        """Same access rule as Flask /metrics: the scrape token or an admin session"""
+        if not metrics.token_matches(request.headers.get('Authorization'), Config.METRICS_TOKEN):
+            user = await self._user(request)
+            if not user:
+                return web.json_response({'error': 'Authentication required'}, status=401)
+            if not auth_system.has_permission(user['username'], 'delete_any'):
+                return web.json_response({'error': 'Insufficient permissions'}, status=403)
+        return web.Response(body=metrics.registry.render().encode(), headers={'Content-Type': metrics.CONTENT_TYPE})
+
+    async def close(self, app):
+        for upload in list(self.uploads.values()):
+            await self._discard(upload)
+        self.uploads.clear()
+        self.io.shutdown(wait=False)
+        self.meta.shutdown(wait=False)
+
+
+@web.middleware
+async def cors(request, handler):
+    """Same CORS policy as the Flask app, so its pages can call this server directly"""
+    if request.method == 'OPTIONS':
+        response = web.Response(status=204)
+    else:
+        response = await handler(request)
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type,Authorization,Range'
+    response.headers['Access-Control-Allow-Methods'] = 'GET,PUT,POST,DELETE,OPTIONS'
+    return response
+
+
+SERVICE = web.AppKey('service', TransferService)
+SWEEPER = web.AppKey('sweeper', asyncio.Task)
+
+
+def create_app(service=None):
+    """aiohttp application serving a TransferService"""
+    if service is None:
+        store = open_store(Config.SHARED_STATE_DB) if Config.WORKERS > 1 else None
+        service = TransferService(store=store)
+    app = web.Application(middlewares=[cors])
+    app[SERVICE] = service
+    app.router.add_post('/upload', service.upload)
+    app.router.add_get('/download/{filename}', service.download)
+    app.router.add_post('/api/chunked/uploads', service.start_chunked)
+    app.router.add_get('/api/chunked/uploads/{upload_id}', service.chunked_status)
+    app.router.add_put('/api/chunked/uploads/{upload_id}/{index:\\d+}', service.put_chunk)
+    app.router.add_post('/api/chunked/uploads/{upload_id}/complete', service.complete_chunked)
+    app.router.add_delete('/api/chunked/uploads/{upload_id}', service.cancel_chunked)
+    app.router.add_get('/health', service.health)
+    if Config.ENABLE_METRICS:
+        app.router.add_get('/metrics', service.prometheus_metrics)
+
+    async def start_sweeper(app):
+        app[SWEEPER] = asyncio.create_task(service.sweep_idle())
+
+    async def stop_sweeper(app):
+        app[SWEEPER].cancel()
+
+    app.on_startup.append(start_sweeper)
+    app.on_cleanup.append(stop_sweeper)
+    app.on_cleanup.append(service.close)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the asyncio transfer server')
+    parser.add_argument('--host', default=Config.HOST)
+    parser.add_argument('--port', type=int, default=5002)
+    parser.add_argument('--io-threads', type=int, default=IO_THREADS, help='Threads for disk I/O')
+    args = parser.parse_args(argv)
+
+    store = open_store(Config.SHARED_STATE_DB) if Config.WORKERS > 1 else None
+    service = TransferService(io_threads=args.io_threads, store=store)
+    print(f"Async transfer server on http://{args.host}:{args.port} "
+          f"({args.io_threads} I/O threads, {'shared' if store else 'local'} state)")
+    web.run_app(create_app(service), host=args.host, port=args.port, access_log=None,
+                backlog=4096, print=None)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -11,13 +11,17 @@ from datetime import datetime, timedelta
 from functools import wraps
 from flask import session, request, jsonify
 from security import PasswordHasher, PasswordValidator, UsernameValidator
+from shared_state import SharedDict
+from comment_store import CommentStore, COMMENTS_SQLITE_DB, PAGE_SIZE
+from delete_request_store import DeleteRequestStore, DELETE_REQUESTS_SQLITE_DB
+import metrics
 
 # Database files
 USERS_DB = 'data/users.json'
 SESSIONS_DB = 'data/sessions.json'
 FILE_METADATA_DB = 'data/file_metadata.json'
-COMMENTS_DB = 'data/comments.json'
-DELETE_REQUESTS_DB = 'data/delete_requests.json'
+COMMENTS_DB = 'data/comments.json'  # Imported once into COMMENTS_SQLITE_DB
+DELETE_REQUESTS_DB = 'data/delete_requests.json'  # Imported once into DELETE_REQUESTS_SQLITE_DB
 
 # Create data directory
 os.makedirs('data', exist_ok=True)
@@ -41,6 +45,7 @@ class AuthSystem:
         self.password_hasher = PasswordHasher()
         self.password_validator = PasswordValidator()
         self.username_validator = UsernameValidator()
+        self.metadata_listeners = []
         self.load_databases()
     
     def load_databases(self):
@@ -48,8 +53,12 @@ class AuthSystem:
         self.users = self._load_json(USERS_DB, {})
         self.sessions = self._load_json(SESSIONS_DB, {})
         self.file_metadata = self._load_json(FILE_METADATA_DB, {})
-        self.comments = self._load_json(COMMENTS_DB, {})
-        self.delete_requests = self._load_json(DELETE_REQUESTS_DB, {})
+        self.comments = CommentStore(COMMENTS_SQLITE_DB)
+        if os.path.exists(COMMENTS_DB):
+            self.comments.migrate(self._load_json(COMMENTS_DB, {}))
+        self.delete_requests = DeleteRequestStore(DELETE_REQUESTS_SQLITE_DB)
+        if os.path.exists(DELETE_REQUESTS_DB):
+            self.delete_requests.migrate(self._load_json(DELETE_REQUESTS_DB, {}))
         
         # Create default admin user if no users exist
         if not self.users:
@@ -65,10 +74,30 @@ class AuthSystem:
             pass
         return default if default is not None else {}
     
+    def use_store(self, store):
+        """Move the databases into a shared store so worker processes see the same state"""
+        # Comments and delete requests are already in SQLite, which every worker opens
+        for name in ('users', 'sessions', 'file_metadata'):
+            store.seed(name, getattr(self, name))  # First worker migrates the JSON files
+            setattr(self, name, SharedDict(store, name))
+    
     def _save_json(self, filepath, data):
-        """Save data to JSON file"""
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Save data to JSON file (or write back in-place changes to a shared store)"""
+        with metrics.metadata_save_latency.time((os.path.basename(filepath),)):
+            if isinstance(data, SharedDict):
+                data.sync()
+                return
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
+    
+    def add_metadata_listener(self, listener):
+        """Register a callback(filename, metadata) fired on file metadata changes"""
+        self.metadata_listeners.append(listener)
+    
+    def _notify_metadata(self, filename, metadata):
+        """Tell listeners a file's metadata changed (None = removed)"""
+        for listener in self.metadata_listeners:
+            listener(filename, metadata)
     
     def create_user(self, username, password, role='user', display_name=''):
         """Create a new user"""
@@ -180,6 +209,29 @@ class AuthSystem:
             'type': ''
         }
         self._save_json(FILE_METADATA_DB, self.file_metadata)
+        self._notify_metadata(filename, self.file_metadata[filename])
+    
+    def add_files_metadata(self, filenames, owner, permission='public', allowed_users=None):
+        """Add metadata for a batch of uploaded files, saving the database once"""
+        created_at = datetime.now().isoformat()
+        for filename in filenames:
+            self.file_metadata[filename] = {
+                'owner': owner,
+                'created_at': created_at,
+                'permission': permission,
+                'allowed_users': list(allowed_users or []),
+                'size': 0,
+                'type': ''
+            }
+        self._save_json(FILE_METADATA_DB, self.file_metadata)
+        for filename in filenames:
+            self._notify_metadata(filename, self.file_metadata[filename])
+    
+    def restore_file_metadata(self, filename, metadata):
+        """Put back the metadata of a file restored from the trash"""
+        self.file_metadata[filename] = metadata
+        self._save_json(FILE_METADATA_DB, self.file_metadata)
+        self._notify_metadata(filename, metadata)
     
     def get_file_metadata(self, filename):
         """Get file metadata"""
@@ -192,9 +244,21 @@ class AuthSystem:
             if allowed_users is not None:
                 self.file_metadata[filename]['allowed_users'] = allowed_users
             self._save_json(FILE_METADATA_DB, self.file_metadata)
+            self._notify_metadata(filename, self.file_metadata[filename])
             return True
         return False
     
+    def rename_file_metadata(self, old_name, new_name):
+        """Move metadata and comments to a renamed file"""
+        if old_name in self.file_metadata:
+            self.file_metadata[new_name] = self.file_metadata.pop(old_name)
+            self._save_json(FILE_METADATA_DB, self.file_metadata)
+            self._notify_metadata(old_name, None)
+            self._notify_metadata(new_name, self.file_metadata[new_name])
+        
+        self.comments.rename_file(old_name, new_name)
+        self.delete_requests.rename_file(old_name, new_name)
+    
     def can_access_file(self, filename, username):
         """Check if user can access file"""
         metadata = self.get_file_metadata(filename)
@@ -226,66 +290,48 @@ class AuthSystem:
         
         return False
     
+    def deletable_files(self, filenames, username):
+        """The filenames username may delete, checking their role once"""
+        if self.has_permission(username, 'delete_any'):
+            return list(filenames)
+        return [filename for filename in filenames
+                if (self.file_metadata.get(filename) or {}).get('owner') == username]
+    
     def request_delete(self, filename, username, reason=''):
         """Request file deletion"""
-        request_id = f"{filename}_{username}_{int(time.time())}"
-        self.delete_requests[request_id] = {
-            'filename': filename,
-            'requester': username,
-            'reason': reason,
-            'status': 'pending',
-            'created_at': datetime.now().isoformat()
-        }
-        self._save_json(DELETE_REQUESTS_DB, self.delete_requests)
-        return request_id
+        return self.delete_requests.create(filename, username, reason)
     
-    def get_delete_requests(self, status=None):
-        """Get delete requests, optionally filtered by status"""
-        if status:
-            return {k: v for k, v in self.delete_requests.items() if v['status'] == status}
-        return self.delete_requests
+    def get_delete_requests(self, status=None, before=None, limit=100):
+        """Delete requests newest first, optionally by status, and the cursor for the next page"""
+        return self.delete_requests.list(status, before, limit)
     
-    def approve_delete_request(self, request_id, approver):
+    def approve_delete_requests(self, request_ids, approver, remove_file=None):
+        """Approve requests, calling remove_file(filename) once per file; returns {request_id: filename}"""
+        return self.delete_requests.approve(request_ids, approver, remove_file)
+    
+    def approve_delete_request(self, request_id, approver, remove_file=None):
         """Approve delete request"""
-        if request_id in self.delete_requests:
-            self.delete_requests[request_id]['status'] = 'approved'
-            self.delete_requests[request_id]['approver'] = approver
-            self.delete_requests[request_id]['approved_at'] = datetime.now().isoformat()
-            self._save_json(DELETE_REQUESTS_DB, self.delete_requests)
-            return True
-        return False
+        return bool(self.approve_delete_requests([request_id], approver, remove_file))
+    
+    def reject_delete_requests(self, request_ids, approver, reason=''):
+        """Reject requests; returns the ids that were pending"""
+        return self.delete_requests.reject(request_ids, approver, reason)
     
     def reject_delete_request(self, request_id, approver, reason=''):
         """Reject delete request"""
-        if request_id in self.delete_requests:
-            self.delete_requests[request_id]['status'] = 'rejected'
-            self.delete_requests[request_id]['approver'] = approver
-            self.delete_requests[request_id]['rejection_reason'] = reason
-            self.delete_requests[request_id]['rejected_at'] = datetime.now().isoformat()
-            self._save_json(DELETE_REQUESTS_DB, self.delete_requests)
-            return True
-        return False
+        return bool(self.reject_delete_requests([request_id], approver, reason))
     
     def add_comment(self, filename, username, comment, mentions=None):
         """Add comment to file"""
-        if filename not in self.comments:
-            self.comments[filename] = []
-        
-        comment_data = {
-            'id': len(self.comments[filename]) + 1,
-            'username': username,
-            'comment': comment,
-            'mentions': mentions or [],
-            'created_at': datetime.now().isoformat()
-        }
-        
-        self.comments[filename].append(comment_data)
-        self._save_json(COMMENTS_DB, self.comments)
-        return comment_data
+        return self.comments.add(filename, username, comment, mentions)
     
-    def get_comments(self, filename):
-        """Get all comments for a file"""
-        return self.comments.get(filename, [])
+    def get_comments(self, filename, after=None, limit=PAGE_SIZE):
+        """Comments on a file oldest first, and the cursor for the next page (None at the end)"""
+        return self.comments.page(filename, after, limit)
+    
+    def get_mentions(self, username, before=None, limit=PAGE_SIZE):
+        """Comments mentioning a user newest first, and the cursor for the next page"""
+        return self.comments.mentions(username, before, limit)
     
     def get_all_users(self):
         """Get all users (excluding passwords)"""
@@ -302,13 +348,17 @@ class AuthSystem:
     
     def delete_file_metadata(self, filename):
         """Delete file metadata when file is deleted"""
-        if filename in self.file_metadata:
-            del self.file_metadata[filename]
+        self.delete_files_metadata([filename])
+    
+    def delete_files_metadata(self, filenames):
+        """Delete metadata and comments of several deleted files, saving the database once"""
+        removed = [filename for filename in filenames if self.file_metadata.pop(filename, None) is not None]
+        if removed:
             self._save_json(FILE_METADATA_DB, self.file_metadata)
+            for filename in removed:
+                self._notify_metadata(filename, None)
         
-        if filename in self.comments:
-            del self.comments[filename]
-            self._save_json(COMMENTS_DB, self.comments)
+        self.comments.delete_files(filenames)
     
     def delete_user(self, username):
         """Delete a user from the system"""
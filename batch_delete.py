@@ -0,0 +1,112 @@
+"""
+Batch Delete
+Deletes many shared files as one operation: permissions are checked in one
+pass, files go to the trash (or are unlinked on a bounded thread pool), and
+the catalog, metadata, comments and stats are updated once for the whole batch
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from disk_io import DiskIO
+from file_catalog import is_shared_path, walk_files, prune_empty_dirs
+
+BATCH_DELETE_WORKERS = int(os.environ.get('BATCH_DELETE_WORKERS', 8))
+
+# Per-file results
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+INVALID = 'invalid'
+FAILED = 'failed'
+
+
+class BatchDelete:
+    """Removes files from the shared folder in bulk and reports a result per file"""
+
+    def __init__(self, folder, catalog, auth, stats, trash=None, workers=BATCH_DELETE_WORKERS):
+        self.folder = folder
+        self.catalog = catalog
+        self.auth = auth
+        self.stats = stats
+        self.trash = trash
+        self.workers = workers
+        self.disk = DiskIO(max_concurrency=1)  # One batch's pool at a time, off the event loop
+
+    def delete(self, filenames, username=None):
+        """Delete files; returns {filename: result}.
+
+        username=None skips permission checks (the caller already required
+        delete_any). Files that are already gone still have their catalog
+        entry, metadata and comments cleaned up.
+        """
+        results = {}
+        names = []
+        for filename in dict.fromkeys(f for f in filenames if isinstance(f, str)):
+            if is_shared_path(filename):
+                names.append(filename)
+            else:
+                results[filename] = INVALID
+
+        if username is not None:
+            allowed = set(self.auth.deletable_files(names, username))
+            results.update((filename, FORBIDDEN) for filename in names if filename not in allowed)
+            names = [filename for filename in names if filename in allowed]
+
+        if self.trash is not None:
+            files = [(filename, self.auth.get_file_metadata(filename)) for filename in names]
+            removed = self.disk.run('delete', self._trash_all, files, username)
+        else:
+            removed = self.disk.run('delete', self._unlink_all, names)
+
+        freed = 0
+        for filename, result, size in removed:
+            results[filename] = result
+            freed += size
+
+        gone = [filename for filename in names if results[filename] in (DELETED, NOT_FOUND)]
+        self.catalog.remove_many(gone)
+        self.auth.delete_files_metadata(gone)
+        if freed:
+            self.stats.add('total_size', -freed)
+        return results
+
+    def clear(self, username=None):
+        """Delete every file in the shared folder (listed once); returns {filename: result}"""
+        return self.delete(self.disk.run('delete', self._list), username)
+
+    def _list(self):
+        return [name for name, _ in walk_files(self.folder)]
+
+    def _unlink_all(self, filenames):
+        if len(filenames) < 2 or self.workers < 2:
+            return [self._unlink(filename) for filename in filenames]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(filenames))) as pool:
+            return list(pool.map(self._unlink, filenames))
+
+    def _trash_all(self, files, deleted_by):
+        """Move files to the trash; missing from the result means the file was already gone"""
+        moved = self.trash.move_many(self.folder, files, deleted_by)
+        removed = []
+        for filename, _ in files:
+            entry = moved.get(filename, False)
+            if entry:
+                prune_empty_dirs(self.folder, filename)
+                removed.append((filename, DELETED, entry['size']))
+            else:
+                removed.append((filename, NOT_FOUND if entry is False else FAILED, 0))
+        return removed
+
+    def _unlink(self, filename):
+        """(filename, result, bytes freed)"""
+        filepath = os.path.join(self.folder, filename)
+        try:
+            size = os.stat(filepath).st_size
+            os.remove(filepath)
+            prune_empty_dirs(self.folder, filename)
+            return filename, DELETED, size
+        except FileNotFoundError:
+            return filename, NOT_FOUND, 0
+        except OSError as e:
+            print(f"Error deleting {filename}: {e}")
+            return filename, FAILED, 0
@@ -0,0 +1,181 @@
+"""
+Benchmark Regression Gate
+Compares benchmark reports (benchmark_transfers.py / benchmark_micro.py) against
+a stored baseline using bootstrapped confidence intervals, and exits non-zero
+when transfer throughput or hot-path latency got worse by more than a threshold,
+when candidate operations failed, or when a baseline benchmark is missing
+
+    python benchmark_compare.py baseline.json candidate.json --threshold 10
+    python benchmark_compare.py base1.json base2.json --candidate new.json
+"""
+
+import sys
+import json
+import random
+import argparse
+import statistics
+
+
+def load_reports(paths):
+    reports = []
+    for path in paths:
+        with open(path, 'r') as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def collect(reports):
+    """Pool raw samples per benchmark row across reports.
+
+    Returns (rows, failed): rows is key -> (metric, higher_is_better, samples)
+    for runs without errors, failed is key -> failed operation count for runs
+    with errors (their samples aren't comparable).
+    """
+    rows = {}
+    failed = {}
+    for report in reports:
+        for row in report.get('results', []):
+            if report.get('benchmark') == 'transfers':
+                key = f"{row['scenario']} size={row['size']} x{row['concurrency']}"
+                if row.get('errors'):
+                    failed[key] = failed.get(key, 0) + row['errors']
+                    continue
+                metric, higher_is_better, samples = 'throughput_mbps', True, row.get('samples_mbps', [])
+            else:
+                key = f"{row['name']} n={row['scale']}"
+                metric, higher_is_better, samples = 'latency_ms', False, row.get('samples_ms', [])
+            if samples:
+                rows.setdefault(key, (metric, higher_is_better, []))[2].extend(samples)
+    return rows, failed
+
+
+def bootstrap_ratio(baseline, candidate, statistic=statistics.median, iterations=2000, confidence=0.95, seed=0):
+    """Point estimate and percentile CI of statistic(candidate) / statistic(baseline)"""
+    rng = random.Random(seed)
+    base_point = statistic(baseline)
+    point = statistic(candidate) / base_point if base_point else float('inf')
+    ratios = []
+    for _ in range(iterations):
+        base = statistic(rng.choices(baseline, k=len(baseline)))
+        cand = statistic(rng.choices(candidate, k=len(candidate)))
+        ratios.append(cand / base if base else float('inf'))
+    ratios.sort()
+    tail = (1 - confidence) / 2
+    low = ratios[int(tail * (iterations - 1))]
+    high = ratios[int((1 - tail) * (iterations - 1))]
+    return point, low, high
+
+
+def compare(baseline_reports, candidate_reports, threshold=0.10, iterations=2000, confidence=0.95):
+    """Verdicts for benchmarks on both sides, plus FAILED for candidate runs with errors; returns (results, missing).
+
+    A row is a regression when the change is worse than the threshold AND the
+    whole confidence interval is on the worse side of no change (not noise).
+    """
+    baseline = collect(baseline_reports)[0]
+    candidate, failed = collect(candidate_reports)
+    results = []
+    for key in sorted(failed):
+        results.append({
+            'benchmark': key,
+            'metric': 'throughput_mbps',
+            'baseline': round(statistics.median(baseline[key][2]), 4) if key in baseline else None,
+            'candidate': None,
+            'errors': failed[key],
+            'verdict': 'FAILED'
+        })
+    for key in sorted(set(baseline) & set(candidate) - set(failed)):
+        metric, higher_is_better, base_samples = baseline[key]
+        cand_samples = candidate[key][2]
+        point, low, high = bootstrap_ratio(base_samples, cand_samples, iterations=iterations,
+                                           confidence=confidence)
+        # Express as "percent worse" so both metric directions read the same way
+        if higher_is_better:
+            worse, worse_low, worse_high = 1 - point, 1 - high, 1 - low
+        else:
+            worse, worse_low, worse_high = point - 1, low - 1, high - 1
+
+        if worse > threshold and worse_low > 0:
+            verdict = 'REGRESSION'
+        elif worse < -threshold and worse_high < 0:
+            verdict = 'improved'
+        elif worse_low > 0 or worse_high < 0:
+            verdict = 'changed'  # Significant but within the threshold
+        else:
+            verdict = 'ok'
+        results.append({
+            'benchmark': key,
+            'metric': metric,
+            'baseline': round(statistics.median(base_samples), 4),
+            'candidate': round(statistics.median(cand_samples), 4),
+            'worse_percent': round(worse * 100, 1),
+            'ci_percent': [round(worse_low * 100, 1), round(worse_high * 100, 1)],
+            'verdict': verdict
+        })
+    missing = sorted(set(baseline) - set(candidate) - set(failed))
+    return results, missing
+
+
+def passed(results, missing):
+    """True when nothing regressed, failed or went missing"""
+    return not missing and not any(r['verdict'] in ('REGRESSION', 'FAILED') for r in results)
+
+
+def format_report(results, missing, threshold):
+    lines = [f"{'benchmark':<44} {'metric':<16} {'baseline':>11} {'candidate':>11} "
+             f"{'worse %':>8} {'95% CI':>17}  verdict"]
+    for r in results:
+        if r['verdict'] == 'FAILED':
+            lines.append(f"{r['benchmark']:<44} {r['metric']:<16} {str(r['baseline']):>11} {'-':>11} "
+                         f"{'-':>8} {'-':>17}  FAILED ({r['errors']} errors)")
+            continue
+        ci = f"[{r['ci_percent'][0]}, {r['ci_percent'][1]}]"
+        lines.append(f"{r['benchmark']:<44} {r['metric']:<16} {r['baseline']:>11} {r['candidate']:>11} "
+                     f"{r['worse_percent']:>8} {ci:>17}  {r['verdict']}")
+    for key in missing:
+        lines.append(f"{key:<44} missing from candidate")
+    regressions = [r for r in results if r['verdict'] == 'REGRESSION']
+    failures = [r for r in results if r['verdict'] == 'FAILED']
+    if regressions:
+        lines.append(f"\nFAIL: {len(regressions)} benchmark(s) worse than {threshold * 100:g}%: "
+                     + ', '.join(r['benchmark'] for r in regressions))
+    if failures:
+        lines.append(f"\nFAIL: {len(failures)} benchmark(s) had failed operations: "
+                     + ', '.join(r['benchmark'] for r in failures))
+    if missing:
+        lines.append(f"\nFAIL: {len(missing)} baseline benchmark(s) missing from the candidate")
+    if passed(results, missing):
+        lines.append(f"\nPASS: no benchmark worse than {threshold * 100:g}% with confidence")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare benchmark reports against a baseline')
+    parser.add_argument('reports', nargs='+',
+                        help='Baseline report(s) followed by the candidate (or use --candidate)')
+    parser.add_argument('--candidate', action='append', help='Candidate report(s); all positional are baseline')
+    parser.add_argument('--threshold', type=float, default=10, help='Allowed slowdown in percent')
+    parser.add_argument('--iterations', type=int, default=2000, help='Bootstrap resamples')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Confidence level')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args(argv)
+
+    if args.candidate:
+        baseline_paths, candidate_paths = args.reports, args.candidate
+    elif len(args.reports) >= 2:
+        baseline_paths, candidate_paths = args.reports[:-1], args.reports[-1:]
+    else:
+        parser.error('need a baseline and a candidate report')
+
+    threshold = args.threshold / 100
+    results, missing = compare(load_reports(baseline_paths), load_reports(candidate_paths),
+                               threshold, args.iterations, args.confidence)
+    if args.json:
+        print(json.dumps({'results': results, 'missing': missing}, indent=2))
+    else:
+        print(format_report(results, missing, threshold))
+    return 0 if passed(results, missing) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Micro-Benchmarks
+Times the auth, metadata and listing hot paths at 1k/10k/100k files and sessions
+against synthetic data in a temporary working directory, with JSON output
+
+    python benchmark_micro.py --scales 1000,10000,100000 --output micro.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCALES = [1000, 10000, 100000]
+WORDS = ['report', 'budget', 'photo', 'invoice', 'backup', 'notes', 'draft', 'final', 'scan', 'video']
+EXTENSIONS = ['pdf', 'jpg', 'docx', 'zip', 'mp4', 'txt', 'xlsx', 'png']
+
+
+# ---- synthetic data ----
+
+def make_filenames(count):
+    """Deterministic, realistic-looking names (a smaller scale is a prefix of a larger one)"""
+    rng = random.Random(42)
+    return [f"{rng.choice(WORDS)}_{rng.choice(WORDS)}_{i:06d}.{rng.choice(EXTENSIONS)}" for i in range(count)]
+
+
+def make_users(count):
+    return [f"user{i:04d}" for i in range(max(count // 100, 10))]
+
+
+def make_metadata(filenames, users):
+    """Owner and permission mix: 70% public, 20% private, 10% restricted to a few users"""
+    rng = random.Random(7)
+    metadata = {}
+    for filename in filenames:
+        roll = rng.random()
+        entry = {
+            'owner': rng.choice(users),
+            'permission': 'public' if roll < 0.7 else 'private' if roll < 0.9 else 'restricted',
+            'allowed_users': rng.sample(users, 3) if roll >= 0.9 else [],
+            'uploaded_at': datetime.now().isoformat(),
+            'download_count': 0
+        }
+        metadata[filename] = entry
+    return metadata
+
+
+def make_sessions(count, users):
+    rng = random.Random(11)
+    expires = (datetime.now() + timedelta(days=7)).isoformat()
+    return {f"token{i:07d}": {
+        'username': rng.choice(users),
+        'role': 'user',
+        'display_name': '',
+        'created_at': datetime.now().isoformat(),
+        'expires_at': expires
+    } for i in range(count)}
+
+
+def write_files(folder, filenames):
+    """Create empty files for names not already on disk"""
+    existing = set(os.listdir(folder))
+    for filename in filenames:
+        if filename not in existing:
+            os.close(os.open(os.path.join(folder, filename), os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+# ---- timing ----
+
+def measure(func, min_time=0.2, min_runs=5, max_runs=200):
+    """Per-call durations in seconds: at least min_runs, then until min_time has elapsed.
+    
+    Calls faster than a millisecond are timed in batches so timer overhead doesn't dominate.
+    """
+    t = time.perf_counter()
+    func()  # Warm up caches and lazy imports
+    batch = 1
+    if time.perf_counter() - t < 0.001:
+        while True:
+            t = time.perf_counter()
+            for _ in range(batch):
+                func()
+            if time.perf_counter() - t >= 0.001 or batch >= 100000:
+                break
+            batch *= 10
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() - started < min_time):
+        t = time.perf_counter()
+        for _ in range(batch):
+            func()
+        samples.append((time.perf_counter() - t) / batch)
+    return samples
+
+
+def summarize(name, scale, samples):
+    return {
+        'name': name,
+        'scale': scale,
+        'runs': len(samples),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 4),
+        'median_ms': round(statistics.median(samples) * 1000, 4),
+        'min_ms': round(min(samples) * 1000, 4),
+        'stdev_ms': round(statistics.stdev(samples) * 1000, 4) if len(samples) > 1 else 0,
+        'ops_per_second': round(1 / statistics.fmean(samples), 1) if sum(samples) else None,
+        'samples_ms': [round(s * 1000, 4) for s in samples]
+    }
+
+
+# ---- benchmarks ----
+
+class Environment:
+    """The app imported inside a temp directory, repopulated for each scale"""
+
+    def __init__(self):
+        self.workdir = tempfile.mkdtemp(prefix='netshare_micro_')
+        for folder in ('data', 'shared_files'):
+            os.makedirs(os.path.join(self.workdir, folder))
+        os.chdir(self.workdir)
+        sys.path.insert(0, REPO_DIR)
+        import app  # Module import creates its stores relative to the working directory
+        self.app = app
+        self.client = app.app.test_client()
+
+    def populate(self, scale):
+        app = self.app
+        self.filenames = make_filenames(scale)
+        self.users = make_users(scale)
+        metadata = make_metadata(self.filenames, self.users)
+        write_files(app.UPLOAD_FOLDER, self.filenames)
+
+        app.auth_system.file_metadata = metadata
+        app.auth_system.sessions = make_sessions(scale, self.users)
+        app.auth_system.users.update({u: {'username': u, 'role': 'user', 'display_name': '',
+                                          'password': '', 'created_at': ''} for u in self.users})
+        app.permission_index.load_metadata(metadata)
+        app.file_catalog.scan()
+
+        self.tokens = list(app.auth_system.sessions)
+        self.token = self.tokens[0]
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+        self.rng = random.Random(3)
+
+    def benchmarks(self):
+        auth = self.app.auth_system
+        rng = self.rng
+        counter = iter(range(10 ** 9))
+
+        def get(path):
+            response = self.client.get(path, headers=self.headers)
+            assert response.status_code == 200, (path, response.status_code)
+
+        return {
+            'validate_session': lambda: auth.validate_session(rng.choice(self.tokens)),
+            'can_access_file': lambda: auth.can_access_file(rng.choice(self.filenames), rng.choice(self.users)),
+            'add_file_metadata': lambda: auth.add_file_metadata(f"bench_{next(counter)}.bin", self.users[0]),
+            '_save_json': lambda: auth._save_json(self.app.FILE_METADATA_DB, auth.file_metadata),
+            'list_files': lambda: get('/files'),
+            'search_files': lambda: get(f"/search?q={rng.choice(WORDS)}"),
+            'get_stats': lambda: get('/stats'),
+            'get_dashboard_stats': lambda: get('/api/dashboard/stats'),
+        }
+
+
+def git_commit():
+    from benchmark_transfers import git_commit as commit
+    return commit()
+
+
+def run(scales, names=None, min_time=0.2):
+    env = Environment()
+    results = []
+    for scale in sorted(scales):
+        env.populate(scale)
+        for name, func in env.benchmarks().items():
+            if names and name not in names:
+                continue
+            row = summarize(name, scale, measure(func, min_time))
+            results.append(row)
+            print(f"{name:>20} {scale:>7}  median {row['median_ms']:>10} ms  "
+                  f"min {row['min_ms']:>10} ms  runs {row['runs']}")
+    return {
+        'benchmark': 'micro',
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': {'scales': sorted(scales), 'min_time': min_time},
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Micro-benchmarks for metadata and catalog hot paths')
+    parser.add_argument('--scales', default=','.join(str(s) for s in SCALES),
+                        help='Comma-separated file/session counts')
+    parser.add_argument('--only', default='', help='Comma-separated benchmark names')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend per benchmark')
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args(argv)
+
+    report = run([int(s) for s in args.scales.split(',')],
+                 [n.strip() for n in args.only.split(',') if n.strip()], args.min_time)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,414 @@
+"""
+End-to-End Transfer Benchmark
+Starts the server against a temporary directory and drives concurrent HTTP and
+Socket.IO transfers from local clients, reporting throughput, latency
+percentiles and server CPU/RSS, with JSON output for comparing runs
+
+    python benchmark_transfers.py --sizes 1M,16M --concurrency 1,4,16 --output bench.json
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import socket
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ['upload', 'download', 'bulk-download', 'ws-upload', 'ws-download']
+BENCH_USER = 'benchadmin'
+BENCH_PASSWORD = 'Bench#Pass2024!'
+
+# Server bootstrap run inside the temp directory (all data/ and shared_files/ paths are relative)
+SERVER_BOOT = f"""
+import sys
+import app
+app.auth_system.create_user('{BENCH_USER}', '{BENCH_PASSWORD}', 'admin')
+app.high_speed.socketio.run(app.app, host='127.0.0.1', port=int(sys.argv[1]),
+                            debug=False, use_reloader=False, log_output=False)
+"""
+
+
+def parse_size(text):
+    """'512K', '16M', '1G' or plain bytes"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_usage(pid):
+    """(cpu seconds, rss bytes) from /proc, or (None, None) where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f'/proc/{pid}/status') as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+        return cpu, rss
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None, None
+
+
+class BenchServer:
+    """The app in a subprocess with its own working directory"""
+
+    def __init__(self, port=None):
+        self.port = port or free_port()
+        self.workdir = tempfile.mkdtemp(prefix='netshare_bench_')
+        os.makedirs(os.path.join(self.workdir, 'data'))
+        os.makedirs(os.path.join(self.workdir, 'shared_files'))
+        self.process = None
+        self.token = None
+
+    def seed(self, filename, payload):
+        """Place a file directly in the shared folder before startup"""
+        with open(os.path.join(self.workdir, 'shared_files', filename), 'wb') as f:
+            f.write(payload)
+
+    def start(self, timeout=30):
+        env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        self.process = subprocess.Popen([sys.executable, '-c', SERVER_BOOT, str(self.port)],
+                                        cwd=self.workdir, env=env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                status, body = self.request('POST', '/api/auth/login',
+                                            json.dumps({'username': BENCH_USER, 'password': BENCH_PASSWORD}),
+                                            {'Content-Type': 'application/json'})
+                if status == 200:
+                    self.token = json.loads(body)['token']
+                    return
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError('Server did not start')
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def usage(self):
+        return process_usage(self.process.pid)
+
+    def auth_headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+    def request(self, method, path, body=None, headers=None, connection=None):
+        """One HTTP request; returns (status, body bytes)"""
+        conn = connection or http.client.HTTPConnection('127.0.0.1', self.port, timeout=300)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, response.read()
+        finally:
+            if connection is None:
+                conn.close()
+
+
+# ---- operations (each returns bytes moved; raises on failure) ----
+
+def http_upload(server, conn, payload, name):
+    boundary = '----netsharebench' + os.urandom(8).hex()
+    head = (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{name}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n').encode()
+    tail = f'\r\n--{boundary}--\r\n'.encode()
+    headers = {**server.auth_headers(),
+               'Content-Type': f'multipart/form-data; boundary={boundary}',
+               'Content-Length': str(len(head) + len(payload) + len(tail))}
+    status, _ = server.request('POST', '/upload', [head, payload, tail], headers, conn)
+    if status != 200:
+        raise RuntimeError(f'upload returned {status}')
+    return len(payload)
+
+
+def http_download(server, conn, filename):
+    status, body = server.request('GET', f'/download-progress/{filename}', None, server.auth_headers(), conn)
+    if status != 200:
+        raise RuntimeError(f'download returned {status}')
+    return len(body)
+
+
+def http_bulk_download(server, conn, filenames):
+    headers = {**server.auth_headers(), 'Content-Type': 'application/json'}
+    status, body = server.request('POST', '/bulk-download', json.dumps({'filenames': filenames}), headers, conn)
+    if status != 200:
+        raise RuntimeError(f'bulk download returned {status}')
+    return len(body)
+
+
+class SocketClient:
+    """Socket.IO client speaking the HighSpeedTransfer protocol"""
+
+    def __init__(self, server):
+        import socketio  # python-socketio client (needs requests / websocket-client)
+        self.server = server
+        self.client = socketio.Client(reconnection=False)
+        self.events = {}
+        self.lock = threading.Condition()
+        for event in ('upload_ready', 'upload_complete', 'download_ready', 'download_chunk', 'error'):
+            self.client.on(event, self._recorder(event))
+        self.client.connect(f'http://127.0.0.1:{server.port}', headers=server.auth_headers(),
+                            transports=['websocket'])
+
+    def _recorder(self, event):
+        def record(data):
+            with self.lock:
+                self.events.setdefault(event, []).append(data)
+                self.lock.notify_all()
+        return record
+
+    def wait(self, event, timeout=300):
+        with self.lock:
+            if not self.lock.wait_for(lambda: self.events.get(event) or self.events.get('error'), timeout):
+                raise RuntimeError(f'timed out waiting for {event}')
+            if self.events.get('error'):
+                raise RuntimeError(self.events['error'].pop(0).get('message'))
+            return self.events[event].pop(0)
+
+    def upload(self, payload, name):
+        from high_speed_transfer import CHUNK_SIZE  # The server slices uploads by this size
+        chunk_count = max((len(payload) + CHUNK_SIZE - 1) // CHUNK_SIZE, 1)
+        self.client.emit('start_upload', {'filename': name, 'filesize': len(payload), 'chunk_count': chunk_count})
+        chunk_size = self.wait('upload_ready')['chunk_size']
+        if chunk_size != CHUNK_SIZE:
+            self.client.emit('cancel_transfer')
+            raise RuntimeError(f'server chunk size {chunk_size} != {CHUNK_SIZE}')
+        view = memoryview(payload)
+        for index in range(chunk_count):
+            self.client.emit('upload_chunk', {'chunk_index': index,
+                                              'data': bytes(view[index * chunk_size:(index + 1) * chunk_size])})
+        self.wait('upload_complete')
+        # upload_complete echoes the announced size; check what actually landed on disk
+        stored = os.path.getsize(os.path.join(self.server.workdir, 'shared_files', name))
+        if stored != len(payload):
+            raise RuntimeError(f'uploaded {stored} of {len(payload)} bytes')
+        return stored
+
+    def download(self, filename):
+        self.client.emit('request_download', {'filename': filename})
+        ready = self.wait('download_ready')
+        received = 0
+        for index in range(ready['chunk_count']):
+            self.client.emit('request_chunk', {'chunk_index': index})
+            received += self.wait('download_chunk')['size']
+        return received
+
+    def close(self):
+        self.client.disconnect()
+
+
+def socketio_client_available():
+    try:
+        import socketio  # noqa: F401
+        import engineio.client
+    except ImportError:
+        return False
+    return engineio.client.websocket is not None
+
+
+# ---- runner ----
+
+def run_scenario(server, scenario, size, concurrency, ops, payload, seed_names):
+    """Run ops operations on each of concurrency workers; returns the result row"""
+    latencies = []
+    op_mbps = []  # Per-operation throughput, for bootstrapped comparisons
+    errors = []
+    moved = [0]
+    lock = threading.Lock()
+    rss_peak = [0]
+    done = threading.Event()
+
+    def sample_rss():
+        while not done.is_set():
+            _, rss = server.usage()
+            if rss:
+                rss_peak[0] = max(rss_peak[0], rss)
+            time.sleep(0.05)
+
+    def worker(worker_id):
+        conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=300)
+        ws = None
+        try:
+            if scenario.startswith('ws-'):
+                ws = SocketClient(server)
+            for i in range(ops):
+                name = f'bench_{scenario}_{size}_{worker_id}_{i}_{int(time.time() * 1000)}.bin'
+                started = time.perf_counter()
+                try:
+                    if scenario == 'upload':
+                        nbytes = http_upload(server, conn, payload, name)
+                    elif scenario == 'download':
+                        nbytes = http_download(server, conn, seed_names[0])
+                    elif scenario == 'bulk-download':
+                        nbytes = http_bulk_download(server, conn, seed_names)
+                    elif scenario == 'ws-upload':
+                        nbytes = ws.upload(payload, name)
+                    else:
+                        nbytes = ws.download(seed_names[0])
+                except Exception as e:
+                    with lock:
+                        errors.append(str(e))
+                    conn.close()
+                    conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=300)
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    op_mbps.append(nbytes * 8 / elapsed / 1000000 if elapsed > 0 else 0)
+                    moved[0] += nbytes
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        finally:
+            conn.close()
+            if ws is not None:
+                ws.close()
+
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    cpu_before, _ = server.usage()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    wall = time.perf_counter() - started
+    cpu_after, _ = server.usage()
+    done.set()
+    sampler.join()
+
+    latencies.sort()
+    cpu = (cpu_after - cpu_before) if cpu_before is not None and cpu_after is not None else None
+    return {
+        'scenario': scenario,
+        'size': size,
+        'concurrency': concurrency,
+        'operations': len(latencies),
+        'errors': len(errors),
+        'error_samples': errors[:3],
+        'seconds': round(wall, 3),
+        'bytes': moved[0],
+        'throughput_mbps': round(moved[0] * 8 / wall / 1000000, 2) if wall > 0 else 0,
+        'ops_per_second': round(len(latencies) / wall, 2) if wall > 0 else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p95': round(percentile(latencies, 95) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else 0
+        },
+        'server_cpu_seconds': round(cpu, 3) if cpu is not None else None,
+        'server_cpu_percent': round(cpu * 100 / wall, 1) if cpu is not None and wall > 0 else None,
+        'server_rss_peak_bytes': rss_peak[0] or None,
+        'samples_ms': [round(latency * 1000, 3) for latency in latencies],
+        'samples_mbps': [round(mbps, 2) for mbps in op_mbps]
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, concurrencies, ops, scenarios, bulk_files=4, port=None):
+    """Run the benchmark matrix against a fresh server; returns the report dict"""
+    if any(s.startswith('ws-') for s in scenarios) and not socketio_client_available():
+        print("Skipping Socket.IO scenarios: install 'websocket-client' for the python-socketio client")
+        scenarios = [s for s in scenarios if not s.startswith('ws-')]
+
+    server = BenchServer(port)
+    payloads = {size: os.urandom(size) for size in sizes}
+    seeds = {}
+    for size in sizes:
+        seeds[size] = [f'seed_{size}_{n}.bin' for n in range(bulk_files)]
+        for name in seeds[size]:
+            server.seed(name, payloads[size])
+
+    results = []
+    server.start()
+    try:
+        for scenario in scenarios:
+            for size in sizes:
+                for concurrency in concurrencies:
+                    row = run_scenario(server, scenario, size, concurrency, ops, payloads[size], seeds[size])
+                    results.append(row)
+                    print(f"{scenario:>14} {size:>11} x{concurrency:<3} "
+                          f"{row['throughput_mbps']:>9} Mbps  p50 {row['latency_ms']['p50']:>9} ms  "
+                          f"p99 {row['latency_ms']['p99']:>9} ms  cpu {row['server_cpu_percent']}%  "
+                          f"errors {row['errors']}")
+    finally:
+        server.stop()
+
+    return {
+        'benchmark': 'transfers',
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': {'sizes': sizes, 'concurrency': concurrencies, 'ops': ops, 'scenarios': scenarios},
+        'results': results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='End-to-end transfer benchmark')
+    parser.add_argument('--sizes', default='1M,16M', help='Comma-separated file sizes (K/M/G suffixes)')
+    parser.add_argument('--concurrency', default='1,4', help='Comma-separated client counts')
+    parser.add_argument('--ops', type=int, default=4, help='Operations per client')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='Comma-separated scenarios')
+    parser.add_argument('--bulk-files', type=int, default=4, help='Files per bulk download')
+    parser.add_argument('--port', type=int, default=None, help='Server port (default: any free port)')
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = run([parse_size(s) for s in args.sizes.split(',')],
+                 [int(c) for c in args.concurrency.split(',')],
+                 args.ops, scenarios, args.bulk_files, args.port)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Comment Store
+File comments in SQLite: per-file cursor pagination, a mention index and
+per-file counts, each maintained in the same transaction as the comment
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+COMMENTS_SQLITE_DB = 'data/comments.db'
+PAGE_SIZE = 50
+
+MENTION_PATTERN = re.compile(r'(?<![\w.])@([A-Za-z0-9_.-]+)')
+
+
+def find_mentions(text):
+    """Usernames written as @name in a comment"""
+    return [name.rstrip('.') for name in MENTION_PATTERN.findall(text)]
+
+
+class CommentStore:
+    """Comments table plus mention and count tables; safe to share between threads and workers"""
+
+    def __init__(self, path=COMMENTS_SQLITE_DB):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS comments (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'filename TEXT, username TEXT, comment TEXT, mentions TEXT, created_at TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS comments_by_file ON comments (filename, id)')
+            conn.execute('CREATE TABLE IF NOT EXISTS mentions (username TEXT, comment_id INTEGER, '
+                         'PRIMARY KEY (username, comment_id)) WITHOUT ROWID')
+            conn.execute('CREATE TABLE IF NOT EXISTS comment_counts (filename TEXT PRIMARY KEY, count INTEGER)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self):
+        """One connection per thread (and per process, since forks must not share one)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row):
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'username': row['username'],
+            'comment': row['comment'],
+            'mentions': json.loads(row['mentions']),
+            'created_at': row['created_at']
+        }
+
+    def migrate(self, comments):
+        """Import the old {filename: [comment, ...]} JSON database once"""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return 0
+            imported = 0
+            for filename, file_comments in comments.items():
+                for comment in file_comments:
+                    self._insert(conn, filename, comment['username'], comment['comment'],
+                                 comment.get('mentions', []), comment.get('created_at'))
+                    imported += 1
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(imported),))
+            return imported
+
+    def _insert(self, conn, filename, username, comment, mentions, created_at=None):
+        cursor = conn.execute(
+            'INSERT INTO comments (filename, username, comment, mentions, created_at) VALUES (?, ?, ?, ?, ?)',
+            (filename, username, comment, json.dumps(mentions), created_at or datetime.now().isoformat()))
+        comment_id = cursor.lastrowid
+        conn.executemany('INSERT OR IGNORE INTO mentions (username, comment_id) VALUES (?, ?)',
+                         [(name, comment_id) for name in mentions])
+        conn.execute('INSERT INTO comment_counts (filename, count) VALUES (?, 1) '
+                     'ON CONFLICT(filename) DO UPDATE SET count = count + 1', (filename,))
+        return comment_id
+
+    def add(self, filename, username, comment, mentions=None):
+        """Store a comment; @names in the text are indexed along with explicit mentions"""
+        mentions = list(dict.fromkeys(list(mentions or []) + find_mentions(comment)))
+        with self._connect() as conn:
+            comment_id = self._insert(conn, filename, username, comment, mentions)
+            row = conn.execute('SELECT * FROM comments WHERE id = ?', (comment_id,)).fetchone()
+        return self._row(row)
+
+    def page(self, filename, after=None, limit=PAGE_SIZE):
+        """(comments oldest first with ids above after, next cursor or None)"""
+        rows = self._connect().execute(
+            'SELECT * FROM comments WHERE filename = ? AND id > ? ORDER BY id LIMIT ?',
+            (filename, after or 0, limit + 1)).fetchall()
+        comments = [self._row(row) for row in rows[:limit]]
+        return comments, comments[-1]['id'] if len(rows) > limit else None
+
+    def mentions(self, username, before=None, limit=PAGE_SIZE):
+        """(comments mentioning username newest first, next cursor or None)"""
+        rows = self._connect().execute(
+            'SELECT c.* FROM mentions m JOIN comments c ON c.id = m.comment_id '
+            'WHERE m.username = ? AND m.comment_id < ? ORDER BY m.comment_id DESC LIMIT ?',
+            (username, before or 2 ** 62, limit + 1)).fetchall()
+        comments = [self._row(row) for row in rows[:limit]]
+        return comments, comments[-1]['id'] if len(rows) > limit else None
+
+    def count(self, filename):
+        row = self._connect().execute('SELECT count FROM comment_counts WHERE filename = ?', (filename,)).fetchone()
+        return row[0] if row else 0
+
+    def counts(self):
+        """{filename: comment count} for every file with comments, without reading comment bodies"""
+        return dict(self._connect().execute('SELECT filename, count FROM comment_counts').fetchall())
+
+    def rename_file(self, old_name, new_name):
+        """Move comments to new_name, replacing any it had (the file there was overwritten)"""
+        with self._connect() as conn:
+            self._delete(conn, new_name)
+            conn.execute('UPDATE comments SET filename = ? WHERE filename = ?', (new_name, old_name))
+            conn.execute('UPDATE comment_counts SET filename = ? WHERE filename = ?', (new_name, old_name))
+
+    def delete_file(self, filename):
+        self.delete_files([filename])
+
+    def delete_files(self, filenames):
+        """Drop the comments of several files in one transaction"""
+        with self._connect() as conn:
+            for filename in filenames:
+                self._delete(conn, filename)
+
+    def _delete(self, conn, filename):
+        conn.execute('DELETE FROM mentions WHERE comment_id IN (SELECT id FROM comments WHERE filename = ?)',
+                     (filename,))
+        conn.execute('DELETE FROM comments WHERE filename = ?', (filename,))
+        conn.execute('DELETE FROM comment_counts WHERE filename = ?', (filename,))
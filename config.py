@@ -87,9 +87,17 @@ class Config:
     # File Expiration
     FILE_EXPIRATION_DAYS = int(os.environ.get('FILE_EXPIRATION_DAYS', 0))  # 0 = never expire
     
+    # Multi-worker mode (serve_workers.py sets these for each worker process)
+    WORKERS = int(os.environ.get('NETSHARE_WORKERS', 1))
+    WORKER_ID = int(os.environ.get('NETSHARE_WORKER_ID', 0))
+    SHARED_STATE_DB = os.environ.get('SHARED_STATE_DB', 'data/shared_state.db')
+    SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or os.environ.get('REDIS_URL')
+    
     # Monitoring
-    ENABLE_METRICS = os.environ.get('ENABLE_METRICS', 'True') == 'True'
+    ENABLE_METRICS = os.environ.get('ENABLE_METRICS', 'False') == 'True'  # Off: it exposes usage and traffic
     METRICS_PORT = int(os.environ.get('METRICS_PORT', 9090))
+    METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')  # Bind address of the separate METRICS_PORT server
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')  # Bearer token for scrapers; admins can always read /metrics
 
 
 class DevelopmentConfig(Config):
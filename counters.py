@@ -0,0 +1,196 @@
+"""
+Persistent Stats Counters
+Lock-free per-thread accumulation, merged on read, made durable with an
+append-only journal and periodic snapshots so totals survive restarts and crashes
+"""
+
+import os
+import json
+import time
+import atexit
+import weakref
+import threading
+
+SNAPSHOT_DB = 'data/stats_snapshot.json'
+JOURNAL_DB = 'data/stats_journal.log'
+
+# Global transfer counters shown on the dashboard and /stats
+STAT_NAMES = [
+    'total_uploads',
+    'total_downloads',
+    'total_size',
+    'total_resumed',
+    'total_compressed',
+    'total_versions'
+]
+
+
+class Counters:
+    def __init__(self, names=STAT_NAMES, snapshot_file=SNAPSHOT_DB, journal_file=JOURNAL_DB,
+                 flush_interval=5, compact_after=1000):
+        self.names = list(names)
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_after = compact_after  # Journal records before a new snapshot
+
+        self._local = threading.local()
+        self._shards = []                   # (thread ref, dict) pairs; each dict written only by its thread
+        self._retired = dict.fromkeys(self.names, 0)  # Folded shards of threads that have exited
+        self._shards_lock = threading.Lock()  # Guards the shard list, never the increments
+        self._flush_lock = threading.Lock()
+
+        self.base = dict.fromkeys(self.names, 0)     # Durable totals as of startup
+        self.flushed = dict.fromkeys(self.names, 0)  # Shard sums already journaled
+        self.seq = 0
+        self.journal_records = 0
+        self.load()
+
+        self._trim_torn_tail()
+        self._journal = open(self.journal_file, 'a')
+        if flush_interval:
+            self.start_flusher(flush_interval)
+            atexit.register(self.flush)
+
+    # ---- hot path ----
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            # Every name is present up front so readers never see the dict resize
+            shard = dict.fromkeys(self.names, 0)
+            with self._shards_lock:
+                self._shards.append((weakref.ref(threading.current_thread()), shard))
+            self._local.shard = shard
+        return shard
+
+    def add(self, name, amount=1):
+        """Add to a counter from the calling thread (no lock taken)"""
+        shard = self._shard()
+        shard[name] += amount
+
+    def reset(self, name):
+        """Bring a counter back to zero (e.g. total_size after clearing all files)"""
+        self.add(name, -self.get(name))
+
+    # ---- reads ----
+
+    def _shard_totals(self):
+        with self._shards_lock:
+            # Fold shards of finished threads so per-request threads don't pile up
+            live = []
+            for thread_ref, shard in self._shards:
+                thread = thread_ref()
+                if thread is None or not thread.is_alive():
+                    for name in self.names:
+                        self._retired[name] += shard[name]
+                else:
+                    live.append((thread_ref, shard))
+            self._shards = live
+            totals = dict(self._retired)
+        for _, shard in live:
+            for name in self.names:
+                totals[name] += shard[name]
+        return totals
+
+    def get(self, name):
+        """Current value of one counter"""
+        return self.snapshot()[name]
+
+    def snapshot(self):
+        """Current value of every counter"""
+        totals = self._shard_totals()
+        return {name: self.base[name] + totals[name] for name in self.names}
+
+    # ---- durability ----
+
+    def load(self):
+        """Rebuild totals from the last snapshot plus newer journal records"""
+        try:
+            if os.path.exists(self.snapshot_file):
+                with open(self.snapshot_file, 'r') as f:
+                    data = json.load(f)
+                self.seq = data.get('seq', 0)
+                for name, value in data.get('counters', {}).items():
+                    if name in self.base:
+                        self.base[name] = value
+        except (OSError, ValueError) as e:
+            print(f"Error loading stats snapshot: {e}")
+
+        if not os.path.exists(self.journal_file):
+            return
+        with open(self.journal_file, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn write from a crash mid-append
+                if record.get('seq', 0) <= self.seq:
+                    continue  # Already folded into the snapshot
+                self.seq = record['seq']
+                self.journal_records += 1
+                for name, delta in record.get('d', {}).items():
+                    if name in self.base:
+                        self.base[name] += delta
+
+    def _trim_torn_tail(self):
+        """Cut a partial last record left by a crash, so the next append starts on its own line"""
+        try:
+            with open(self.journal_file, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                if not size:
+                    return
+                f.seek(max(size - 65536, 0))  # Records are ~100 bytes; the last newline is near the end
+                tail = f.read()
+                if tail.endswith(b'\n'):
+                    return
+                if b'\n' in tail or size <= 65536:
+                    f.truncate(size - len(tail) + tail.rfind(b'\n') + 1)
+                else:
+                    f.write(b'\n')  # No line end in reach: just keep the next record off the torn one
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        """Append what changed since the last flush to the journal (fsynced)"""
+        with self._flush_lock:
+            totals = self._shard_totals()
+            delta = {name: totals[name] - self.flushed[name]
+                     for name in self.names if totals[name] != self.flushed[name]}
+            if not delta:
+                return
+            self.seq += 1
+            self._journal.write(json.dumps({'seq': self.seq, 't': int(time.time()), 'd': delta}) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self.flushed = totals
+            self.journal_records += 1
+
+            if self.journal_records >= self.compact_after:
+                self._compact()
+
+    def _compact(self):
+        """Write a snapshot of the journaled totals, then start a fresh journal"""
+        counters = {name: self.base[name] + self.flushed[name] for name in self.names}
+        temp_file = self.snapshot_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'seq': self.seq, 'counters': counters, 't': int(time.time())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.snapshot_file)
+
+        # Records up to seq are now in the snapshot; replay skips them even if truncation is lost
+        self._journal.close()
+        self._journal = open(self.journal_file, 'w')
+        self.journal_records = 0
+
+    def start_flusher(self, interval):
+        """Journal counter changes in the background every interval seconds"""
+        def flush():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"Error flushing stats counters: {e}")
+
+        threading.Thread(target=flush, daemon=True).start()
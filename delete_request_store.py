@@ -0,0 +1,183 @@
+"""
+Delete Request Store
+Delete requests in SQLite, indexed by status and by file, with batch
+approve/reject in one transaction and cleanup of old resolved requests
+"""
+
+import os
+import time
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+DELETE_REQUESTS_SQLITE_DB = 'data/delete_requests.db'
+RETENTION_DAYS = int(os.environ.get('DELETE_REQUEST_RETENTION_DAYS', 30))
+PURGE_INTERVAL = 3600  # Seconds between retention sweeps
+PAGE_SIZE = 100
+BATCH_LIMIT = 500  # SQLite caps host parameters per statement
+
+
+def _chunks(items, size=BATCH_LIMIT):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class DeleteRequestStore:
+    """Requests table with (status, seq), (filename, status) and resolved_at indexes"""
+
+    def __init__(self, path=DELETE_REQUESTS_SQLITE_DB, retention_days=RETENTION_DAYS):
+        self.path = path
+        self.retention = timedelta(days=retention_days)
+        self._local = threading.local()
+        self.last_purge = 0
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS delete_requests (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'id TEXT UNIQUE, filename TEXT, requester TEXT, reason TEXT, status TEXT, '
+                         'created_at TEXT, approver TEXT, rejection_reason TEXT, resolved_at TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS requests_by_status ON delete_requests (status, seq)')
+            conn.execute('CREATE INDEX IF NOT EXISTS requests_by_file ON delete_requests (filename, status)')
+            conn.execute('CREATE INDEX IF NOT EXISTS requests_resolved ON delete_requests (resolved_at) '
+                         'WHERE resolved_at IS NOT NULL')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def _connect(self):
+        """One connection per thread (and per process, since forks must not share one)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row):
+        """The request as the JSON database stored it"""
+        data = {
+            'filename': row['filename'],
+            'requester': row['requester'],
+            'reason': row['reason'],
+            'status': row['status'],
+            'created_at': row['created_at']
+        }
+        if row['status'] == 'approved':
+            data.update(approver=row['approver'], approved_at=row['resolved_at'])
+        elif row['status'] == 'rejected':
+            data.update(approver=row['approver'], rejection_reason=row['rejection_reason'],
+                        rejected_at=row['resolved_at'])
+        return data
+
+    def migrate(self, requests):
+        """Import the old {request_id: request} JSON database once"""
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+                return 0
+            conn.executemany(
+                'INSERT OR IGNORE INTO delete_requests (id, filename, requester, reason, status, created_at, '
+                'approver, rejection_reason, resolved_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(request_id, r['filename'], r['requester'], r.get('reason', ''), r['status'], r['created_at'],
+                  r.get('approver'), r.get('rejection_reason'), r.get('approved_at') or r.get('rejected_at'))
+                 for request_id, r in sorted(requests.items(), key=lambda item: item[1]['created_at'])])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated', ?)", (str(len(requests)),))
+            return len(requests)
+
+    def create(self, filename, requester, reason=''):
+        """New pending request id (or the requester's existing pending one for this file)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT id FROM delete_requests WHERE filename = ? AND status = 'pending' "
+                               "AND requester = ?", (filename, requester)).fetchone()
+            if row:
+                return row['id']
+            request_id = f"{filename}_{requester}_{int(time.time())}"
+            conn.execute('INSERT INTO delete_requests (id, filename, requester, reason, status, created_at) '
+                         "VALUES (?, ?, ?, ?, 'pending', ?)",
+                         (request_id, filename, requester, reason, datetime.now().isoformat()))
+            return request_id
+
+    def get(self, request_id):
+        row = self._connect().execute('SELECT * FROM delete_requests WHERE id = ?', (request_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, status=None, before=None, limit=PAGE_SIZE):
+        """({request_id: request} newest first, next cursor or None)"""
+        query = 'SELECT * FROM delete_requests WHERE seq < ?'
+        params = [before or 2 ** 62]
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        rows = self._connect().execute(query + ' ORDER BY seq DESC LIMIT ?', params + [limit + 1]).fetchall()
+        requests = {row['id']: self._row(row) for row in rows[:limit]}
+        return requests, rows[limit - 1]['seq'] if len(rows) > limit else None
+
+    def for_file(self, filename, status='pending'):
+        rows = self._connect().execute('SELECT * FROM delete_requests WHERE filename = ? AND status = ?',
+                                       (filename, status)).fetchall()
+        return {row['id']: self._row(row) for row in rows}
+
+    def counts(self):
+        """{status: number of requests}"""
+        return dict(self._connect().execute('SELECT status, COUNT(*) FROM delete_requests GROUP BY status'))
+
+    def approve(self, request_ids, approver, remove_file=None):
+        """Approve pending requests, removing each file once; returns {request_id: filename} approved.
+
+        remove_file(filename) deletes the file and returns True (also when it
+        was already gone); requests whose file could not be removed stay
+        pending. Every other pending request for a removed file is approved
+        along with it, all in one transaction.
+        """
+        now = datetime.now().isoformat()
+        with self._connect() as conn:
+            rows = []
+            for chunk in _chunks(request_ids):
+                rows += conn.execute(
+                    f"SELECT id, filename FROM delete_requests WHERE status = 'pending' "
+                    f"AND id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+            filenames = {row['filename'] for row in rows}
+            removed = {filename for filename in filenames if remove_file is None or remove_file(filename)}
+
+            approved = {}
+            for filename in removed:
+                approved.update((row['id'], filename) for row in conn.execute(
+                    "SELECT id FROM delete_requests WHERE filename = ? AND status = 'pending'", (filename,)))
+                conn.execute("UPDATE delete_requests SET status = 'approved', approver = ?, resolved_at = ? "
+                             "WHERE filename = ? AND status = 'pending'", (approver, now, filename))
+        self.purge_if_due()
+        return approved
+
+    def reject(self, request_ids, approver, reason=''):
+        """Reject pending requests; returns the ids that were rejected"""
+        now = datetime.now().isoformat()
+        rejected = []
+        with self._connect() as conn:
+            for chunk in _chunks(request_ids):
+                placeholders = ','.join('?' * len(chunk))
+                rejected += [row['id'] for row in conn.execute(
+                    f"SELECT id FROM delete_requests WHERE status = 'pending' AND id IN ({placeholders})", chunk)]
+                conn.execute(f"UPDATE delete_requests SET status = 'rejected', approver = ?, rejection_reason = ?, "
+                             f"resolved_at = ? WHERE status = 'pending' AND id IN ({placeholders})",
+                             [approver, reason, now] + chunk)
+        self.purge_if_due()
+        return rejected
+
+    def rename_file(self, old_name, new_name):
+        """Pending requests follow a renamed file"""
+        with self._connect() as conn:
+            conn.execute("UPDATE delete_requests SET filename = ? WHERE filename = ? AND status = 'pending'",
+                         (new_name, old_name))
+
+    def purge(self, now=None):
+        """Drop resolved requests older than the retention window; returns how many"""
+        cutoff = ((now or datetime.now()) - self.retention).isoformat()
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM delete_requests WHERE resolved_at IS NOT NULL AND resolved_at < ?',
+                                (cutoff,)).rowcount
+
+    def purge_if_due(self):
+        if time.time() - self.last_purge >= PURGE_INTERVAL:
+            self.last_purge = time.time()
+            self.purge()
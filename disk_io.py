@@ -0,0 +1,95 @@
+"""
+Disk I/O Offload
+Runs blocking file operations on eventlet's native thread pool with bounded
+concurrency, and samples event loop lag to show the hub stays responsive
+"""
+
+import os
+import time
+import threading
+
+import metrics
+
+try:
+    from eventlet import tpool
+    from eventlet.semaphore import Semaphore
+except ImportError:  # Plain threads (e.g. the desktop app or tests without eventlet)
+    tpool = None
+
+DISK_IO_CONCURRENCY = int(os.environ.get('DISK_IO_CONCURRENCY', 8))
+
+
+class DiskIO:
+    """Offloads blocking calls from greenlets to native threads.
+
+    Only calls made on the hub thread are offloaded: that is where Socket.IO
+    handlers run (no monkey patching), and where a blocking call freezes every
+    connection. At most max_concurrency calls run at once so a burst of chunks
+    can't queue unbounded work on the disk; the rest wait cooperatively.
+    """
+
+    def __init__(self, max_concurrency=DISK_IO_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.gate = Semaphore(max_concurrency) if tpool is not None else None
+        self.in_flight = 0
+        self.waiting = 0
+
+    def run(self, op, func, *args):
+        """func(*args) on a native thread; the calling greenlet yields until it returns"""
+        if self.gate is None or threading.current_thread() is not threading.main_thread():
+            with metrics.disk_io_latency.time((op,)):
+                return func(*args)
+
+        with metrics.disk_io_latency.time((op,)):
+            self.waiting += 1
+            with self.gate:
+                self.waiting -= 1
+                self.in_flight += 1
+                try:
+                    return tpool.execute(func, *args)
+                finally:
+                    self.in_flight -= 1
+
+    def stats(self):
+        return {'max_concurrency': self.max_concurrency, 'in_flight': self.in_flight, 'waiting': self.waiting}
+
+
+class LoopLagMonitor:
+    """Sleeps a fixed interval on the event loop and records how late it wakes up"""
+
+    def __init__(self, interval=0.1, sleep=time.sleep):
+        self.interval = interval
+        self.sleep = sleep  # The event loop's sleep (socketio.sleep under eventlet)
+        self.last = 0
+        self.max = 0
+        self.total = 0
+        self.samples = 0
+
+    def sample(self):
+        start = time.perf_counter()
+        self.sleep(self.interval)
+        lag = max(time.perf_counter() - start - self.interval, 0)
+        metrics.event_loop_lag.observe(lag)
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.samples += 1
+        return lag
+
+    def run(self):
+        while True:
+            self.sample()
+
+    def stats(self):
+        return {
+            'interval_ms': self.interval * 1000,
+            'last_ms': round(self.last * 1000, 2),
+            'max_ms': round(self.max * 1000, 2),
+            'avg_ms': round(self.total / self.samples * 1000, 2) if self.samples else 0,
+            'samples': self.samples
+        }
+
+    def reset(self):
+        self.max = 0
+        self.total = 0
+        self.samples = 0
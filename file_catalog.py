@@ -0,0 +1,169 @@
+"""
+File Catalog Module
+In-memory view of the shared folder, kept in sync on every upload, delete and rename
+so listings, search and stats don't have to rescan the disk
+"""
+
+import os
+import re
+import mimetypes
+from datetime import datetime
+from threading import RLock
+
+# Temp files written by the WebSocket transfer path live in the upload folder
+TEMP_PREFIX = '.upload_'
+
+# A file name, or a relative path into an uploaded folder: no empty, hidden or parent components.
+# Hidden names cover temp files and the trash, so they never show up as shared files.
+SHARED_PATH_PATTERN = r'[^/.][^/]*(?:/[^/.][^/]*)*'
+
+
+def is_shared_path(name):
+    """True if name can address a file inside the shared folder"""
+    return isinstance(name, str) and '\0' not in name and re.fullmatch(SHARED_PATH_PATTERN, name) is not None
+
+
+def walk_files(folder, prefix=''):
+    """Yield (relative name, stat) for every shared file under folder, nested folders included"""
+    try:
+        with os.scandir(folder) as it:
+            for item in it:
+                if item.name.startswith('.'):
+                    continue
+                try:
+                    if item.is_dir(follow_symlinks=False):
+                        yield from walk_files(item.path, f"{prefix}{item.name}/")
+                    elif item.is_file():
+                        yield prefix + item.name, item.stat()
+                except OSError:
+                    continue
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+
+
+def prune_empty_dirs(folder, name):
+    """Remove the folders above a deleted nested file that are now empty"""
+    parent = os.path.dirname(name)
+    while parent:
+        try:
+            os.rmdir(os.path.join(folder, parent))
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+
+class CatalogListener:
+    """Base class for indexes that follow catalog changes"""
+
+    def catalog_reset(self, entries):
+        """Called after a full rescan with every entry in the catalog"""
+
+    def catalog_added(self, filename, entry):
+        """Called when a file appears or its size/mtime changes"""
+
+    def catalog_removed(self, filename, entry):
+        """Called when a file disappears (or before its entry is replaced)"""
+
+
+class FileCatalog:
+    def __init__(self, folder):
+        self.folder = folder
+        self.entries = {}
+        self.lock = RLock()
+        self.listeners = []
+        self.scan()
+
+    def _make_entry(self, filename, st):
+        """Build a catalog entry from an os.stat result"""
+        return {
+            'name': filename,
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'ctime': st.st_ctime,
+            'type': mimetypes.guess_type(filename)[0] or 'unknown'
+        }
+
+    def add_listener(self, listener):
+        """Register an index and seed it with the current entries"""
+        with self.lock:
+            self.listeners.append(listener)
+            listener.catalog_reset(dict(self.entries))
+
+    def scan(self):
+        """Rebuild the catalog with a single walk of the folder tree"""
+        entries = {name: self._make_entry(name, st) for name, st in walk_files(self.folder)}
+
+        with self.lock:
+            self.entries = entries
+            for listener in self.listeners:
+                listener.catalog_reset(dict(entries))
+        return len(entries)
+
+    def refresh(self, filename):
+        """Re-stat a single file after it was written; returns the new entry or None"""
+        filepath = os.path.join(self.folder, filename)
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            self.remove(filename)
+            return None
+
+        entry = self._make_entry(filename, st)
+        with self.lock:
+            previous = self.entries.get(filename)
+            self.entries[filename] = entry
+            for listener in self.listeners:
+                if previous is not None:
+                    listener.catalog_removed(filename, previous)
+                listener.catalog_added(filename, entry)
+        return entry
+
+    def remove(self, filename):
+        """Drop a file from the catalog; returns the removed entry or None"""
+        with self.lock:
+            entry = self.entries.pop(filename, None)
+            if entry is not None:
+                for listener in self.listeners:
+                    listener.catalog_removed(filename, entry)
+        return entry
+
+    def remove_many(self, filenames):
+        """Drop several files under one lock; returns the removed entries"""
+        with self.lock:
+            return [entry for entry in map(self.remove, filenames) if entry is not None]
+
+    def rename(self, old_name, new_name):
+        """Move an entry to a new name without touching the disk"""
+        with self.lock:
+            self.remove(old_name)
+            return self.refresh(new_name)
+
+    def get(self, filename):
+        """Get a catalog entry"""
+        return self.entries.get(filename)
+
+    def __contains__(self, filename):
+        return filename in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def snapshot(self):
+        """Get a copy of all entries (safe to iterate while uploads land)"""
+        with self.lock:
+            return list(self.entries.values())
+
+    def total_size(self):
+        """Get the combined size of all cataloged files"""
+        with self.lock:
+            return sum(entry['size'] for entry in self.entries.values())
+
+    @staticmethod
+    def file_info(entry):
+        """Format an entry the way the listing endpoints return it"""
+        return {
+            'name': entry['name'],
+            'size': entry['size'],
+            'modified': datetime.fromtimestamp(entry['mtime']).strftime('%Y-%m-%d %H:%M:%S'),
+            'type': entry['type']
+        }
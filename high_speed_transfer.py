@@ -12,8 +12,64 @@ import time
 from threading import Lock
 import struct
 
+import metrics
+from disk_io import DiskIO, LoopLagMonitor
+from transfer_trace import transfer_trace
+
+CHUNK_SIZE = 2 * 1024 * 1024  # Socket.IO chunk size; clients size their chunk_count with it
+
+def cleanup_temp_files(upload_folder):
+    """Remove temp files left by interrupted WebSocket uploads"""
+    try:
+        for filename in os.listdir(upload_folder):
+            if filename.startswith('.upload_'):
+                temp_path = os.path.join(upload_folder, filename)
+                print(f"Cleaning up orphaned temp file: {filename}")
+                os.remove(temp_path)
+    except Exception as e:
+        print(f"Error cleaning temp files: {e}")
+
+
+# Blocking file operations, run through DiskIO so they leave the event loop
+
+def _create_temp(path, size):
+    with open(path, 'wb') as f:
+        # Pre-allocate file size if supported (helps with large files)
+        try:
+            f.truncate(size)
+        except OSError:
+            pass  # Not all filesystems support truncate
+
+
+def _write_at(path, offset, data):
+    with open(path, 'r+b', buffering=8192 * 16) as f:  # 128KB buffer
+        f.seek(offset)
+        f.write(data)
+
+
+def _read_at(path, offset, size):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def _remove_if_exists(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
 class HighSpeedTransfer:
-    def __init__(self, app, upload_folder):
+    def __init__(self, app, upload_folder, catalog=None, aggregates=None, perf_logger=None,
+                 message_queue=None, cleanup=True, monitor=True):
+        if message_queue:
+            from eventlet.patcher import is_monkey_patched
+            if not is_monkey_patched('socket'):
+                # The queue listener reads Redis on the hub; unpatched sockets would block every greenlet
+                raise RuntimeError('A Socket.IO message queue needs eventlet.monkey_patch(socket=True, select=True) '
+                                   'before the app is imported (serve_workers.py does this)')
         self.socketio = SocketIO(
             app,
             cors_allowed_origins="*",
@@ -24,41 +80,44 @@ class HighSpeedTransfer:
             logger=False,
             engineio_logger=False,
             async_handlers=True,  # Enable async handling for better throughput
+            message_queue=message_queue,  # Redis URL so emits reach clients of every worker
         )
         self.upload_folder = upload_folder
-        self.active_transfers = {}
+        self.catalog = catalog  # FileCatalog to update when uploads land
+        self.aggregates = aggregates  # DashboardAggregates to record finished transfers
+        self.perf_logger = perf_logger  # PerformanceLogger for transfer-level records
+        self.active_transfers = {}  # Per process: each WebSocket stays on the worker it connected to
+        self.transfers_view = self.get_active_transfers  # What the admin broadcast shows
         self.transfer_lock = Lock()
+        self.disk = DiskIO()  # Chunk reads/writes, renames and deletes run on native threads
+        self.loop_lag = LoopLagMonitor(sleep=self.socketio.sleep)
         
         # Ensure upload folder exists
         os.makedirs(upload_folder, exist_ok=True)
         
-        # Clean up any orphaned temp files from previous sessions
-        self.cleanup_temp_files()
+        # Clean up any orphaned temp files from previous sessions (skipped when other workers may own them)
+        if cleanup:
+            self.cleanup_temp_files()
         
         # Optimized chunk size for network transfer (2MB for balance of speed and reliability)
-        self.CHUNK_SIZE = 2 * 1024 * 1024  # 2MB chunks
+        self.CHUNK_SIZE = CHUNK_SIZE  # 2MB chunks
         self.PARALLEL_CHUNKS = 8  # 8 parallel chunks for faster transfers
         
         self.setup_handlers()
-        self.start_monitoring()
+        self.socketio.start_background_task(self.loop_lag.run)
+        if monitor:
+            self.start_monitoring()
     
     def cleanup_temp_files(self):
         """Remove orphaned temporary upload files"""
-        try:
-            for filename in os.listdir(self.upload_folder):
-                if filename.startswith('.upload_'):
-                    temp_path = os.path.join(self.upload_folder, filename)
-                    print(f"Cleaning up orphaned temp file: {filename}")
-                    os.remove(temp_path)
-        except Exception as e:
-            print(f"Error cleaning temp files: {e}")
+        cleanup_temp_files(self.upload_folder)
     
     def start_monitoring(self):
         """Start background monitoring for admin panel"""
         def broadcast_stats():
             while True:
                 time.sleep(5)  # Update every 5 seconds (reduced from 2)
-                transfers = self.get_active_transfers()
+                transfers = self.transfers_view()
                 if transfers:
                     self.socketio.emit('active_transfers', {
                         'transfers': transfers
@@ -83,15 +142,17 @@ class HighSpeedTransfer:
             with self.transfer_lock:
                 if request.sid in self.active_transfers:
                     transfer = self.active_transfers[request.sid]
-                    # Clean up temp file if it exists
-                    if 'temp_filepath' in transfer:
-                        try:
-                            if os.path.exists(transfer['temp_filepath']):
-                                print(f"Cleaning up temp file: {transfer['temp_filepath']}")
-                                os.remove(transfer['temp_filepath'])
-                        except Exception as e:
-                            print(f"Error cleaning up temp file: {e}")
+                    self._end_trace(transfer, 0, status='disconnected')
                     del self.active_transfers[request.sid]
+                else:
+                    transfer = None
+            # Clean up temp file if it exists (outside the lock: the delete yields to other greenlets)
+            if transfer and 'temp_filepath' in transfer:
+                try:
+                    if self.disk.run('remove', _remove_if_exists, transfer['temp_filepath']):
+                        print(f"Cleaned up temp file: {transfer['temp_filepath']}")
+                except Exception as e:
+                    print(f"Error cleaning up temp file: {e}")
         
         @self.socketio.on('start_upload')
         def handle_start_upload(data):
@@ -106,27 +167,23 @@ class HighSpeedTransfer:
             
             print(f"Starting upload: {filename} ({filesize} bytes, {chunk_count} chunks, permission: {permission})")
             
+            # Create temporary file for streaming chunks
+            temp_file = os.path.join(self.upload_folder, f'.upload_{filename}_{session_id}')
+            self.disk.run('create', _create_temp, temp_file, filesize)
+            
             with self.transfer_lock:
                 self.active_transfers[session_id] = {
                     'filename': filename,
                     'filesize': filesize,
                     'chunk_count': chunk_count,
                     'received_chunks': set(),
-                    'temp_filepath': os.path.join(self.upload_folder, f'.upload_{filename}_{session_id}'),
+                    'temp_filepath': temp_file,
                     'start_time': time.time(),
                     'type': 'upload',
                     'permission': permission,
-                    'allowed_users': allowed_users
+                    'allowed_users': allowed_users,
+                    'trace_id': transfer_trace.start('websocket', 'upload', filename, filesize, self.CHUNK_SIZE)
                 }
-                
-                # Create temporary file for streaming chunks
-                temp_file = self.active_transfers[session_id]['temp_filepath']
-                with open(temp_file, 'wb') as f:
-                    # Pre-allocate file size if supported (helps with large files)
-                    try:
-                        f.truncate(filesize)
-                    except:
-                        pass  # Not all filesystems support truncate
             
             emit('upload_ready', {
                 'session_id': session_id,
@@ -135,9 +192,11 @@ class HighSpeedTransfer:
             })
         
         @self.socketio.on('upload_chunk')
+        @metrics.timed(metrics.chunk_latency, ('upload_chunk',))
         def handle_upload_chunk(data):
             """Receive file chunk and write directly to disk (optimized)"""
             try:
+                received_at = time.time()
                 session_id = request.sid
                 chunk_index = data['chunk_index']
                 chunk_data = data['data']  # Binary data
@@ -152,12 +211,14 @@ class HighSpeedTransfer:
                 temp_filepath = transfer['temp_filepath']
                 offset = chunk_index * self.CHUNK_SIZE
                 
-                # Use buffered writes for better performance
-                with open(temp_filepath, 'r+b', buffering=8192*16) as f:  # 128KB buffer
-                    f.seek(offset)
-                    f.write(chunk_data)
+                # Write on a native thread; other connections keep being served meanwhile
+                write_start = time.perf_counter()
+                self.disk.run('write', _write_at, temp_filepath, offset, chunk_data)
+                transfer_trace.chunk(transfer.get('trace_id'), chunk_index, len(chunk_data), received_at,
+                                     io=time.perf_counter() - write_start)
                 
                 transfer['received_chunks'].add(chunk_index)
+                metrics.transfer_bytes.inc(len(chunk_data), ('websocket', 'in'))
                 
             except Exception as e:
                 print(f"Error in upload_chunk: {e}")
@@ -219,11 +280,11 @@ class HighSpeedTransfer:
             
             filepath = os.path.join(self.upload_folder, filename)
             
-            if not os.path.exists(filepath):
+            try:
+                filesize = self.disk.run('stat', os.path.getsize, filepath)
+            except OSError:
                 emit('error', {'message': 'File not found'})
                 return
-            
-            filesize = os.path.getsize(filepath)
             chunk_count = (filesize + self.CHUNK_SIZE - 1) // self.CHUNK_SIZE
             
             print(f"Starting download: {filename} ({filesize} bytes, {chunk_count} chunks)")
@@ -235,7 +296,8 @@ class HighSpeedTransfer:
                     'filesize': filesize,
                     'chunk_count': chunk_count,
                     'start_time': time.time(),
-                    'type': 'download'
+                    'type': 'download',
+                    'trace_id': transfer_trace.start('websocket', 'download', filename, filesize, self.CHUNK_SIZE)
                 }
             
             emit('download_ready', {
@@ -246,6 +308,7 @@ class HighSpeedTransfer:
             })
         
         @self.socketio.on('request_chunk')
+        @metrics.timed(metrics.chunk_latency, ('request_chunk',))
         def handle_chunk_request(data):
             """Send requested chunk to client"""
             session_id = request.sid
@@ -261,9 +324,12 @@ class HighSpeedTransfer:
             # Read chunk from file
             offset = chunk_index * self.CHUNK_SIZE
             
-            with open(filepath, 'rb') as f:
-                f.seek(offset)
-                chunk_data = f.read(self.CHUNK_SIZE)
+            requested_at = time.time()
+            read_start = time.perf_counter()
+            chunk_data = self.disk.run('read', _read_at, filepath, offset, self.CHUNK_SIZE)
+            transfer_trace.chunk(transfer.get('trace_id'), chunk_index, len(chunk_data), requested_at,
+                                 io=time.perf_counter() - read_start)
+            metrics.transfer_bytes.inc(len(chunk_data), ('websocket', 'out'))
             
             # Calculate actual progress and speed
             progress = ((chunk_index + 1) / transfer['chunk_count']) * 100
@@ -297,6 +363,14 @@ class HighSpeedTransfer:
                 'data': chunk_data,
                 'size': len(chunk_data)
             })
+            
+            if chunk_index == transfer['chunk_count'] - 1:
+                self._end_trace(transfer, transfer['filesize'])
+                if self.aggregates is not None:
+                    self.aggregates.record_download(None, transfer['filesize'], elapsed)
+                if self.perf_logger is not None:
+                    self.perf_logger.log_file_transfer(transfer['filename'], 'download', transfer['filesize'],
+                                                       elapsed, speed_mbps)
         
         @self.socketio.on('cancel_transfer')
         def handle_cancel_transfer():
@@ -305,10 +379,17 @@ class HighSpeedTransfer:
             
             with self.transfer_lock:
                 if session_id in self.active_transfers:
+                    self._end_trace(self.active_transfers[session_id], 0, status='cancelled')
                     del self.active_transfers[session_id]
             
             emit('transfer_cancelled', {'status': 'cancelled'})
     
+    def _end_trace(self, transfer, nbytes, io=0, status='ok'):
+        """Close the transfer's trace once (later calls are ignored)"""
+        trace_id = transfer.pop('trace_id', None)
+        if trace_id is not None:
+            transfer_trace.end(trace_id, nbytes, io, status)
+    
     def finalize_upload(self, session_id):
         """Finalize upload by renaming temp file"""
         try:
@@ -319,18 +400,21 @@ class HighSpeedTransfer:
             permission = transfer.get('permission', 'public')
             allowed_users = transfer.get('allowed_users', '')
             
-            # Rename temp file to final filename
-            if os.path.exists(final_filepath):
-                os.remove(final_filepath)
-            os.rename(temp_filepath, final_filepath)
+            # Rename temp file to final filename (replacing an older upload, which may be huge)
+            rename_start = time.perf_counter()
+            self.disk.run('rename', os.replace, temp_filepath, final_filepath)
+            self._end_trace(transfer, transfer['filesize'], io=time.perf_counter() - rename_start)
+            
+            if self.catalog is not None:
+                self.disk.run('stat', self.catalog.refresh, filename)
             
         except Exception as e:
             print(f"Error finalizing upload: {e}")
             # Clean up temp file on error
             try:
-                if os.path.exists(transfer.get('temp_filepath', '')):
-                    os.remove(transfer['temp_filepath'])
-            except:
+                self._end_trace(transfer, transfer['filesize'], status='error')
+                self.disk.run('remove', _remove_if_exists, transfer['temp_filepath'])
+            except Exception:
                 pass
             return
         
@@ -368,6 +452,12 @@ class HighSpeedTransfer:
             )
         except Exception as e:
             print(f"Error saving file metadata: {e}")
+            username = None
+        
+        if self.aggregates is not None:
+            self.aggregates.record_upload(username, transfer['filesize'], elapsed)
+        if self.perf_logger is not None:
+            self.perf_logger.log_file_transfer(filename, 'upload', transfer['filesize'], elapsed, speed_mbps)
         
         # Send completion notification to the specific client
         print(f"Sending upload_complete to session {session_id}")
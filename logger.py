@@ -1,12 +1,20 @@
 """
 Logging Module for NetShare Pro
-Provides structured logging with rotation, security event tracking, and audit logs
+Provides structured logging with rotation, security event tracking, and audit logs.
+Records are queued by the calling thread and written in batches by one background thread.
 """
 
 import logging
 import logging.handlers
 import os
+import copy
 import json
+import math
+import queue
+import atexit
+import random
+import threading
+from collections import deque
 from datetime import datetime
 from typing import Optional, Dict, Any
 from functools import wraps
@@ -27,9 +35,11 @@ class StructuredFormatter(logging.Formatter):
             'line': record.lineno
         }
         
-        # Add exception info if present
+        # Add exception info if present (already rendered to exc_text when queued)
         if record.exc_info:
             log_data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_data['exception'] = record.exc_text
         
         # Add extra fields
         if hasattr(record, 'user'):
@@ -40,10 +50,155 @@ class StructuredFormatter(logging.Formatter):
             log_data['action'] = record.action
         if hasattr(record, 'resource'):
             log_data['resource'] = record.resource
+        if hasattr(record, 'metrics'):
+            log_data.update(record.metrics)
         
         return json.dumps(log_data)
 
 
+class _DeferredFlush:
+    """Handler mixin: writes stay buffered until the pipeline flushes a whole batch"""
+    
+    def flush(self):
+        pass
+    
+    def flush_batch(self):
+        logging.StreamHandler.flush(self)
+
+
+class BatchRotatingFileHandler(_DeferredFlush, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BatchTimedRotatingFileHandler(_DeferredFlush, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class _PipelineHandler(logging.Handler):
+    """Handler attached to each logger; only enqueues, together with that logger's file handlers"""
+    
+    def __init__(self, pipeline, handlers):
+        super().__init__()
+        self.pipeline = pipeline
+        self.handlers = handlers
+    
+    def emit(self, record):
+        self.pipeline.enqueue(record, self.handlers)
+
+
+class LogPipeline:
+    """Bounded queue between request threads and the log files.
+    
+    When the queue backs up, DEBUG records are shed first, then INFO, so
+    warnings, errors and security events keep headroom; drops are counted per level.
+    """
+    
+    SHED_AT = {logging.DEBUG: 0.75, logging.INFO: 0.9}  # Fraction of maxsize where a level starts dropping
+    
+    def __init__(self, maxsize=10000, batch_size=256):
+        self.queue = queue.Queue(maxsize)
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.routes = {}  # attached logger name -> its file handlers (records carry them on the queue)
+        self.dropped = {}  # level name -> records dropped
+        self.written = 0
+        self.lock = threading.Lock()
+        self.thread = None
+    
+    def is_attached(self, name):
+        return name in self.routes
+    
+    def attach(self, logger, handlers):
+        """Send logger's records through the pipeline to handlers"""
+        with self.lock:
+            if logger.name in self.routes:
+                return
+            self.routes[logger.name] = handlers
+            logger.addHandler(_PipelineHandler(self, handlers))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='log-pipeline', daemon=True)
+                self.thread.start()
+                atexit.register(self.stop)
+    
+    def enqueue(self, record, handlers):
+        """Queue a record for handlers without blocking (dropped and counted if over the level's limit).
+        
+        The handlers travel with the record: one from a child logger (e.g.
+        netshare.security.x) propagates here under its own name.
+        """
+        limit = self.SHED_AT.get(record.levelno)
+        if limit is not None and self.queue.qsize() >= self.maxsize * limit:
+            self._drop(record)
+            return
+        try:
+            self.queue.put_nowait((self._prepare(record), handlers))
+        except queue.Full:
+            self._drop(record)
+    
+    def _drop(self, record):
+        with self.lock:
+            self.dropped[record.levelname] = self.dropped.get(record.levelname, 0) + 1
+    
+    @staticmethod
+    def _prepare(record):
+        # Resolve the message and traceback now; JSON formatting happens on the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            touched = set()
+            stop = False
+            for item in batch:
+                if item is None:
+                    stop = True
+                    continue
+                record, handlers = item
+                for handler in handlers:
+                    if record.levelno >= handler.level:
+                        try:
+                            handler.handle(record)
+                        except Exception:
+                            handler.handleError(record)
+                        touched.add(handler)
+            for handler in touched:
+                getattr(handler, 'flush_batch', handler.flush)()
+            with self.lock:
+                self.written += len(batch) - stop
+            if stop:
+                return
+    
+    def stop(self, timeout=5):
+        """Write out everything queued so far and stop the writer thread"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+    
+    def stats(self):
+        """Queue depth plus written and dropped record counts"""
+        with self.lock:
+            return {'queued': self.queue.qsize(), 'written': self.written, 'dropped': dict(self.dropped)}
+
+
+log_pipeline = LogPipeline(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+
+
 class SecurityLogger:
     """Security event logger"""
     
@@ -54,13 +209,14 @@ class SecurityLogger:
         self.logger.setLevel(logging.INFO)
         
         # Security log file with rotation
-        security_handler = logging.handlers.RotatingFileHandler(
-            os.path.join(log_dir, 'security.log'),
-            maxBytes=10 * 1024 * 1024,  # 10MB
-            backupCount=10
-        )
-        security_handler.setFormatter(StructuredFormatter())
-        self.logger.addHandler(security_handler)
+        if not log_pipeline.is_attached(self.logger.name):
+            security_handler = BatchRotatingFileHandler(
+                os.path.join(log_dir, 'security.log'),
+                maxBytes=10 * 1024 * 1024,  # 10MB
+                backupCount=10
+            )
+            security_handler.setFormatter(StructuredFormatter())
+            log_pipeline.attach(self.logger, [security_handler])
     
     def _log_event(self, level: str, event_type: str, message: str, **kwargs):
         """Log security event with context"""
@@ -212,31 +368,33 @@ class ApplicationLogger:
         self.logger = logging.getLogger(name)
         self.logger.setLevel(getattr(logging, log_level.upper()))
         
+        if log_pipeline.is_attached(self.logger.name):
+            return
+        
         # Console handler
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         ))
-        self.logger.addHandler(console_handler)
         
         # File handler with rotation
-        file_handler = logging.handlers.RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             os.path.join(log_dir, 'netshare.log'),
             maxBytes=10 * 1024 * 1024,  # 10MB
             backupCount=10
         )
         file_handler.setFormatter(StructuredFormatter())
-        self.logger.addHandler(file_handler)
         
         # Error log
-        error_handler = logging.handlers.RotatingFileHandler(
+        error_handler = BatchRotatingFileHandler(
             os.path.join(log_dir, 'errors.log'),
             maxBytes=10 * 1024 * 1024,  # 10MB
             backupCount=5
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(StructuredFormatter())
-        self.logger.addHandler(error_handler)
+        
+        log_pipeline.attach(self.logger, [console_handler, file_handler, error_handler])
     
     def debug(self, message: str, **kwargs):
         """Log debug message"""
@@ -269,14 +427,15 @@ class AuditLogger:
         self.logger.setLevel(logging.INFO)
         
         # Daily rotating audit log
-        audit_handler = logging.handlers.TimedRotatingFileHandler(
-            os.path.join(log_dir, 'audit.log'),
-            when='midnight',
-            interval=1,
-            backupCount=365  # Keep 1 year of audit logs
-        )
-        audit_handler.setFormatter(StructuredFormatter())
-        self.logger.addHandler(audit_handler)
+        if not log_pipeline.is_attached(self.logger.name):
+            audit_handler = BatchTimedRotatingFileHandler(
+                os.path.join(log_dir, 'audit.log'),
+                when='midnight',
+                interval=1,
+                backupCount=365  # Keep 1 year of audit logs
+            )
+            audit_handler.setFormatter(StructuredFormatter())
+            log_pipeline.attach(self.logger, [audit_handler])
     
     def log_event(self, event_type: str, details: Dict[str, Any]):
         """Log audit event"""
@@ -292,22 +451,32 @@ class AuditLogger:
 
 # Performance logger
 class PerformanceLogger:
-    """Logger for performance metrics"""
+    """Logger for performance metrics with a rolling per-route latency summary"""
     
-    def __init__(self, log_dir='logs'):
+    def __init__(self, log_dir='logs', sample_rate=None, slow_ms=None, window=1000):
         os.makedirs(log_dir, exist_ok=True)
         
         self.logger = logging.getLogger('performance')
         self.logger.setLevel(logging.INFO)
         
         # Performance log with rotation
-        perf_handler = logging.handlers.RotatingFileHandler(
-            os.path.join(log_dir, 'performance.log'),
-            maxBytes=50 * 1024 * 1024,  # 50MB
-            backupCount=5
-        )
-        perf_handler.setFormatter(StructuredFormatter())
-        self.logger.addHandler(perf_handler)
+        if not log_pipeline.is_attached(self.logger.name):
+            perf_handler = BatchRotatingFileHandler(
+                os.path.join(log_dir, 'performance.log'),
+                maxBytes=50 * 1024 * 1024,  # 50MB
+                backupCount=5
+            )
+            perf_handler.setFormatter(StructuredFormatter())
+            log_pipeline.attach(self.logger, [perf_handler])
+        
+        # Sampling: this fraction of requests is written to the log; slow requests and errors always are
+        self.sample_rate = float(os.environ.get('PERF_SAMPLE_RATE', 1.0)) if sample_rate is None else sample_rate
+        self.slow_ms = float(os.environ.get('PERF_SLOW_MS', 1000)) if slow_ms is None else slow_ms
+        
+        # Rolling summary: last `window` durations per (method, endpoint) plus running totals
+        self.window = window
+        self.routes = {}
+        self.lock = threading.Lock()
     
     def log_request(self, endpoint: str, method: str, duration_ms: float, status_code: int, **kwargs):
         """Log HTTP request performance"""
@@ -318,7 +487,55 @@ class PerformanceLogger:
             'status_code': status_code,
             **kwargs
         }
-        self.logger.info(f"{method} {endpoint} {status_code} {duration_ms:.2f}ms", extra=extra)
+        self.logger.info(f"{method} {endpoint} {status_code} {duration_ms:.2f}ms", extra={'metrics': extra})
+    
+    def record_request(self, endpoint: str, method: str, duration_ms: float, status_code: int,
+                       bytes_in: int = 0, bytes_out: int = 0):
+        """Add a request to the rolling summary and log it if sampled"""
+        key = (method, endpoint)
+        with self.lock:
+            route = self.routes.get(key)
+            if route is None:
+                route = self.routes[key] = {
+                    'durations': deque(maxlen=self.window),
+                    'count': 0, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0
+                }
+            route['durations'].append(duration_ms)
+            route['count'] += 1
+            route['errors'] += status_code >= 500
+            route['bytes_in'] += bytes_in
+            route['bytes_out'] += bytes_out
+        
+        if duration_ms >= self.slow_ms or status_code >= 500 or random.random() < self.sample_rate:
+            self.log_request(endpoint, method, duration_ms, status_code,
+                             bytes_in=bytes_in, bytes_out=bytes_out)
+    
+    def summary(self):
+        """p50/p95/p99 per route over the rolling window, slowest p95 first"""
+        with self.lock:
+            routes = [(key, sorted(route['durations']), dict(route)) for key, route in self.routes.items()]
+        
+        rows = []
+        for (method, endpoint), durations, route in routes:
+            rows.append({
+                'method': method,
+                'endpoint': endpoint,
+                'count': route['count'],
+                'errors': route['errors'],
+                'p50_ms': round(_percentile(durations, 50), 2),
+                'p95_ms': round(_percentile(durations, 95), 2),
+                'p99_ms': round(_percentile(durations, 99), 2),
+                'max_ms': round(durations[-1], 2),
+                'bytes_in': route['bytes_in'],
+                'bytes_out': route['bytes_out']
+            })
+        rows.sort(key=lambda row: row['p95_ms'], reverse=True)
+        return rows
+    
+    def reset(self):
+        """Clear the rolling summary"""
+        with self.lock:
+            self.routes = {}
     
     def log_file_transfer(self, filename: str, operation: str, size: int, duration_s: float, speed_mbps: float):
         """Log file transfer performance"""
@@ -329,7 +546,15 @@ class PerformanceLogger:
             'duration_s': round(duration_s, 2),
             'speed_mbps': round(speed_mbps, 2)
         }
-        self.logger.info(f"Transfer {operation}: {filename} at {speed_mbps:.2f} Mbps", extra=extra)
+        self.logger.info(f"Transfer {operation}: {filename} at {speed_mbps:.2f} Mbps", extra={'metrics': extra})
+
+
+def _percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = math.ceil(percent / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
 
 
 # Decorator for logging function calls
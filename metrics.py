@@ -0,0 +1,227 @@
+"""
+Metrics Module
+Minimal in-process Prometheus instrumentation (counters, gauges, histograms)
+cheap enough for the chunk transfer hot path
+"""
+
+import hmac
+import time
+import threading
+from functools import wraps
+from bisect import bisect_left
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+
+# Latency buckets in seconds (1 ms .. 30 s)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Event loop lag buckets in seconds (0.5 ms .. 5 s)
+LAG_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, labels=()):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        for labels, value in items:
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """Value computed at scrape time by a callback returning {label values: value} or a number"""
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        self.kind = kind  # 'counter' for totals kept elsewhere (e.g. counters.Counters)
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return
+        if not isinstance(values, dict):
+            values = {(): values}
+        for labels, value in values.items():
+            if not isinstance(labels, tuple):
+                labels = (labels,)
+            yield self.name + _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Bucketed distribution with sum and count, optionally split by labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.bounds, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.bounds) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, labels=()):
+        """Context manager observing the elapsed wall time"""
+        return _Timer(self, labels)
+
+    def samples(self):
+        with self.lock:
+            items = [(labels, list(series)) for labels, series in self.series.items()]
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.bounds + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield self.name + '_bucket' + _format_labels(self.labelnames, labels, ('le', bound)), cumulative
+            yield self.name + '_sum' + _format_labels(self.labelnames, labels), round(series[-1], 6)
+            yield self.name + '_count' + _format_labels(self.labelnames, labels), cumulative
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+
+def timed(histogram, labels=()):
+    """Decorator observing a function's wall time in histogram"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, callback, labelnames=(), kind='gauge'):
+        return self.register(Gauge(name, documentation, callback, labelnames, kind))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Global registry and the instruments shared across modules
+registry = Registry()
+
+request_latency = registry.histogram(
+    'netshare_http_request_duration_seconds',
+    'HTTP request handling time until the response starts, by route',
+    ('method', 'route', 'status'))
+transfer_bytes = registry.counter(
+    'netshare_transfer_bytes_total',
+    'Bytes received and sent, by transport and direction',
+    ('transport', 'direction'))
+chunk_latency = registry.histogram(
+    'netshare_chunk_handler_seconds',
+    'WebSocket chunk handler time (disk I/O included)',
+    ('event',))
+metadata_save_latency = registry.histogram(
+    'netshare_metadata_save_seconds',
+    'Time to rewrite a JSON database file',
+    ('db',))
+disk_io_latency = registry.histogram(
+    'netshare_disk_io_seconds',
+    'Disk operations offloaded from the event loop, by operation (queueing included)',
+    ('op',))
+event_loop_lag = registry.histogram(
+    'netshare_event_loop_lag_seconds',
+    'How late the event loop woke a sleeping timer (blocking work in a handler delays it)',
+    buckets=LAG_BUCKETS)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def token_matches(authorization, token):
+    """True if an Authorization header carries the scrape token (never for an empty token)"""
+    return bool(token) and hmac.compare_digest((authorization or '').encode(), f"Bearer {token}".encode())
+
+
+def start_server(port, host='127.0.0.1', token=None):
+    """Serve /metrics on a separate port from a background thread (token required when given)"""
+    def app(environ, start_response):
+        if token and not token_matches(environ.get('HTTP_AUTHORIZATION'), token):
+            start_response('401 Unauthorized', [('Content-Type', 'text/plain'), ('WWW-Authenticate', 'Bearer')])
+            return [b'Unauthorized\n']
+        body = registry.render().encode('utf-8')
+        start_response('200 OK', [('Content-Type', CONTENT_TYPE), ('Content-Length', str(len(body)))])
+        return [body]
+
+    server = make_server(host, port, app, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,171 @@
+"""
+Network Discovery
+Finds devices on the local subnet in the background with non-blocking TCP
+probes and the kernel ARP cache, and keeps the latest results with a TTL
+"""
+
+import os
+import time
+import errno
+import socket
+import selectors
+import threading
+import ipaddress
+
+ARP_TABLE = '/proc/net/arp'
+DISCOVERY_PREFIX = int(os.environ.get('NETWORK_DISCOVERY_PREFIX', 24))
+MIN_PREFIX = 20  # Wider subnets are narrowed to the /20 around this host (4094 hosts)
+
+# connect() outcomes that prove a host answered (a refusal is a TCP reset from a live host)
+ALIVE_ERRORS = {0, errno.ECONNREFUSED}
+
+
+def read_arp_table(path=ARP_TABLE):
+    """{ip: mac} of complete entries in the kernel ARP cache ({} where there is none)"""
+    entries = {}
+    try:
+        with open(path) as f:
+            next(f, None)  # Header
+            for line in f:
+                fields = line.split()
+                # IP address, HW type, Flags, HW address, Mask, Device; flag 0x2 = complete
+                if len(fields) >= 4 and int(fields[2], 16) & 0x2 and fields[3] != '00:00:00:00:00:00':
+                    entries[fields[0]] = fields[3]
+    except (OSError, ValueError):
+        pass
+    return entries
+
+
+def subnet_hosts(local_ip, prefix=DISCOVERY_PREFIX):
+    """Every host address of the subnet around local_ip, except local_ip itself"""
+    net = ipaddress.ip_network(f"{local_ip}/{max(prefix, MIN_PREFIX)}", strict=False)
+    if net.network_address.is_loopback:
+        return []  # Not connected to a network
+    return [str(ip) for ip in net.hosts() if str(ip) != local_ip]
+
+
+def probe_hosts(hosts, port, timeout=0.5, concurrency=128):
+    """Non-blocking connects to port on every host, at most concurrency in flight.
+
+    Returns {ip: True if port is open, False if the host refused}; hosts that
+    stay silent are left out. Runs in the calling thread without forking.
+    """
+    results = {}
+    pending = list(reversed(hosts))
+    selector = selectors.DefaultSelector()
+    deadlines = {}
+    try:
+        while pending or deadlines:
+            while pending and len(deadlines) < concurrency:
+                ip = pending.pop()
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                code = sock.connect_ex((ip, port))
+                if code in ALIVE_ERRORS:
+                    results[ip] = code == 0
+                    sock.close()
+                elif code in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                    selector.register(sock, selectors.EVENT_WRITE, ip)
+                    deadlines[sock] = time.monotonic() + timeout
+                else:
+                    sock.close()  # Unreachable
+            for key, _ in selector.select(timeout=0.05):
+                code = key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if code in ALIVE_ERRORS:
+                    results[key.data] = code == 0
+                selector.unregister(key.fileobj)
+                deadlines.pop(key.fileobj)
+                key.fileobj.close()
+            now = time.monotonic()
+            for sock in [s for s, deadline in deadlines.items() if deadline <= now]:
+                selector.unregister(sock)
+                deadlines.pop(sock)
+                sock.close()
+    finally:
+        for sock in deadlines:
+            sock.close()
+        selector.close()
+    return results
+
+
+class NetworkDiscovery:
+    """Background sweeps of the subnet; requests read the latest snapshot instantly"""
+
+    def __init__(self, address, port, interval=60, ttl=300, timeout=0.5, concurrency=128):
+        self.address = address  # ServerAddress: the subnet follows the current interface
+        self.port = port
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.devices = {}  # ip -> {'ip', 'mac', 'netshare', 'last_seen'}
+        self.scanned_at = None
+        self.scanning = False
+        self.version = 0  # Bumped whenever the set of devices changes
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start sweeping (idempotent); the first request starts it so idle servers never scan"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='network-discovery', daemon=True)
+                self.thread.start()
+
+    def refresh(self):
+        """Ask for a sweep now instead of at the next interval"""
+        self.start()
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error scanning network: {e}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def sweep(self):
+        local_ip = self.address.snapshot()[0]
+        self.scanning = True
+        try:
+            hosts = subnet_hosts(local_ip)
+            probed = probe_hosts(hosts, self.port, self.timeout, self.concurrency)
+            # The probes also made the kernel resolve every live neighbour, even ones that drop TCP
+            arp = read_arp_table()
+        finally:
+            self.scanning = False
+        self.update(local_ip, set(hosts), probed, arp)
+
+    def update(self, local_ip, hosts, probed, arp):
+        """Merge one sweep's results and expire devices not seen within the TTL"""
+        now = time.time()
+        seen = {ip: {'ip': ip, 'mac': arp.get(ip), 'netshare': probed.get(ip, False), 'last_seen': now}
+                for ip in set(probed) | (set(arp) & hosts)}
+        seen[local_ip] = {'ip': local_ip, 'mac': None, 'netshare': True, 'last_seen': now}
+        with self.lock:
+            before = set(self.devices)
+            for ip, device in seen.items():
+                if device['mac'] is None and ip in self.devices:
+                    device['mac'] = self.devices[ip]['mac']
+                self.devices[ip] = device
+            for ip in [ip for ip, d in self.devices.items() if now - d['last_seen'] > self.ttl]:
+                del self.devices[ip]
+            if set(self.devices) != before:
+                self.version += 1
+            self.scanned_at = now
+
+    def snapshot(self):
+        local_ip = self.address.snapshot()[0]
+        with self.lock:
+            details = sorted(self.devices.values(), key=lambda d: ipaddress.ip_address(d['ip']))
+            return {
+                'devices': [d['ip'] for d in details],
+                'details': [dict(d) for d in details],
+                'local_ip': local_ip,
+                'scanned_at': self.scanned_at,
+                'scanning': self.scanning or self.scanned_at is None,
+                'version': self.version
+            }
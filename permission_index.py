@@ -0,0 +1,155 @@
+"""
+Permission Index
+Precomputed per-user visibility so listings and stats don't call can_access_file per file
+"""
+
+from collections import defaultdict
+from threading import RLock
+
+from file_catalog import CatalogListener
+
+
+class PermissionIndex(CatalogListener):
+    def __init__(self):
+        self.lock = RLock()
+        self.rules = {}                     # filename -> (owner, permission, allowed_users) from metadata
+        self.sizes = {}                     # filename -> size, for cataloged files only
+        self.public = set()                 # cataloged files anyone can see
+        self.non_public = set()             # cataloged private/restricted files
+        self.owned = defaultdict(set)       # owner -> cataloged files they own
+        self.granted = defaultdict(set)     # user -> restricted files shared with them
+        self.public_totals = [0, 0]         # [count, bytes] of public files
+        self.user_totals = defaultdict(lambda: [0, 0])  # user -> [count, bytes] of non-public files they see
+        self.all_totals = [0, 0]            # [count, bytes] of every cataloged file
+
+    # ---- contribution bookkeeping ----
+
+    def _rule(self, filename):
+        # Legacy files without metadata are public
+        return self.rules.get(filename, (None, 'public', frozenset()))
+
+    def _viewers(self, rule):
+        """Users who can see a non-public file"""
+        owner, permission, allowed = rule
+        if permission == 'restricted':
+            return set(allowed) | {owner}
+        if permission == 'private':
+            return {owner}
+        return set()  # Unknown permission types are visible to nobody
+
+    def _apply(self, filename, sign):
+        """Add (sign=1) or remove (sign=-1) a cataloged file's contribution"""
+        size = self.sizes[filename]
+        owner, permission, allowed = rule = self._rule(filename)
+        members = set.add if sign > 0 else set.discard
+
+        self.all_totals[0] += sign
+        self.all_totals[1] += sign * size
+        if owner is not None:
+            members(self.owned[owner], filename)
+
+        if permission == 'public':
+            members(self.public, filename)
+            self.public_totals[0] += sign
+            self.public_totals[1] += sign * size
+            return
+
+        members(self.non_public, filename)
+        if permission == 'restricted':
+            for user in allowed:
+                members(self.granted[user], filename)
+        for user in self._viewers(rule):
+            totals = self.user_totals[user]
+            totals[0] += sign
+            totals[1] += sign * size
+
+    # ---- catalog maintenance ----
+
+    def catalog_reset(self, entries):
+        with self.lock:
+            self.sizes = {}
+            self.public = set()
+            self.non_public = set()
+            self.owned = defaultdict(set)
+            self.granted = defaultdict(set)
+            self.public_totals = [0, 0]
+            self.user_totals = defaultdict(lambda: [0, 0])
+            self.all_totals = [0, 0]
+            for filename, entry in entries.items():
+                self.sizes[filename] = entry['size']
+                self._apply(filename, 1)
+
+    def catalog_added(self, filename, entry):
+        with self.lock:
+            if filename in self.sizes:
+                self._apply(filename, -1)
+            self.sizes[filename] = entry['size']
+            self._apply(filename, 1)
+
+    def catalog_removed(self, filename, entry):
+        with self.lock:
+            if filename in self.sizes:
+                self._apply(filename, -1)
+                del self.sizes[filename]
+
+    # ---- metadata maintenance ----
+
+    def metadata_changed(self, filename, metadata):
+        """AuthSystem metadata listener (metadata is None when removed)"""
+        with self.lock:
+            cataloged = filename in self.sizes
+            if cataloged:
+                self._apply(filename, -1)
+            if metadata is None:
+                self.rules.pop(filename, None)
+            else:
+                self.rules[filename] = (
+                    metadata.get('owner'),
+                    metadata.get('permission', 'public'),
+                    frozenset(metadata.get('allowed_users', []))
+                )
+            if cataloged:
+                self._apply(filename, 1)
+
+    def load_metadata(self, file_metadata):
+        """Seed rules from the full metadata table"""
+        with self.lock:
+            for filename, metadata in file_metadata.items():
+                self.metadata_changed(filename, metadata)
+
+    # ---- queries ----
+
+    def hidden_files(self, username):
+        """Cataloged files this user may not see (empty for anonymous callers, as before)"""
+        if username is None:
+            return set()
+        with self.lock:
+            return self.non_public - self.owned.get(username, set()) - self.granted.get(username, set())
+
+    def visible_files(self, username):
+        """Cataloged files this user may see"""
+        with self.lock:
+            if username is None:
+                return set(self.sizes)
+            return (self.public
+                    | (self.owned.get(username, set()) & self.non_public)
+                    | self.granted.get(username, set()))
+
+    def can_access(self, filename, username):
+        """Same answer as AuthSystem.can_access_file for a cataloged file"""
+        with self.lock:
+            rule = self._rule(filename)
+            return rule[1] == 'public' or username in self._viewers(rule)
+
+    def totals(self, username):
+        """(file count, total bytes) visible to a user"""
+        with self.lock:
+            if username is None:
+                return tuple(self.all_totals)
+            own = self.user_totals.get(username, (0, 0))
+            return self.public_totals[0] + own[0], self.public_totals[1] + own[1]
+
+    def owned_count(self, username):
+        """Number of cataloged files a user owns"""
+        with self.lock:
+            return len(self.owned.get(username, ()))
@@ -0,0 +1,172 @@
+"""
+Profiler Module
+On-demand statistical sampling of every thread's stack (collapsed-stack output
+for flamegraph.pl / speedscope) and tracemalloc snapshot diffs for memory growth
+"""
+
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+
+MAX_PROFILE_SECONDS = 120
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples sys._current_frames() from a background thread.
+
+    Runs asynchronously so the request that starts it never blocks the server
+    (under eventlet a blocking handler would stall the very code being profiled).
+    Greenlets are seen while they run on a thread, which is where CPU time goes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stacks = Counter()
+        self.samples = 0
+        self.running = False
+        self.started = None
+        self.finished = None
+        self.seconds = 0
+        self.interval = 0
+
+    def start(self, seconds=10, interval=0.005):
+        """Begin sampling for seconds; False if a run is already in progress"""
+        with self.lock:
+            if self.running:
+                return False
+            self.running = True
+            self.stacks = Counter()
+            self.samples = 0
+            self.started = time.time()
+            self.finished = None
+            self.seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+            self.interval = max(interval, 0.001)
+        threading.Thread(target=self._run, name='sampling-profiler', daemon=True).start()
+        return True
+
+    def _run(self):
+        me = threading.get_ident()
+        deadline = time.perf_counter() + self.seconds
+        try:
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+                time.sleep(self.interval)
+        finally:
+            with self.lock:
+                self.running = False
+                self.finished = time.time()
+
+    def status(self):
+        return {
+            'running': self.running,
+            'started': self.started,
+            'finished': self.finished,
+            'seconds': self.seconds,
+            'interval': self.interval,
+            'samples': self.samples
+        }
+
+    def collapsed(self):
+        """One 'frame;frame;frame count' line per distinct stack (flamegraph input)"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit=30):
+        """Functions by self samples (leaf frame) and total samples (anywhere on the stack)"""
+        own = Counter()
+        total = Counter()
+        for stack, count in list(self.stacks.items()):
+            frames = stack.split(';')[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = max(sum(self.stacks.values()), 1)
+        return [{
+            'function': frame,
+            'self_samples': count,
+            'self_percent': round(count * 100 / samples, 1),
+            'total_percent': round(total[frame] * 100 / samples, 1)
+        } for frame, count in own.most_common(limit)]
+
+
+def deep_size(obj, seen=None):
+    """Approximate bytes held by a container and everything it references"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in list(obj))
+    return size
+
+
+class MemoryTracker:
+    """tracemalloc baseline and diff, plus sizes of watched in-memory structures"""
+
+    def __init__(self, watched=None):
+        self.watched = watched or {}  # name -> callable returning the object
+        self.baseline = None
+        self.started_tracing = False
+
+    def start(self, frames=10):
+        """Start tracing (if needed) and take the baseline snapshot"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            self.started_tracing = True
+        self.baseline = tracemalloc.take_snapshot()
+
+    def stop(self):
+        if self.started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.started_tracing = False
+        self.baseline = None
+
+    def watched_sizes(self):
+        sizes = {}
+        for name, getter in self.watched.items():
+            obj = getter()
+            sizes[name] = {'items': len(obj), 'bytes': deep_size(obj)}
+        return sizes
+
+    def diff(self, limit=25):
+        """Top allocation growth by source line since the baseline"""
+        if self.baseline is None or not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ])
+        stats = snapshot.compare_to(self.baseline, 'lineno')
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'growth': [{
+                'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                'size_diff': stat.size_diff,
+                'size': stat.size,
+                'count_diff': stat.count_diff
+            } for stat in stats[:limit]]
+        }
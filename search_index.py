@@ -0,0 +1,293 @@
+"""
+Filename Search Index
+Trigram index over the file catalog with prefix, substring and typo-tolerant matching
+"""
+
+import re
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict, Counter
+from threading import RLock
+
+from file_catalog import CatalogListener
+
+# Boundary markers so short names and prefixes still produce trigrams
+START = '\x02'
+END = '\x03'
+
+# Result tiers (lower ranks first)
+TIER_EXACT = 0
+TIER_PREFIX = 1
+TIER_TOKEN_PREFIX = 2
+TIER_SUBSTRING = 3
+TIER_FUZZY = 4
+
+TOKEN_SPLIT = re.compile(r'[^0-9a-z]+')
+
+# Vocabulary tokens checked with edit distance per typo-tolerant query
+FUZZY_CANDIDATES = 200
+
+
+def trigrams(text):
+    """Get the set of trigrams of an already-lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def padded_trigrams(text):
+    """Get trigrams of a string with start/end markers"""
+    return trigrams(START + text + END)
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein distance, bailing out early once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_row = None
+    row = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before = previous_row
+        previous_row = row
+        row = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if before is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                row[j] = min(row[j], before[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+def allowed_typos(query):
+    """How many edits a query of this length tolerates"""
+    if len(query) < 4:
+        return 0
+    if len(query) < 8:
+        return 1
+    return 2
+
+
+class SearchIndex(CatalogListener):
+    def __init__(self, permissions=None):
+        self.lock = RLock()
+        self.permissions = permissions      # PermissionIndex used to filter results
+        self.docs = {}                      # filename -> {'lower', 'tokens', 'mtime', 'entry'}
+        self.grams = defaultdict(set)       # trigram -> {filename}
+        self.sorted_names = []              # sorted (lower, filename) pairs for prefix lookups
+        self.token_files = defaultdict(set) # token -> {filename}
+        self.sorted_tokens = []             # sorted distinct tokens for token-prefix lookups
+        self.token_grams = defaultdict(set) # trigram -> {token}, for typo-tolerant lookups
+
+    # ---- catalog maintenance ----
+
+    def catalog_reset(self, entries):
+        with self.lock:
+            self.docs = {}
+            self.grams = defaultdict(set)
+            self.sorted_names = []
+            self.token_files = defaultdict(set)
+            self.sorted_tokens = []
+            self.token_grams = defaultdict(set)
+            for filename, entry in entries.items():
+                self._add(filename, entry, keep_sorted=False)
+            self.sorted_names.sort()
+            self.sorted_tokens = sorted(self.token_files)
+
+    def catalog_added(self, filename, entry):
+        with self.lock:
+            self._add(filename, entry)
+
+    def catalog_removed(self, filename, entry):
+        with self.lock:
+            doc = self.docs.pop(filename, None)
+            if doc is None:
+                return
+            for gram in padded_trigrams(doc['lower']):
+                postings = self.grams.get(gram)
+                if postings is not None:
+                    postings.discard(filename)
+                    if not postings:
+                        del self.grams[gram]
+            _remove_sorted(self.sorted_names, (doc['lower'], filename))
+
+            for token in doc['tokens']:
+                files = self.token_files.get(token)
+                if files is None:
+                    continue
+                files.discard(filename)
+                if files:
+                    continue
+                # Last file using this token: drop it from the vocabulary
+                del self.token_files[token]
+                _remove_sorted(self.sorted_tokens, token)
+                for gram in padded_trigrams(token):
+                    tokens = self.token_grams.get(gram)
+                    if tokens is not None:
+                        tokens.discard(token)
+                        if not tokens:
+                            del self.token_grams[gram]
+
+    def _add(self, filename, entry, keep_sorted=True):
+        if filename in self.docs:
+            self.catalog_removed(filename, entry)
+
+        lower = filename.lower()
+        tokens = set(t for t in TOKEN_SPLIT.split(lower) if t)
+        self.docs[filename] = {
+            'lower': lower,
+            'tokens': tokens,
+            'mtime': entry['mtime'],
+            'entry': entry
+        }
+        for gram in padded_trigrams(lower):
+            self.grams[gram].add(filename)
+
+        for token in tokens:
+            if token not in self.token_files:
+                if keep_sorted:
+                    insort(self.sorted_tokens, token)
+                for gram in padded_trigrams(token):
+                    self.token_grams[gram].add(token)
+            self.token_files[token].add(filename)
+
+        if keep_sorted:
+            insort(self.sorted_names, (lower, filename))
+        else:
+            self.sorted_names.append((lower, filename))
+
+    # ---- queries ----
+
+    def _prefix_matches(self, query):
+        """(exact, prefix) name sets, via binary search over the sorted names"""
+        names = self.sorted_names
+        start = bisect_left(names, (query,))
+        end = bisect_left(names, (query + '\U0010ffff',), start)
+        split = start
+        while split < end and names[split][0] == query:
+            split += 1
+        return ({f for _, f in names[start:split]},
+                {f for _, f in names[split:end]})
+
+    def _token_prefix_matches(self, query):
+        """Names with any token starting with query"""
+        matches = set()
+        start = bisect_left(self.sorted_tokens, query)
+        for i in range(start, len(self.sorted_tokens)):
+            token = self.sorted_tokens[i]
+            if not token.startswith(query):
+                break
+            matches |= self.token_files[token]
+        return matches
+
+    def _substring_candidates(self, query):
+        """Names sharing every trigram of the query (smallest posting list first)"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            # Two-character query: any trigram containing it, incl. boundary ones
+            matches = set()
+            for gram, postings in self.grams.items():
+                if query in gram:
+                    matches |= postings
+            return matches
+
+        postings = sorted((self.grams.get(g, ()) for g in query_grams), key=len)
+        if not postings[0]:
+            return set()
+        return set(postings[0]).intersection(*postings[1:])
+
+    def _fuzzy_matches(self, query, exclude):
+        """Names with a token within a few edits of the query (or of its first letters)"""
+        # Tokens never contain separators, so match on the query's longest word
+        query = max(TOKEN_SPLIT.split(query), key=len)
+        typos = allowed_typos(query)
+        if not typos:
+            return {}
+
+        # Candidate tokens come from the vocabulary, not from every file name
+        query_grams = padded_trigrams(query)
+        needed = max(1, len(query_grams) - 3 * typos)
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(self.token_grams.get(gram, ()))
+
+        matches = {}
+        for token, shared in counts.most_common(FUZZY_CANDIDATES):
+            if shared < needed:
+                break
+            distance = min(edit_distance(query, token, typos),
+                           edit_distance(query, token[:len(query)], typos))
+            if distance > typos:
+                continue
+            for filename in self.token_files[token]:
+                if filename not in exclude and distance < matches.get(filename, typos + 1):
+                    matches[filename] = distance
+        return matches
+
+    def search(self, query, username=None, limit=100, offset=0):
+        """
+        Ranked search over file names
+
+        Args:
+            query: Search text (case-insensitive)
+            username: Only return files this user may access (None = no filtering)
+            limit: Maximum results to return
+            offset: Number of ranked results to skip
+
+        Returns:
+            (total, entries) where entries are catalog entries in rank order
+        """
+        query = query.strip().lower()
+        if not query:
+            return 0, []
+
+        with self.lock:
+            docs = self.docs
+            hidden = self.permissions.hidden_files(username) if self.permissions else set()
+
+            exact, prefix = self._prefix_matches(query)
+            token_prefix = self._token_prefix_matches(query) - exact - prefix
+            substring = set()
+            if len(query) >= 2:
+                candidates = self._substring_candidates(query) - exact - prefix - token_prefix
+                if len(query) == 3:
+                    substring = candidates  # A single trigram match is already exact
+                else:
+                    substring = {f for f in candidates if query in docs[f]['lower']}
+
+            newest_first = lambda f: (-docs[f]['mtime'], f)
+            tiers = [
+                (exact - hidden, newest_first),
+                (prefix - hidden, newest_first),
+                (token_prefix - hidden, newest_first),
+                (substring - hidden, lambda f: (docs[f]['lower'].find(query), -docs[f]['mtime'], f)),
+            ]
+
+            # Always counted (the vocabulary scan is capped) so the total is the same on every page
+            fuzzy = self._fuzzy_matches(query, exact | prefix | token_prefix | substring)
+            for filename in hidden:
+                fuzzy.pop(filename, None)
+            tiers.append((set(fuzzy), lambda f: (fuzzy[f], -docs[f]['mtime'], f)))
+            total = sum(len(members) for members, _ in tiers)
+
+            # Only rank the tiers the requested page actually falls in
+            page = []
+            skip, need = offset, limit
+            for members, key in tiers:
+                if need <= 0:
+                    break
+                if skip >= len(members):
+                    skip -= len(members)
+                    continue
+                ranked = heapq.nsmallest(skip + need, members, key=key)[skip:]
+                page.extend(ranked)
+                skip, need = 0, need - len(ranked)
+
+            return total, [docs[f]['entry'] for f in page]
+
+
+def _remove_sorted(items, value):
+    """Remove a value from a sorted list if present"""
+    pos = bisect_left(items, value)
+    if pos < len(items) and items[pos] == value:
+        del items[pos]
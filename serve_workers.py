@@ -0,0 +1,117 @@
+"""
+Multi-Worker Server
+Pre-forks N NetShare worker processes that accept connections on one shared
+listening socket, so request handling can use more than one CPU core
+
+    python serve_workers.py --workers 4 --port 5001
+
+Workers keep sessions, file metadata, stats, file versions and shared texts in
+a shared store (data/shared_state.db, or Redis when REDIS_URL is set). Socket.IO
+emits reach clients of every worker through SOCKETIO_MESSAGE_QUEUE (or REDIS_URL),
+which needs the redis package. A Socket.IO connection must stay on one worker,
+so clients should use the WebSocket transport (long-polling requests would be
+spread across workers).
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_worker(sock, worker_id, workers):
+    """Child process: import the app with multi-worker settings and serve the shared socket"""
+    os.environ['NETSHARE_WORKERS'] = str(workers)
+    os.environ['NETSHARE_WORKER_ID'] = str(worker_id)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    sys.path.insert(0, REPO_DIR)
+
+    import eventlet.wsgi
+    import app as netshare
+    import metrics
+
+    if os.environ.get('METRICS_PORT'):
+        # One scrape target per worker; the shared port would hit a random worker
+        metrics.start_server(int(os.environ['METRICS_PORT']) + worker_id)
+    print(f"Worker {worker_id} (pid {os.getpid()}) serving")
+    eventlet.wsgi.server(sock, netshare.app, log_output=False)
+
+
+def spawn(sock, worker_id, workers):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, worker_id, workers)
+        except Exception as e:
+            print(f"Worker {worker_id} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run NetShare with several worker processes')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='Worker processes')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5001)))
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, 'fork'):
+        parser.error('multi-worker mode needs a platform with fork(); run app.py instead')
+    if args.workers < 2:
+        parser.error('use app.py for a single worker')
+
+    # config is read by each worker after fork, so the parent must not import it
+    import eventlet
+    if os.environ.get('SOCKETIO_MESSAGE_QUEUE') or os.environ.get('REDIS_URL'):
+        # The Redis message queue listener must not block the hub. Patch before socketio/redis
+        # are imported (below, and inherited by every fork); threads stay native so DiskIO's
+        # hub-thread check and the per-thread SQLite connections keep working.
+        eventlet.monkey_patch(socket=True, select=True)
+    from high_speed_transfer import cleanup_temp_files
+
+    # Workers never clean temp files themselves (a restarting worker would delete others' uploads)
+    cleanup_temp_files(os.environ.get('UPLOAD_FOLDER', 'shared_files'))
+    sock = eventlet.listen((args.host, args.port), backlog=1024)
+    print(f"NetShare listening on http://{args.host}:{args.port} with {args.workers} workers")
+
+    children = {spawn(sock, i, args.workers): i for i in range(args.workers)}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Supervise: restart workers that die, until asked to stop
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker_id = children.pop(pid, None)
+        if worker_id is None or stopping:
+            continue
+        print(f"Worker {worker_id} exited with status {status}, restarting")
+        time.sleep(1)
+        children[spawn(sock, worker_id, args.workers)] = worker_id
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+"""
+Server Address
+The network URL of this server and its QR code, computed once and rebuilt
+only when the interface address changes
+"""
+
+import io
+import time
+import socket
+import hashlib
+import threading
+
+import qrcode
+
+
+def get_local_ip():
+    """Get the local IP address of the machine"""
+    try:
+        # UDP connect only picks the outgoing interface; nothing is sent
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("8.8.8.8", 80))
+        ip = s.getsockname()[0]
+        s.close()
+        return ip
+    except Exception:
+        return "127.0.0.1"
+
+
+def generate_qr_png(url):
+    """PNG bytes of a QR code for the URL"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(url)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buf = io.BytesIO()
+    img.save(buf)
+    return buf.getvalue()
+
+
+class ServerAddress:
+    """Cached URL and QR code; check() is cheap and only re-renders on a new address"""
+
+    def __init__(self, port, interval=30):
+        self.port = port
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.ip = None
+        self.url = None
+        self.qr_png = b''
+        self.etag = ''
+        self.check()
+
+    def check(self):
+        """Look up the interface address; returns True if it changed"""
+        ip = get_local_ip()
+        if ip == self.ip:
+            return False
+        url = f"http://{ip}:{self.port}"
+        png = generate_qr_png(url)
+        with self.lock:
+            self.ip, self.url, self.qr_png = ip, url, png
+            self.etag = hashlib.md5(png).hexdigest()[:16]
+        return True
+
+    def snapshot(self):
+        """(ip, url, qr_png, etag) read together"""
+        with self.lock:
+            return self.ip, self.url, self.qr_png, self.etag
+
+    def run(self):
+        """Re-check periodically (DHCP renewals, switching Wi-Fi networks)"""
+        while True:
+            time.sleep(self.interval)
+            try:
+                if self.check():
+                    print(f"Network address changed: {self.url}")
+            except Exception as e:
+                print(f"Error checking network address: {e}")
+
+    def start(self):
+        threading.Thread(target=self.run, name='server-address', daemon=True).start()
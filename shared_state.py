@@ -0,0 +1,413 @@
+"""
+Shared State Module
+Process-safe store for multi-worker mode: dict-like namespaces, counters and a
+change feed in SQLite (WAL) by default, or Redis when REDIS_URL is set
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import weakref
+import threading
+from collections.abc import MutableMapping
+
+try:
+    from greenlet import getcurrent  # Installed with eventlet
+except ImportError:
+    getcurrent = None
+
+from file_catalog import CatalogListener
+
+SHARED_STATE_DB = 'data/shared_state.db'
+CHANGE_LOG_LIMIT = 10000   # Change records kept for workers that fall behind
+CACHE_SECONDS = 1.0        # How long a handed-out value is reused within a request
+
+
+def origin():
+    """Identifies this worker process in the change feed"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _encode(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+class SQLiteStore:
+    """Namespaced JSON values, counters and a change feed in one SQLite file"""
+
+    def __init__(self, path=SHARED_STATE_DB):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS kv (ns TEXT, key TEXT, value TEXT, '
+                         'PRIMARY KEY (ns, key)) WITHOUT ROWID')
+            conn.execute('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)')
+            conn.execute('CREATE TABLE IF NOT EXISTS changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                         'ns TEXT, key TEXT, origin TEXT)')
+
+    def _connect(self):
+        """One connection per thread (and per process, since forks must not share one)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _changed(self, conn, ns, key):
+        conn.execute('INSERT INTO changes (ns, key, origin) VALUES (?, ?, ?)', (ns, key, origin()))
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            conn.execute('DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?',
+                         (CHANGE_LOG_LIMIT,))
+
+    # ---- values ----
+
+    def get(self, ns, key):
+        row = self._connect().execute('SELECT value FROM kv WHERE ns = ? AND key = ?', (ns, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, ns, key, value, notify=True):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)', (ns, key, _encode(value)))
+            if notify:
+                self._changed(conn, ns, key)
+
+    def delete(self, ns, key, notify=True):
+        """Remove a key; False if it wasn't there"""
+        with self._connect() as conn:
+            deleted = conn.execute('DELETE FROM kv WHERE ns = ? AND key = ?', (ns, key)).rowcount > 0
+            if deleted and notify:
+                self._changed(conn, ns, key)
+        return deleted
+
+    def notify(self, ns, key):
+        """Record a change without storing a value (e.g. a file changed on disk)"""
+        with self._connect() as conn:
+            self._changed(conn, ns, key)
+
+    def keys(self, ns):
+        return [row[0] for row in self._connect().execute('SELECT key FROM kv WHERE ns = ?', (ns,))]
+
+    def items(self, ns):
+        return {key: json.loads(value)
+                for key, value in self._connect().execute('SELECT key, value FROM kv WHERE ns = ?', (ns,))}
+
+    def count(self, ns):
+        return self._connect().execute('SELECT COUNT(*) FROM kv WHERE ns = ?', (ns,)).fetchone()[0]
+
+    def seed(self, ns, mapping):
+        """Load initial values once; later calls (from other workers) are no-ops"""
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            if conn.execute("SELECT 1 FROM kv WHERE ns = '_seeded' AND key = ?", (ns,)).fetchone():
+                return False
+            conn.executemany('INSERT OR REPLACE INTO kv (ns, key, value) VALUES (?, ?, ?)',
+                             [(ns, key, _encode(value)) for key, value in mapping.items()])
+            conn.execute("INSERT INTO kv (ns, key, value) VALUES ('_seeded', ?, 'true')", (ns,))
+        return True
+
+    # ---- counters ----
+
+    def incr(self, name, amount=1):
+        """Add to a counter and return its new value"""
+        with self._connect() as conn:
+            conn.execute('INSERT INTO counters (name, value) VALUES (?, ?) '
+                         'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value', (name, amount))
+            return conn.execute('SELECT value FROM counters WHERE name = ?', (name,)).fetchone()[0]
+
+    def counters(self):
+        return dict(self._connect().execute('SELECT name, value FROM counters'))
+
+    # ---- change feed ----
+
+    def last_cursor(self):
+        return self._connect().execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
+    def changes(self, cursor, limit=1000):
+        """(cursor, ns, key, origin) records written after cursor, oldest first"""
+        return self._connect().execute(
+            'SELECT seq, ns, key, origin FROM changes WHERE seq > ? ORDER BY seq LIMIT ?', (cursor, limit)).fetchall()
+
+
+class RedisStore:
+    """Same interface as SQLiteStore on a Redis server (hashes, HINCRBY and a stream)"""
+
+    def __init__(self, url, prefix='netshare'):
+        import redis  # Optional dependency, only needed when REDIS_URL is set
+        self.redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self.stream = f"{prefix}:changes"
+
+    def _hash(self, ns):
+        return f"{self.prefix}:kv:{ns}"
+
+    def _changed(self, pipe, ns, key):
+        pipe.xadd(self.stream, {'ns': ns, 'key': key, 'origin': origin()},
+                  maxlen=CHANGE_LOG_LIMIT, approximate=True)
+
+    def get(self, ns, key):
+        value = self.redis.hget(self._hash(ns), key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, ns, key, value, notify=True):
+        pipe = self.redis.pipeline()
+        pipe.hset(self._hash(ns), key, _encode(value))
+        if notify:
+            self._changed(pipe, ns, key)
+        pipe.execute()
+
+    def delete(self, ns, key, notify=True):
+        deleted = self.redis.hdel(self._hash(ns), key) > 0
+        if deleted and notify:
+            self.notify(ns, key)
+        return deleted
+
+    def notify(self, ns, key):
+        pipe = self.redis.pipeline()
+        self._changed(pipe, ns, key)
+        pipe.execute()
+
+    def keys(self, ns):
+        return self.redis.hkeys(self._hash(ns))
+
+    def items(self, ns):
+        return {key: json.loads(value) for key, value in self.redis.hgetall(self._hash(ns)).items()}
+
+    def count(self, ns):
+        return self.redis.hlen(self._hash(ns))
+
+    def seed(self, ns, mapping):
+        if not self.redis.set(f"{self.prefix}:seeded:{ns}", 1, nx=True):
+            return False
+        if mapping:
+            self.redis.hset(self._hash(ns), mapping={key: _encode(value) for key, value in mapping.items()})
+        return True
+
+    def incr(self, name, amount=1):
+        return self.redis.hincrby(f"{self.prefix}:counters", name, amount)
+
+    def counters(self):
+        return {name: int(value) for name, value in self.redis.hgetall(f"{self.prefix}:counters").items()}
+
+    def last_cursor(self):
+        last = self.redis.xrevrange(self.stream, count=1)
+        return last[0][0] if last else '0-0'
+
+    def changes(self, cursor, limit=1000):
+        return [(entry_id, fields['ns'], fields['key'], fields['origin'])
+                for entry_id, fields in self.redis.xrange(self.stream, min=f"({cursor}", count=limit)]
+
+
+def open_store(path=SHARED_STATE_DB):
+    """Redis when REDIS_URL is set, otherwise SQLite next to the other data files"""
+    url = os.environ.get('REDIS_URL')
+    if url:
+        return RedisStore(url)
+    return SQLiteStore(path)
+
+
+# Values handed out by SharedDict, per greenlet: (namespace, key) -> (value, encoded, fetched_at).
+# Under eventlet every request greenlet runs on the hub thread, so a thread-local
+# would let one request's release() drop values another request has yet to sync.
+_handed = weakref.WeakKeyDictionary()
+_handed_local = threading.local()  # Without greenlet, plain threads
+_handed_lock = threading.Lock()
+
+
+def _handed_values():
+    if getcurrent is None:
+        values = getattr(_handed_local, 'values', None)
+        if values is None:
+            values = _handed_local.values = {}
+        return values
+    current = getcurrent()
+    values = _handed.get(current)
+    if values is None:
+        with _handed_lock:
+            values = _handed.setdefault(current, {})
+    return values
+
+
+def release():
+    """Forget values handed out to this request (call at the end of each request)"""
+    if getcurrent is None:
+        _handed_local.values = {}
+    else:
+        with _handed_lock:
+            _handed.pop(getcurrent(), None)
+
+
+class SharedDict(MutableMapping):
+    """A dict backed by one store namespace.
+
+    Reads return fresh copies; a value read and then mutated in place is written
+    back by sync(), which AuthSystem._save_json calls where it used to dump JSON.
+    """
+
+    def __init__(self, store, namespace):
+        self.store = store
+        self.namespace = namespace
+
+    def __getitem__(self, key):
+        handed = _handed_values()
+        cached = handed.get((self.namespace, key))
+        if cached is not None and time.monotonic() - cached[2] < CACHE_SECONDS:
+            return cached[0]
+        value = self.store.get(self.namespace, key)
+        if value is None:
+            handed.pop((self.namespace, key), None)
+            raise KeyError(key)
+        handed[(self.namespace, key)] = (value, _encode(value), time.monotonic())
+        return value
+
+    def __setitem__(self, key, value):
+        self.store.set(self.namespace, key, value)
+        _handed_values()[(self.namespace, key)] = (value, _encode(value), time.monotonic())
+
+    def __delitem__(self, key):
+        _handed_values().pop((self.namespace, key), None)
+        if not self.store.delete(self.namespace, key):
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __iter__(self):
+        return iter(self.store.keys(self.namespace))
+
+    def __len__(self):
+        return self.store.count(self.namespace)
+
+    def items(self):
+        return self.store.items(self.namespace).items()
+
+    def values(self):
+        return self.store.items(self.namespace).values()
+
+    def copy(self):
+        return self.store.items(self.namespace)
+
+    def sync(self):
+        """Write back values this request mutated in place since reading them"""
+        handed = _handed_values()
+        for (namespace, key), (value, encoded, _) in list(handed.items()):
+            if namespace != self.namespace:
+                continue
+            del handed[(namespace, key)]
+            if _encode(value) != encoded:
+                self.store.set(namespace, key, value)
+
+
+class SharedCounters:
+    """Drop-in for counters.Counters with totals kept in the shared store"""
+
+    def __init__(self, store, names):
+        self.store = store
+        self.names = list(names)
+
+    def add(self, name, amount=1):
+        self.store.incr(name, amount)
+
+    def reset(self, name):
+        self.add(name, -self.get(name))
+
+    def get(self, name):
+        return self.snapshot()[name]
+
+    def snapshot(self):
+        values = self.store.counters()
+        return {name: values.get(name, 0) for name in self.names}
+
+    def flush(self):
+        """Nothing to do: every add is already durable"""
+
+
+class ChangeFeed:
+    """Polls the store's change feed and dispatches other workers' writes to handlers"""
+
+    def __init__(self, store, interval=0.5):
+        self.store = store
+        self.interval = interval
+        self.handlers = {}  # namespace -> callable(key)
+        self.cursor = store.last_cursor()
+        self.thread_ident = None
+
+    def on(self, namespace, handler):
+        self.handlers[namespace] = handler
+
+    def dispatching(self):
+        """True on the feed thread, so handlers' side effects aren't published again"""
+        return threading.get_ident() == self.thread_ident
+
+    def poll(self):
+        """Apply pending remote changes; returns how many were dispatched"""
+        me = origin()
+        dispatched = 0
+        for cursor, ns, key, source in self.store.changes(self.cursor):
+            self.cursor = cursor
+            handler = self.handlers.get(ns)
+            if handler is None or source == me:
+                continue
+            try:
+                handler(key)
+                dispatched += 1
+            except Exception as e:
+                print(f"Error applying shared change {ns}/{key}: {e}")
+        return dispatched
+
+    def start(self):
+        def run():
+            self.thread_ident = threading.get_ident()
+            while True:
+                try:
+                    self.poll()
+                except Exception as e:
+                    print(f"Error polling shared state changes: {e}")
+                time.sleep(self.interval)
+
+        threading.Thread(target=run, name='shared-state-feed', daemon=True).start()
+
+
+class CatalogPublisher(CatalogListener):
+    """Announces local catalog changes so other workers refresh the same files"""
+
+    def __init__(self, store, feed):
+        self.store = store
+        self.feed = feed
+        self.seeded = False
+
+    def catalog_reset(self, entries):
+        if not self.seeded:
+            self.seeded = True  # The seed on registration isn't a change
+            return
+        if not self.feed.dispatching():
+            self.store.notify('files', '*')
+
+    def catalog_added(self, filename, entry):
+        if not self.feed.dispatching():
+            self.store.notify('files', filename)
+
+    def catalog_removed(self, filename, entry):
+        if not self.feed.dispatching():
+            self.store.notify('files', filename)
+
+
+def publish_worker(store, worker_id, info):
+    """Heartbeat with a worker's per-process state (e.g. its WebSocket transfers)"""
+    info = dict(info, pid=os.getpid(), time=time.time())
+    store.set('workers', str(worker_id), info, notify=False)
+
+
+def live_workers(store, max_age=10):
+    """Heartbeats of workers seen in the last max_age seconds, by worker id"""
+    now = time.time()
+    return {worker_id: info for worker_id, info in store.items('workers').items()
+            if now - info.get('time', 0) < max_age}
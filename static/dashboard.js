@@ -402,6 +402,7 @@ async function loadDashboardData() {
         if (response.ok) {
             const data = await response.json();
             updateDashboardStats(data);
+            updateCharts(data);
             updateActivityFeed(data.recentActivity);
         }
     } catch (error) {
@@ -418,6 +419,51 @@ function updateDashboardStats(data) {
     animateValue('avg-speed', 0, data.avgSpeed || 0, 1000);
 }
 
+// Update Charts with server data
+function updateCharts(data) {
+    if (uploadTrendChart && data.uploadTrend) {
+        uploadTrendChart.data.labels = data.uploadTrend.labels;
+        uploadTrendChart.data.datasets[0].data = data.uploadTrend.uploads;
+        uploadTrendChart.data.datasets[1].data = data.uploadTrend.downloads;
+        uploadTrendChart.update();
+    }
+    
+    if (fileTypeChart && data.fileTypes) {
+        const types = data.fileTypes;
+        fileTypeChart.data.datasets[0].data = [types.images, types.documents, types.videos, types.archives, types.other];
+        fileTypeChart.update();
+    }
+    
+    if (transferSpeedChart && data.transferSpeeds) {
+        transferSpeedChart.data.labels = data.transferSpeeds.labels;
+        transferSpeedChart.data.datasets[0].data = data.transferSpeeds.speeds;
+        transferSpeedChart.update();
+    }
+    
+    if (userActivityChart && data.userActivity) {
+        userActivityChart.data.labels = data.userActivity.labels;
+        userActivityChart.data.datasets[0].data = data.userActivity.activity;
+        userActivityChart.update();
+    }
+    
+    if (storageUsageChart && data.storageUsage) {
+        const usage = data.storageUsage;
+        storageUsageChart.data.datasets[0].data = [usage.percentage, 100 - usage.percentage];
+        storageUsageChart.update();
+        
+        const storageInfo = document.querySelector('.storage-info');
+        if (storageInfo) {
+            storageInfo.innerHTML = `
+                <div class="storage-percentage">${usage.percentage}%</div>
+                <div class="storage-label">Storage Used</div>
+                <div class="storage-details" style="margin-top: 10px; font-size: 0.75rem; color: var(--text-secondary);">
+                    ${usage.used} GB / ${usage.total} GB
+                </div>
+            `;
+        }
+    }
+}
+
 // Animate Number
 function animateValue(id, start, end, duration) {
     const element = document.getElementById(id);
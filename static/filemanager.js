@@ -352,7 +352,7 @@ function createFileCard(file) {
     
     // Create thumbnail or icon
     const previewHtml = canPreviewImage(file.name) 
-        ? `<img src="/download/${encodeURIComponent(file.name)}" alt="${file.name}" class="file-thumbnail" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
+        ? `<img src="/thumb/${encodeURIComponent(file.name)}?w=256&v=${encodeURIComponent(`${file.size}-${file.modified}`)}" alt="${file.name}" class="file-thumbnail" loading="lazy" onerror="this.style.display='none'; this.nextElementSibling.style.display='flex';">
            <div class="file-icon" style="display:none;"><i class="${icon}"></i></div>`
         : `<div class="file-icon"><i class="${icon}"></i></div>`;
     
@@ -562,13 +562,21 @@ function previewAudio(filename, container) {
 }
 
 function previewText(filename, container) {
-    fetch(`/download/${encodeURIComponent(filename)}`)
-        .then(response => response.text())
-        .then(text => {
+    // Large files are paged: the server returns a window of lines at a time
+    fetch(`/api/text-preview/${encodeURIComponent(filename)}?line=1&count=500`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) throw new Error(data.error);
             container.innerHTML = `
                 <div class="preview-text-container">
-                    <pre class="preview-text">${escapeHtml(text)}</pre>
+                    <pre class="preview-text"></pre>
                     <div class="preview-controls">
+                        <button class="btn-icon preview-more" title="Load more lines">
+                            <i class="fas fa-angle-double-down"></i>
+                        </button>
+                        <button class="btn-icon preview-tail" title="Jump to end">
+                            <i class="fas fa-step-forward"></i>
+                        </button>
                         <button class="btn-icon" onclick="copyTextContent()" title="Copy">
                             <i class="fas fa-copy"></i>
                         </button>
@@ -578,6 +586,35 @@ function previewText(filename, container) {
                     </div>
                 </div>
             `;
+            const pre = container.querySelector('.preview-text');
+            const more = container.querySelector('.preview-more');
+            const tail = container.querySelector('.preview-tail');
+            let nextLine = null;
+            
+            const show = (page, append) => {
+                const text = page.lines.join('\n');
+                pre.textContent = append && pre.textContent ? `${pre.textContent}\n${text}` : text;
+                nextLine = page.next_line;
+                more.style.display = nextLine ? '' : 'none';
+                tail.style.display = page.eof ? 'none' : '';
+            };
+            show(data, false);
+            
+            more.onclick = () => {
+                fetch(`/api/text-preview/${encodeURIComponent(filename)}?line=${nextLine}&count=500`)
+                    .then(response => response.json())
+                    .then(page => show(page, true))
+                    .catch(() => showToast('Failed to load more lines', 'error'));
+            };
+            tail.onclick = () => {
+                fetch(`/api/text-preview/${encodeURIComponent(filename)}?tail=500`)
+                    .then(response => response.json())
+                    .then(page => {
+                        show(page, false);
+                        pre.scrollTop = pre.scrollHeight;
+                    })
+                    .catch(() => showToast('Failed to load the end of the file', 'error'));
+            };
         })
         .catch(error => {
             container.innerHTML = '<div class="preview-error">Failed to load file content</div>';
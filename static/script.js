@@ -984,7 +984,12 @@ async function searchFiles(query) {
     }
     
     try {
-        const response = await fetch(`/search?q=${encodeURIComponent(query)}`);
+        const headers = {};
+        if (authToken) {
+            headers['Authorization'] = `Bearer ${authToken}`;
+        }
+
+        const response = await fetch(`/search?q=${encodeURIComponent(query)}`, { headers });
         allFiles = await response.json();
         renderFiles();
     } catch (error) {
@@ -1063,7 +1068,8 @@ async function deleteSelected() {
         const response = await fetch('/delete-multiple', {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${authToken}`
             },
             body: JSON.stringify({
                 filenames: Array.from(selectedFiles)
@@ -1073,7 +1079,7 @@ async function deleteSelected() {
         const result = await response.json();
         
         if (response.ok) {
-            showToast(result.message, 'success');
+            showToast(result.message, result.errors.length ? 'warning' : 'success');
             selectedFiles.clear();
             loadFiles();
             updateStats();
@@ -1371,6 +1377,45 @@ function formatBytes(bytes, decimals = 2) {
 }
 
 // Folder upload support
+const TAR_MIN_FILES = 200;  // Many files: send one tar stream instead of a multipart part per file
+const TAR_MAX_FILE_SIZE = 8 * 1024 * 1024;  // ...as long as they are small
+
+// Build a ustar archive as a Blob (file contents are referenced, not copied); null if a path doesn't fit
+function buildTar(files) {
+    const encoder = new TextEncoder();
+    const parts = [];
+    
+    for (const file of files) {
+        const path = encoder.encode(file.webkitRelativePath || file.name);
+        let name = path, prefix = new Uint8Array(0);
+        if (path.length > 100) {
+            const split = path.lastIndexOf(47, 155);  // Last '/' that leaves a prefix of at most 155 bytes
+            if (split <= 0 || path.length - split - 1 > 100) return null;
+            prefix = path.slice(0, split);
+            name = path.slice(split + 1);
+        }
+        
+        const header = new Uint8Array(512);
+        const octal = (value, length) => encoder.encode(value.toString(8).padStart(length - 1, '0') + '\0');
+        header.set(name, 0);
+        header.set(octal(0o644, 8), 100);
+        header.set(octal(0, 8), 108);
+        header.set(octal(0, 8), 116);
+        header.set(octal(file.size, 12), 124);
+        header.set(octal(Math.floor(file.lastModified / 1000), 12), 136);
+        header.set(encoder.encode('        '), 148);  // Checksum is computed with spaces here
+        header[156] = 48;  // '0': regular file
+        header.set(encoder.encode('ustar\0' + '00'), 257);
+        header.set(prefix, 345);
+        const checksum = header.reduce((sum, byte) => sum + byte, 0);
+        header.set(encoder.encode(checksum.toString(8).padStart(6, '0') + '\0 '), 148);
+        
+        parts.push(header, file, new Uint8Array((512 - file.size % 512) % 512));
+    }
+    parts.push(new Uint8Array(1024));  // End-of-archive marker
+    return new Blob(parts, { type: 'application/x-tar' });
+}
+
 async function uploadFolder() {
     const input = document.createElement('input');
     input.type = 'file';
@@ -1385,22 +1430,33 @@ async function uploadFolder() {
         
         showToast(`Uploading folder with ${files.length} files...`, 'info');
         
-        const formData = new FormData();
-        const paths = [];
-        
-        files.forEach(file => {
-            formData.append('files', file);
-            paths.push(file.webkitRelativePath || file.name);
-        });
+        const headers = {};
+        if (authToken) {
+            headers['Authorization'] = `Bearer ${authToken}`;
+        }
         
-        paths.forEach(path => {
-            formData.append('paths', path);
-        });
+        // Lots of small files: one tar stream avoids a multipart part (and a request body parse) per file
+        let url = '/upload-folder';
+        let body = null;
+        if (files.length >= TAR_MIN_FILES && files.every(file => file.size <= TAR_MAX_FILE_SIZE)) {
+            body = buildTar(files);
+            url = '/upload-tar';
+        }
+        if (!body) {
+            url = '/upload-folder';
+            body = new FormData();
+            files.forEach(file => {
+                // The path goes first so the server knows where to write the file as it streams in
+                body.append('paths', file.webkitRelativePath || file.name);
+                body.append('files', file);
+            });
+        }
         
         try {
-            const response = await fetch('/upload-folder', {
+            const response = await fetch(url, {
                 method: 'POST',
-                body: formData
+                headers: headers,
+                body: body
             });
             
             const result = await response.json();
@@ -1413,7 +1469,7 @@ async function uploadFolder() {
                 loadFiles();
                 updateStats();
             } else {
-                showToast('Folder upload failed', 'error');
+                showToast(result.error || 'Folder upload failed', 'error');
             }
         } catch (error) {
             console.error('Folder upload error:', error);
@@ -1796,19 +1852,34 @@ async function showFileVersions(filename) {
 }
 
 // ==================== NETWORK DEVICES ====================
+let deviceUpdatesSubscribed = false;
+
+function renderDevices(data) {
+    const deviceList = document.getElementById('deviceList');
+    if (!deviceList) return;
+    if (data.devices && data.devices.length > 0) {
+        const details = data.details || data.devices.map(ip => ({ ip }));
+        deviceList.innerHTML = `<ul class="device-list">${details.map(device => `<li><i class='fas ${device.netshare ? 'fa-share-alt' : 'fa-laptop'}'></i> ${device.ip}${device.ip === data.local_ip ? ' <span class=\'badge\'>(You)</span>' : ''}${device.mac ? ` <small>${device.mac}</small>` : ''}</li>`).join('')}</ul>`;
+    } else if (data.scanning) {
+        deviceList.innerHTML = `<div class='empty-state'><i class='fas fa-spinner fa-spin'></i><p>Scanning network...</p></div>`;
+    } else {
+        deviceList.innerHTML = `<div class='empty-state'><i class='fas fa-exclamation-circle'></i><p>No devices found</p></div>`;
+    }
+}
+
 function scanDevices() {
     const deviceList = document.getElementById('deviceList');
     const empty = document.getElementById('deviceListEmpty');
     if (empty) empty.innerHTML = '<i class="fas fa-spinner fa-spin"></i><p>Scanning network...</p>';
-    fetch('/api/network/devices')
+    
+    // The server sweeps in the background and pushes the list when it changes
+    if (!deviceUpdatesSubscribed && typeof highSpeedTransfer !== 'undefined' && highSpeedTransfer && highSpeedTransfer.socket) {
+        highSpeedTransfer.socket.on('network_devices', renderDevices);
+        deviceUpdatesSubscribed = true;
+    }
+    fetch('/api/network/devices?refresh=1')
         .then(res => res.json())
-        .then(data => {
-            if (data.devices && data.devices.length > 0) {
-                deviceList.innerHTML = `<ul class="device-list">${data.devices.map(ip => `<li><i class='fas fa-laptop'></i> ${ip}${ip === data.local_ip ? ' <span class=\'badge\'>(You)</span>' : ''}</li>`).join('')}</ul>`;
-            } else {
-                deviceList.innerHTML = `<div class='empty-state'><i class='fas fa-exclamation-circle'></i><p>No devices found</p></div>`;
-            }
-        })
+        .then(renderDevices)
         .catch(() => {
             deviceList.innerHTML = `<div class='empty-state'><i class='fas fa-exclamation-circle'></i><p>Failed to scan network</p></div>`;
         });
@@ -1816,9 +1887,22 @@ function scanDevices() {
 
 // ==================== TEXT SHARING ====================
 
+let sharedTextUpdatesSubscribed = false;
+
 function showTextSharingPanel() {
     const modal = document.getElementById('textSharingModal');
     modal.style.display = 'flex';
+    
+    // New and deleted snippets are pushed by the server while the panel is open
+    if (!sharedTextUpdatesSubscribed && typeof highSpeedTransfer !== 'undefined' && highSpeedTransfer && highSpeedTransfer.socket) {
+        highSpeedTransfer.socket.on('shared_text', () => {
+            const receiveTab = document.getElementById('receiveTextTab');
+            if (modal.style.display !== 'none' && receiveTab && receiveTab.style.display !== 'none') {
+                refreshSharedTexts();
+            }
+        });
+        sharedTextUpdatesSubscribed = true;
+    }
     switchTextTab('send');
     refreshSharedTexts();
 }
@@ -1914,7 +1998,7 @@ async function refreshSharedTexts() {
             headers['Authorization'] = `Bearer ${authToken}`;
         }
         
-        const response = await fetch('/api/shared-texts', { headers });
+        const response = await fetch('/api/shared-texts?limit=100', { headers });
         const data = await response.json();
         
         if (response.ok && data.texts && data.texts.length > 0) {
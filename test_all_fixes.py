@@ -65,9 +65,8 @@ def test_backend_permission_filtering():
     checks = {
         'Gets auth token': 'request.headers.get(\'Authorization\'' in stats_func,
         'Validates session': 'auth_system.validate_session' in stats_func,
-        'Checks file access': 'auth_system.can_access_file' in stats_func,
-        'Filters by permission': 'if current_username and not auth_system.can_access_file' in stats_func,
-        'Returns accessible count': 'len(accessible_files)' in stats_func,
+        'Filters by permission': 'permission_index.totals(current_username)' in stats_func,
+        'Returns accessible count': "'total_files': total_files" in stats_func,
     }
     
     return checks
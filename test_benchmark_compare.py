@@ -0,0 +1,95 @@
+"""
+Test script to verify the benchmark regression gate
+"""
+
+import os
+import json
+import random
+import tempfile
+
+import benchmark_compare
+from benchmark_compare import bootstrap_ratio, compare
+
+
+def micro_report(name, samples):
+    return {'benchmark': 'micro', 'results': [{'name': name, 'scale': 1000, 'samples_ms': samples}]}
+
+
+def transfer_report(samples, errors=0):
+    return {'benchmark': 'transfers', 'results': [{
+        'scenario': 'upload', 'size': 1048576, 'concurrency': 4, 'errors': errors, 'samples_mbps': samples
+    }]}
+
+
+def noisy(center, count=60, spread=0.05, seed=1):
+    rng = random.Random(seed)
+    return [center * (1 + rng.uniform(-spread, spread)) for _ in range(count)]
+
+
+def test_bootstrap_interval():
+    """The CI brackets the true ratio of medians"""
+    point, low, high = bootstrap_ratio(noisy(10), noisy(15, seed=2), iterations=500)
+    assert 1.4 < point < 1.6
+    assert low <= point <= high
+    assert low > 1.3 and high < 1.7
+
+
+def test_latency_regression():
+    """Slower listing beyond the threshold fails; noise and small changes pass"""
+    results, _ = compare([micro_report('list_files', noisy(10))], [micro_report('list_files', noisy(13, seed=2))],
+                         threshold=0.10, iterations=500)
+    assert results[0]['verdict'] == 'REGRESSION'
+
+    results, _ = compare([micro_report('list_files', noisy(10))], [micro_report('list_files', noisy(10, seed=3))],
+                         threshold=0.10, iterations=500)
+    assert results[0]['verdict'] in ('ok', 'changed')
+
+
+def test_throughput_direction():
+    """Lower throughput is worse, higher is an improvement; failed runs fail the row"""
+    results, _ = compare([transfer_report(noisy(800))], [transfer_report(noisy(500, seed=2))], iterations=500)
+    assert results[0]['verdict'] == 'REGRESSION'
+    assert results[0]['worse_percent'] > 30
+
+    results, _ = compare([transfer_report(noisy(500))], [transfer_report(noisy(800, seed=2))], iterations=500)
+    assert results[0]['verdict'] == 'improved'
+
+    results, missing = compare([transfer_report(noisy(800))], [transfer_report(noisy(100), errors=2)])
+    assert [(r['verdict'], r['errors']) for r in results] == [('FAILED', 2)] and missing == []
+
+    results, missing = compare([transfer_report(noisy(800))], [micro_report('list_files', noisy(10))])
+    assert results == [] and missing == ['upload size=1048576 x4']
+
+
+def test_exit_code():
+    """The command line gate exits 1 on a regression, failed operations or a missing benchmark"""
+    folder = tempfile.mkdtemp()
+    base, cand = os.path.join(folder, 'base.json'), os.path.join(folder, 'cand.json')
+    with open(base, 'w') as f:
+        json.dump(micro_report('search_files', noisy(2)), f)
+    with open(cand, 'w') as f:
+        json.dump(micro_report('search_files', noisy(4, seed=2)), f)
+    assert benchmark_compare.main([base, cand, '--iterations', '300']) == 1
+    assert benchmark_compare.main([base, base, '--iterations', '300']) == 0
+
+    failing, empty = os.path.join(folder, 'failing.json'), os.path.join(folder, 'empty.json')
+    with open(failing, 'w') as f:
+        json.dump(transfer_report([], errors=5), f)
+    with open(empty, 'w') as f:
+        json.dump({'benchmark': 'micro', 'results': []}, f)
+    assert benchmark_compare.main([failing, failing]) == 1
+    assert benchmark_compare.main([base, empty]) == 1
+
+
+def main():
+    print("=" * 60)
+    print("BENCHMARK GATE VERIFICATION")
+    print("=" * 60)
+    for test in (test_bootstrap_interval, test_latency_regression, test_throughput_direction, test_exit_code):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,73 @@
+"""
+Test script to verify the SQLite comment store: paging, mentions, counts and migration
+"""
+
+import os
+import tempfile
+
+from comment_store import CommentStore, find_mentions
+
+
+def new_store():
+    return CommentStore(os.path.join(tempfile.mkdtemp(), 'comments.db'))
+
+
+def test_pages_and_counts():
+    """Per-file pages follow the cursor; counts are kept without reading comments"""
+    store = new_store()
+    for i in range(5):
+        store.add('report.pdf', 'alice', f'comment {i}')
+    store.add('notes.txt', 'bob', 'hello')
+
+    comments, cursor = store.page('report.pdf', limit=2)
+    assert [c['comment'] for c in comments] == ['comment 0', 'comment 1'] and cursor == comments[-1]['id']
+    comments, cursor = store.page('report.pdf', after=cursor, limit=3)
+    assert [c['comment'] for c in comments] == ['comment 2', 'comment 3', 'comment 4'] and cursor is None
+    assert store.counts() == {'report.pdf': 5, 'notes.txt': 1}
+
+    store.rename_file('notes.txt', 'report.pdf')  # Overwrote report.pdf
+    assert store.counts() == {'report.pdf': 1} and store.page('report.pdf')[0][0]['comment'] == 'hello'
+    store.delete_file('report.pdf')
+    assert store.counts() == {} and store.count('report.pdf') == 0
+
+
+def test_mention_index():
+    """A user's mentions are found across files, newest first, and go away with the file"""
+    assert find_mentions('thanks @bob and @carol.') == ['bob', 'carol']
+    assert find_mentions('mail me at me@example.com') == []
+
+    store = new_store()
+    store.add('a.txt', 'alice', 'see this @bob')
+    store.add('b.txt', 'alice', 'no mention')
+    store.add('c.txt', 'carol', 'explicit', mentions=['bob'])
+    comments, cursor = store.mentions('bob', limit=1)
+    assert [c['filename'] for c in comments] == ['c.txt'] and cursor is not None
+    comments, cursor = store.mentions('bob', before=cursor)
+    assert [c['filename'] for c in comments] == ['a.txt'] and cursor is None
+
+    store.delete_file('a.txt')
+    assert [c['filename'] for c in store.mentions('bob')[0]] == ['c.txt']
+
+
+def test_json_migration_runs_once():
+    """The old comments.json is imported on first open only"""
+    store = new_store()
+    old = {'a.txt': [{'id': 1, 'username': 'alice', 'comment': 'hi @bob', 'mentions': ['bob'],
+                      'created_at': '2024-01-01T00:00:00'}]}
+    assert store.migrate(old) == 1
+    assert store.migrate(old) == 0
+    assert store.count('a.txt') == 1 and store.mentions('bob')[0][0]['created_at'] == '2024-01-01T00:00:00'
+
+
+def main():
+    print("=" * 60)
+    print("COMMENT STORE VERIFICATION")
+    print("=" * 60)
+    for test in (test_pages_and_counts, test_mention_index, test_json_migration_runs_once):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,85 @@
+"""
+Test script to verify the delete-request store: indexes, batch resolution and retention
+"""
+
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from delete_request_store import DeleteRequestStore
+
+
+def new_store():
+    return DeleteRequestStore(os.path.join(tempfile.mkdtemp(), 'requests.db'), retention_days=30)
+
+
+def test_status_pages_and_duplicates():
+    """Requests are listed by status newest first; repeat requests reuse the pending one"""
+    store = new_store()
+    ids = [store.create(f'file{i}.txt', 'alice', 'old') for i in range(5)]
+    assert store.create('file0.txt', 'alice') == ids[0]
+    store.reject(ids[:2], 'admin', 'keep')
+
+    pending, cursor = store.list('pending', limit=2)
+    assert list(pending) == [ids[4], ids[3]] and cursor is not None
+    pending, cursor = store.list('pending', before=cursor, limit=2)
+    assert list(pending) == [ids[2]] and cursor is None
+    assert store.counts() == {'pending': 3, 'rejected': 2}
+    assert store.get(ids[0])['rejection_reason'] == 'keep'
+
+
+def test_batch_approve_removes_each_file_once():
+    """Approving removes files once, settles every request for them, and keeps failures pending"""
+    store = new_store()
+    a1 = store.create('a.txt', 'alice')
+    a2 = store.create('a.txt', 'bob')
+    b1 = store.create('b.txt', 'bob')
+    c1 = store.create('c.txt', 'carol')
+    removed = []
+
+    def remove_file(filename):
+        removed.append(filename)
+        return filename != 'c.txt'  # c.txt is locked
+
+    approved = store.approve([a1, b1, c1, 'missing'], 'admin', remove_file)
+    assert approved == {a1: 'a.txt', a2: 'a.txt', b1: 'b.txt'}
+    assert sorted(removed) == ['a.txt', 'b.txt', 'c.txt']
+    assert store.get(a2)['approved_at'] and store.get(c1)['status'] == 'pending'
+    assert store.approve([a1], 'admin', remove_file) == {}  # Already resolved
+    assert store.for_file('c.txt') == {c1: store.get(c1)}
+
+
+def test_retention_and_migration():
+    """Old resolved requests are purged; pending ones never are; JSON imports once"""
+    store = new_store()
+    old = {
+        'x.txt_alice_1': {'filename': 'x.txt', 'requester': 'alice', 'reason': '', 'status': 'approved',
+                          'created_at': '2020-01-01T00:00:00', 'approver': 'admin',
+                          'approved_at': '2020-01-02T00:00:00'},
+        'y.txt_bob_2': {'filename': 'y.txt', 'requester': 'bob', 'reason': 'dup', 'status': 'pending',
+                        'created_at': '2020-01-03T00:00:00'}
+    }
+    assert store.migrate(old) == 2 and store.migrate(old) == 0
+    assert store.purge(datetime.now()) == 1
+    assert store.get('x.txt_alice_1') is None and store.get('y.txt_bob_2')['status'] == 'pending'
+
+    recent = store.create('z.txt', 'carol')
+    store.reject([recent], 'admin')
+    assert store.purge(datetime.now()) == 0
+    assert store.purge(datetime.now() + timedelta(days=31)) == 1  # The fresh rejection, later on
+    assert store.counts() == {'pending': 1}
+
+
+def main():
+    print("=" * 60)
+    print("DELETE REQUEST STORE VERIFICATION")
+    print("=" * 60)
+    for test in (test_status_pages_and_duplicates, test_batch_approve_removes_each_file_once,
+                 test_retention_and_migration):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,83 @@
+"""
+Test script to verify disk I/O offloading and event loop lag sampling
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+import eventlet
+
+from disk_io import DiskIO, LoopLagMonitor
+
+
+def test_offloaded_calls_keep_greenlets_running():
+    """A slow disk call on the hub thread lets other greenlets run meanwhile"""
+    disk = DiskIO(max_concurrency=2)
+    ticks = []
+
+    def ticker():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            eventlet.sleep(0.01)
+
+    eventlet.spawn(ticker)
+    assert disk.run('write', lambda: time.sleep(0.1) or 'done') == 'done'
+    assert len(ticks) >= 3  # Would be 0 if the sleep had blocked the hub
+    assert disk.stats() == {'max_concurrency': 2, 'in_flight': 0, 'waiting': 0}
+
+
+def test_bounded_concurrency_and_errors():
+    """No more than max_concurrency calls run at once; exceptions reach the caller"""
+    disk = DiskIO(max_concurrency=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.pop()
+
+    pool = eventlet.GreenPool()
+    for _ in range(6):
+        pool.spawn(disk.run, 'write', work)
+    pool.waitall()
+    assert max(peak) <= 2
+
+    path = os.path.join(tempfile.mkdtemp(), 'missing')
+    try:
+        disk.run('read', open, path, 'rb')
+        assert False, 'expected FileNotFoundError'
+    except FileNotFoundError:
+        pass
+
+
+def test_loop_lag_sampling():
+    """Lag is how much longer than the interval a sleep took"""
+    monitor = LoopLagMonitor(interval=0.01, sleep=lambda seconds: time.sleep(seconds + 0.02))
+    lag = monitor.sample()
+    assert 0.015 < lag < 0.5
+    stats = monitor.stats()
+    assert stats['samples'] == 1 and stats['max_ms'] >= 15
+    monitor.reset()
+    assert monitor.stats()['samples'] == 0
+
+
+def main():
+    print("=" * 60)
+    print("DISK I/O OFFLOAD VERIFICATION")
+    print("=" * 60)
+    for test in (test_offloaded_calls_keep_greenlets_running, test_bounded_concurrency_and_errors,
+                 test_loop_lag_sampling):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
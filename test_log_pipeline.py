@@ -0,0 +1,83 @@
+"""
+Test script to verify the asynchronous log pipeline
+"""
+
+import os
+import json
+import logging
+import tempfile
+
+from logger import LogPipeline, BatchRotatingFileHandler, StructuredFormatter, _PipelineHandler
+
+
+def make_pipeline(name, maxsize=100):
+    path = os.path.join(tempfile.mkdtemp(), 'test.log')
+    handler = BatchRotatingFileHandler(path, maxBytes=1024 * 1024, backupCount=1)
+    handler.setFormatter(StructuredFormatter())
+    pipeline = LogPipeline(maxsize=maxsize)
+    log = logging.getLogger(name)
+    log.setLevel(logging.DEBUG)
+    log.propagate = False
+    return pipeline, log, handler, path
+
+
+def test_records_written_in_order():
+    """Queued records reach the file as JSON lines, including tracebacks"""
+    pipeline, log, handler, path = make_pipeline('test-pipeline-order')
+    pipeline.attach(log, [handler])
+    for i in range(50):
+        log.info("record %d", i)
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        log.exception("failed")
+    pipeline.stop()
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['message'] for line in lines[:50]] == [f"record {i}" for i in range(50)]
+    assert 'ValueError: boom' in lines[-1]['exception']
+    assert pipeline.stats()['written'] == 51
+
+
+def test_debug_shed_first():
+    """With the writer stalled, DEBUG drops before INFO and WARNING still fits"""
+    pipeline, log, handler, path = make_pipeline('test-pipeline-shed', maxsize=20)
+    log.addHandler(_PipelineHandler(pipeline, [handler]))  # No writer thread: the queue only fills
+    for _ in range(15):
+        log.info("fill")
+    log.debug("shed")          # 15 >= 75% of 20
+    log.info("kept")           # 15 < 90% of 20
+    for _ in range(5):
+        log.info("more")       # INFO sheds from 18 on
+    log.warning("still kept")
+
+    stats = pipeline.stats()
+    assert stats['dropped'] == {'DEBUG': 1, 'INFO': 3}
+    assert stats['queued'] == 19
+
+
+def test_child_logger_records_are_written():
+    """Records propagating from a child logger go to the attached parent's files"""
+    pipeline, log, handler, path = make_pipeline('test-pipeline-parent')
+    pipeline.attach(log, [handler])
+    logging.getLogger('test-pipeline-parent.child').warning("from the child")
+    pipeline.stop()
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [(line['logger'], line['message']) for line in lines] == [('test-pipeline-parent.child', 'from the child')]
+
+
+def main():
+    print("=" * 60)
+    print("LOG PIPELINE VERIFICATION")
+    print("=" * 60)
+    for test in (test_records_written_in_order, test_debug_shed_first, test_child_logger_records_are_written):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,76 @@
+"""
+Test script to verify background network discovery
+"""
+
+import os
+import socket
+import tempfile
+
+from network_discovery import NetworkDiscovery, probe_hosts, read_arp_table, subnet_hosts
+
+
+class FixedAddress:
+    def snapshot(self):
+        return '192.168.1.10', 'http://192.168.1.10:5001', b'', ''
+
+
+def test_probe_without_forking():
+    """Non-blocking connects tell open ports from refusals"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(8)
+    port = listener.getsockname()[1]
+    try:
+        assert probe_hosts(['127.0.0.1'], port) == {'127.0.0.1': True}
+    finally:
+        listener.close()
+    assert probe_hosts(['127.0.0.1'], port) == {'127.0.0.1': False}
+
+
+def test_arp_table_and_subnet():
+    """Complete ARP entries are read; the whole subnet is covered"""
+    path = os.path.join(tempfile.mkdtemp(), 'arp')
+    with open(path, 'w') as f:
+        f.write("IP address       HW type     Flags       HW address            Mask     Device\n")
+        f.write("192.168.1.1      0x1         0x2         aa:bb:cc:dd:ee:01     *        wlan0\n")
+        f.write("192.168.1.77     0x1         0x0         00:00:00:00:00:00     *        wlan0\n")
+    assert read_arp_table(path) == {'192.168.1.1': 'aa:bb:cc:dd:ee:01'}
+    assert read_arp_table(path + '.missing') == {}
+
+    hosts = subnet_hosts('192.168.1.10')
+    assert len(hosts) == 253 and '192.168.1.254' in hosts and '192.168.1.10' not in hosts
+    assert len(subnet_hosts('10.0.0.5', prefix=8)) == 4093  # Narrowed to a /20
+    assert subnet_hosts('127.0.0.1') == []
+
+
+def test_snapshot_ttl_and_versions():
+    """Sweeps merge into a cached snapshot; silent devices expire after the TTL"""
+    discovery = NetworkDiscovery(FixedAddress(), 5001, ttl=60)
+    hosts = set(subnet_hosts('192.168.1.10'))
+    discovery.update('192.168.1.10', hosts, {'192.168.1.20': True}, {'192.168.1.1': 'aa:bb:cc:dd:ee:01'})
+    snapshot = discovery.snapshot()
+    assert snapshot['devices'] == ['192.168.1.1', '192.168.1.10', '192.168.1.20']
+    assert snapshot['details'][2]['netshare'] and snapshot['details'][0]['mac'] == 'aa:bb:cc:dd:ee:01'
+    version = snapshot['version']
+
+    discovery.update('192.168.1.10', hosts, {'192.168.1.20': True}, {'192.168.1.1': 'aa:bb:cc:dd:ee:01'})
+    assert discovery.snapshot()['version'] == version  # Nothing changed
+
+    discovery.devices['192.168.1.1']['last_seen'] -= 120
+    discovery.update('192.168.1.10', hosts, {'192.168.1.20': True}, {})
+    assert discovery.snapshot()['devices'] == ['192.168.1.10', '192.168.1.20']
+    assert discovery.snapshot()['version'] == version + 1
+
+
+def main():
+    print("=" * 60)
+    print("NETWORK DISCOVERY VERIFICATION")
+    print("=" * 60)
+    for test in (test_probe_without_forking, test_arp_table_and_subnet, test_snapshot_ttl_and_versions):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,79 @@
+"""
+Test script to verify the per-user permission index
+"""
+
+from permission_index import PermissionIndex
+
+
+def entry(name, size):
+    return {'name': name, 'size': size, 'mtime': 0, 'type': 'unknown'}
+
+
+def make_index():
+    index = PermissionIndex()
+    index.load_metadata({
+        'public.txt': {'owner': 'alice', 'permission': 'public'},
+        'private.txt': {'owner': 'alice', 'permission': 'private'},
+        'shared.txt': {'owner': 'alice', 'permission': 'restricted', 'allowed_users': ['bob']},
+    })
+    index.catalog_reset({
+        'public.txt': entry('public.txt', 10),
+        'private.txt': entry('private.txt', 20),
+        'shared.txt': entry('shared.txt', 40),
+        'legacy.txt': entry('legacy.txt', 80),  # No metadata: public
+    })
+    return index
+
+
+def test_visibility():
+    """Visible sets match can_access_file rules"""
+    index = make_index()
+    assert index.visible_files('alice') == {'public.txt', 'private.txt', 'shared.txt', 'legacy.txt'}
+    assert index.visible_files('bob') == {'public.txt', 'shared.txt', 'legacy.txt'}
+    assert index.visible_files('carol') == {'public.txt', 'legacy.txt'}
+    assert index.hidden_files('carol') == {'private.txt', 'shared.txt'}
+    assert index.hidden_files(None) == set()
+
+
+def test_totals():
+    """Per-user counts and bytes are kept without rescanning"""
+    index = make_index()
+    assert index.totals('alice') == (4, 150)
+    assert index.totals('bob') == (3, 130)
+    assert index.totals('carol') == (2, 90)
+    assert index.totals(None) == (4, 150)
+
+
+def test_incremental_changes():
+    """Permission updates, uploads and deletes adjust the sets and totals"""
+    index = make_index()
+    index.metadata_changed('shared.txt', {'owner': 'alice', 'permission': 'restricted', 'allowed_users': ['carol']})
+    assert 'shared.txt' not in index.visible_files('bob')
+    assert index.totals('carol') == (3, 130)
+
+    index.metadata_changed('new.bin', {'owner': 'bob', 'permission': 'private'})
+    index.catalog_added('new.bin', entry('new.bin', 5))
+    assert index.totals('bob') == (3, 95)
+    assert index.owned_count('bob') == 1
+
+    index.catalog_added('new.bin', entry('new.bin', 7))  # Re-uploaded with a new size
+    assert index.totals('bob') == (3, 97)
+
+    index.catalog_removed('new.bin', entry('new.bin', 7))
+    index.metadata_changed('new.bin', None)
+    assert index.totals('bob') == (2, 90)
+    assert index.owned_count('bob') == 0
+
+
+def main():
+    print("=" * 60)
+    print("PERMISSION INDEX VERIFICATION")
+    print("=" * 60)
+    for test in (test_visibility, test_totals, test_incremental_changes):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
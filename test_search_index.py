@@ -0,0 +1,109 @@
+"""
+Test script to verify the filename search index
+"""
+
+import os
+import tempfile
+
+from file_catalog import FileCatalog
+from permission_index import PermissionIndex
+from search_index import SearchIndex
+
+
+def make_index(names, metadata=None):
+    """Build a catalog over a temp folder holding the given names"""
+    folder = tempfile.mkdtemp()
+    for i, name in enumerate(names):
+        path = os.path.join(folder, name)
+        with open(path, 'w') as f:
+            f.write('x' * i)
+        os.utime(path, (1000 + i, 1000 + i))
+    catalog = FileCatalog(folder)
+    permissions = PermissionIndex()
+    permissions.load_metadata(metadata or {})
+    catalog.add_listener(permissions)
+    index = SearchIndex(permissions)
+    catalog.add_listener(index)
+    return folder, catalog, index
+
+
+def names_of(result):
+    return [entry['name'] for entry in result[1]]
+
+
+def test_ranking():
+    """Exact, prefix, token prefix and substring matches come in that order"""
+    _, _, index = make_index(['report.pdf', 'report', 'annual_report.pdf', 'myreports.txt', 'notes.txt'])
+    assert names_of(index.search('report')) == ['report', 'report.pdf', 'annual_report.pdf', 'myreports.txt']
+
+
+def test_typo_tolerance():
+    """Misspelled queries still find the file"""
+    _, _, index = make_index(['quarterly_budget.xlsx', 'holiday.jpg'])
+    assert names_of(index.search('budgte')) == ['quarterly_budget.xlsx']
+    assert names_of(index.search('holidya')) == ['holiday.jpg']
+    assert names_of(index.search('zzzzzz')) == []
+
+
+def test_limit_offset():
+    """Pagination slices the ranked results and reports the total"""
+    _, _, index = make_index([f'photo_{i}.jpg' for i in range(10)])
+    total, first = index.search('photo', limit=4)
+    _, second = index.search('photo', limit=4, offset=4)
+    assert total == 10
+    assert len(first) == 4 and len(second) == 4
+    assert not {e['name'] for e in first} & {e['name'] for e in second}
+
+
+def test_total_includes_typo_matches_on_every_page():
+    """The total counts typo matches whether or not the page reaches them"""
+    _, _, index = make_index([f'budget_{i}.xlsx' for i in range(5)] + ['budgte_notes.txt'])
+    totals = {index.search('budget', limit=limit, offset=offset)[0] for limit, offset in ((2, 0), (2, 2), (10, 0))}
+    assert totals == {6}
+
+
+def test_incremental_updates():
+    """Uploads, deletes and renames are reflected without a rescan"""
+    folder, catalog, index = make_index(['a.txt'])
+    with open(os.path.join(folder, 'invoice.pdf'), 'w') as f:
+        f.write('data')
+    catalog.refresh('invoice.pdf')
+    assert names_of(index.search('invoice')) == ['invoice.pdf']
+
+    os.rename(os.path.join(folder, 'invoice.pdf'), os.path.join(folder, 'receipt.pdf'))
+    catalog.rename('invoice.pdf', 'receipt.pdf')
+    assert names_of(index.search('invoice')) == []
+    assert names_of(index.search('receipt')) == ['receipt.pdf']
+
+    catalog.remove('receipt.pdf')
+    assert names_of(index.search('receipt')) == []
+
+
+def test_permission_filtering():
+    """Private and restricted files only show up for the right users"""
+    _, _, index = make_index(['plan_public.txt', 'plan_private.txt', 'plan_shared.txt'], {
+        'plan_public.txt': {'owner': 'alice', 'permission': 'public'},
+        'plan_private.txt': {'owner': 'alice', 'permission': 'private'},
+        'plan_shared.txt': {'owner': 'alice', 'permission': 'restricted', 'allowed_users': ['bob']},
+    })
+    assert sorted(names_of(index.search('plan', 'alice'))) == ['plan_private.txt', 'plan_public.txt', 'plan_shared.txt']
+    assert sorted(names_of(index.search('plan', 'bob'))) == ['plan_public.txt', 'plan_shared.txt']
+    assert names_of(index.search('plan', 'carol')) == ['plan_public.txt']
+
+    index.permissions.metadata_changed('plan_private.txt', {'owner': 'alice', 'permission': 'public'})
+    assert 'plan_private.txt' in names_of(index.search('plan', 'carol'))
+
+
+def main():
+    print("=" * 60)
+    print("SEARCH INDEX VERIFICATION")
+    print("=" * 60)
+    for test in (test_ranking, test_typo_tolerance, test_limit_offset,
+                 test_total_includes_typo_matches_on_every_page, test_incremental_updates, test_permission_filtering):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
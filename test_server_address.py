@@ -0,0 +1,40 @@
+"""
+Test script to verify the cached server URL and QR code
+"""
+
+import server_address
+from server_address import ServerAddress
+
+
+def test_qr_rebuilt_only_on_address_change():
+    """The QR code is rendered once per address, not per check"""
+    addresses = iter(['192.168.1.20', '192.168.1.20', '10.0.0.5'])
+    original = server_address.get_local_ip
+    server_address.get_local_ip = lambda: next(addresses)
+    try:
+        address = ServerAddress(port=5001)
+        ip, url, png, etag = address.snapshot()
+        assert url == 'http://192.168.1.20:5001' and png.startswith(b'\x89PNG')
+
+        assert not address.check()
+        assert address.snapshot()[3] == etag
+
+        assert address.check()
+        ip, url, _, new_etag = address.snapshot()
+        assert ip == '10.0.0.5' and url == 'http://10.0.0.5:5001' and new_etag != etag
+    finally:
+        server_address.get_local_ip = original
+
+
+def main():
+    print("=" * 60)
+    print("SERVER ADDRESS VERIFICATION")
+    print("=" * 60)
+    for test in (test_qr_rebuilt_only_on_address_change,):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
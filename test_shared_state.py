@@ -0,0 +1,128 @@
+"""
+Test script to verify the multi-worker shared state store
+"""
+
+import os
+import tempfile
+import threading
+
+import greenlet
+
+from file_catalog import FileCatalog
+from shared_state import SQLiteStore, SharedDict, SharedCounters, ChangeFeed, CatalogPublisher, release
+
+
+def make_store():
+    return SQLiteStore(os.path.join(tempfile.mkdtemp(), 'shared.db'))
+
+
+def test_shared_dict_write_back():
+    """In-place edits are written back by sync() and seen by another connection"""
+    store = make_store()
+    users = SharedDict(store, 'users')
+    users['alice'] = {'role': 'user', 'last_login': None}
+    release()
+
+    users['alice']['last_login'] = 'now'
+    users['alice']['role'] = 'admin'  # Same object within the unit of work
+    users.sync()
+
+    other = SharedDict(SQLiteStore(store.path), 'users')
+    assert other['alice'] == {'role': 'admin', 'last_login': 'now'}
+    assert 'bob' not in other and len(other) == 1
+    del other['alice']
+    release()
+    assert users.get('alice') is None
+
+
+def test_seed_runs_once():
+    """The first worker migrates JSON data; later seeds don't overwrite changes"""
+    store = make_store()
+    assert store.seed('sessions', {'t1': {'username': 'alice'}})
+    store.set('sessions', 't2', {'username': 'bob'})
+    assert not store.seed('sessions', {'t1': {'username': 'stale'}})
+    assert store.items('sessions') == {'t1': {'username': 'alice'}, 't2': {'username': 'bob'}}
+
+
+def test_counters_across_threads():
+    """Shared counters add up increments from every thread and connection"""
+    store = make_store()
+    counters = SharedCounters(store, ['total_uploads', 'total_size'])
+
+    def work():
+        for _ in range(50):
+            counters.add('total_uploads')
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counters.add('total_size', 10)
+    counters.reset('total_size')
+    assert counters.snapshot() == {'total_uploads': 200, 'total_size': 0}
+
+
+def test_change_feed_skips_own_writes():
+    """Only changes written by other processes reach the handlers"""
+    store = make_store()
+    feed = ChangeFeed(store)
+    seen = []
+    feed.on('files', seen.append)
+
+    store.set('files', 'mine.txt', 1)
+    with store._connect() as conn:
+        conn.execute("INSERT INTO changes (ns, key, origin) VALUES ('files', 'theirs.txt', 'other:1')")
+    assert feed.poll() == 1
+    assert seen == ['theirs.txt']
+    assert feed.poll() == 0
+
+
+def test_requests_on_one_thread_keep_their_values():
+    """One greenlet's release() doesn't drop values another request on the same thread still has to sync"""
+    store = make_store()
+    users = SharedDict(store, 'users')
+    users['alice'] = {'role': 'user'}
+    release()
+
+    def slow_request():
+        users['alice']['role'] = 'admin'
+        other.switch()  # Yields to the hub, which runs another request
+        users.sync()
+
+    slow = greenlet.greenlet(slow_request)
+    other = greenlet.greenlet(lambda: (users.get('alice'), release(), slow.switch()))
+    slow.switch()
+    assert store.get('users', 'alice') == {'role': 'admin'}
+
+
+def test_catalog_changes_store_no_values():
+    """File changes reach other workers through the feed without a stored key per file"""
+    store = make_store()
+    feed = ChangeFeed(store)
+    folder = tempfile.mkdtemp()
+    catalog = FileCatalog(folder)
+    catalog.add_listener(CatalogPublisher(store, feed))
+    for i in range(20):
+        open(os.path.join(folder, f'{i}.txt'), 'w').close()
+        catalog.refresh(f'{i}.txt')
+        os.remove(os.path.join(folder, f'{i}.txt'))
+        catalog.refresh(f'{i}.txt')
+    assert store.count('files') == 0
+    assert len(store.changes(0)) == 40
+
+
+def main():
+    print("=" * 60)
+    print("SHARED STATE VERIFICATION")
+    print("=" * 60)
+    for test in (test_shared_dict_write_back, test_seed_runs_once, test_counters_across_threads,
+                 test_change_feed_skips_own_writes,
+                 test_requests_on_one_thread_keep_their_values, test_catalog_changes_store_no_values):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,85 @@
+"""
+Test script to verify windowed text preview, tail and search on large files
+"""
+
+import os
+import tempfile
+
+from text_preview import TextPreview, LineIndex, MAX_LINE_BYTES
+
+
+def write_lines(count, extra=b''):
+    path = os.path.join(tempfile.mkdtemp(), 'app.log')
+    with open(path, 'wb') as f:
+        f.write(b''.join(b'line %d\n' % i for i in range(1, count + 1)))
+        f.write(extra)
+    return path
+
+
+def test_windows_across_index_checkpoints():
+    """Windows start at the right line even when the index has many checkpoints"""
+    path = write_lines(5000)
+    with open(path, 'rb') as f:
+        index = LineIndex(os.path.getsize(path), stride=64)
+        assert index.line_offset(f, 0) == 0
+        assert index.line_offset(f, 9) == len(b''.join(b'line %d\n' % i for i in range(1, 10)))
+        assert not index.complete  # Only scanned as far as needed
+        assert index.line_of(f, index.line_offset(f, 4321)) == 4321
+        assert index.line_offset(f, 5000) is None
+
+    preview = TextPreview()
+    window = preview.window(path, 4999, 10)
+    assert window['lines'] == ['line 4999', 'line 5000'] and window['eof'] and window['next_line'] is None
+    assert window['total_lines'] == 5000
+
+    window = preview.window(path, 10, 3)
+    assert window['lines'] == ['line 10', 'line 11', 'line 12'] and window['next_line'] == 13
+
+
+def test_response_caps():
+    """Windows stop at the byte budget and long lines are cut"""
+    path = write_lines(100, extra=b'x' * (MAX_LINE_BYTES * 3) + b'\nafter\n')
+    preview = TextPreview(max_bytes=200)
+    window = preview.window(path, 1, 1000)
+    assert window['truncated'] and window['lines'][0] == 'line 1'
+    assert preview.window(path, window['next_line'], 1)['lines'] == [f"line {window['next_line']}"]
+
+    long_line = TextPreview().window(path, 101, 2)
+    assert len(long_line['lines'][0]) == MAX_LINE_BYTES and long_line['lines'][1] == 'after'
+
+
+def test_tail():
+    """Tail reads from the end, without a trailing newline too"""
+    path = write_lines(1000, extra=b'last partial')
+    tail = TextPreview().tail(path, 3)
+    assert tail['lines'] == ['line 999', 'line 1000', 'last partial']
+    assert tail['eof'] and not tail['truncated']
+
+
+def test_search_with_cursor():
+    """Search reports line numbers, one result per line, and resumes from the cursor"""
+    path = write_lines(300)
+    preview = TextPreview()
+    result = preview.search(path, 'LINE 1', limit=5)
+    assert [m['line'] for m in result['matches']] == [1, 10, 11, 12, 13]
+    assert result['matches'][1]['text'] == 'line 10'
+
+    rest = preview.search(path, 'line 1', cursor=result['next_cursor'], limit=1000, ignore_case=False)
+    assert rest['matches'][0]['line'] == 14 and rest['next_cursor'] is None
+    assert len(result['matches']) + len(rest['matches']) == 1 + 10 + 100  # 1, 10-19, 100-199
+
+    assert preview.search(path, 'LINE 1', ignore_case=False)['matches'] == []
+
+
+def main():
+    print("=" * 60)
+    print("TEXT PREVIEW VERIFICATION")
+    print("=" * 60)
+    for test in (test_windows_across_index_checkpoints, test_response_caps, test_tail, test_search_with_cursor):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,87 @@
+"""
+Test script to verify the shared-text store: paging, limits, log replay and compaction
+"""
+
+import os
+import tempfile
+
+from shared_state import SQLiteStore, SharedDict
+from text_store import TextStore, SharedTextStore
+
+
+def test_pages_and_author_views():
+    """Pages are newest first with a cursor; author views use their own index"""
+    store = TextStore(log_path=None, limit=10)
+    for i in range(12):
+        store.add(f'text {i}', 'alice' if i % 2 else 'bob')
+    assert len(store) == 10 and store.get('1') is None  # Oldest trimmed
+
+    texts, cursor = store.page(limit=4)
+    assert [t['id'] for t in texts] == ['12', '11', '10', '9'] and cursor == 9
+    texts, cursor = store.page(before=cursor, limit=4)
+    assert [t['id'] for t in texts] == ['8', '7', '6', '5']
+    texts, cursor = store.page(before=cursor, limit=4)
+    assert [t['id'] for t in texts] == ['4', '3'] and cursor is None
+
+    assert store.delete('12')['author'] == 'alice'
+    assert store.delete('12') is None
+    texts, _ = store.page(author='alice')
+    assert [t['id'] for t in texts] == ['10', '8', '6', '4']
+    assert store.page(author='nobody') == ([], None)
+
+
+def test_size_limit():
+    """Snippets over the size limit and empty ones are refused"""
+    store = TextStore(log_path=None, max_bytes=16)
+    assert store.check('short') is None
+    assert store.check('x' * 17) and store.check('é' * 9) and store.check('')
+
+
+def test_log_replay_and_compaction():
+    """Texts survive a restart; compaction drops dead records without reusing ids"""
+    path = os.path.join(tempfile.mkdtemp(), 'texts.jsonl')
+    store = TextStore(log_path=path, limit=5)
+    for i in range(300):
+        store.add(f'text {i}', 'alice')
+    store.delete('300')
+    with open(path) as f:
+        assert sum(1 for _ in f) < 120  # Compacted along the way
+
+    with open(path, 'a') as f:
+        f.write('{"op": "add", "te')  # Torn final write
+    reopened = TextStore(log_path=path, limit=5)
+    assert [t['id'] for t in reopened.page()[0]] == ['299', '298', '297', '296']
+    reopened.add('after crash', 'bob')
+    assert TextStore(log_path=path, limit=5).get('301')['text'] == 'after crash'
+
+    reopened.delete('301')
+    reopened.compact()
+    assert TextStore(log_path=path, limit=5).add('next', 'bob')['id'] == '302'
+
+
+def test_shared_store_variant():
+    """Multi-worker texts share ids, ordering and limits through the shared store"""
+    shared = SQLiteStore(os.path.join(tempfile.mkdtemp(), 'shared.db'))
+    store = SharedTextStore(shared, SharedDict(shared, 'shared_texts'), limit=3)
+    other_worker = SharedTextStore(shared, SharedDict(shared, 'shared_texts'), limit=3)
+    for i in range(4):
+        (store if i % 2 else other_worker).add(f'text {i}', 'alice')
+    texts, cursor = store.page(limit=2)
+    assert [t['id'] for t in texts] == ['4', '3'] and cursor == 3
+    assert [t['id'] for t in other_worker.page(before=cursor)[0]] == ['2']
+    assert other_worker.delete('4')['text'] == 'text 3' and store.get('4') is None
+
+
+def main():
+    print("=" * 60)
+    print("SHARED TEXT STORE VERIFICATION")
+    print("=" * 60)
+    for test in (test_pages_and_author_views, test_size_limit, test_log_replay_and_compaction,
+                 test_shared_store_variant):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,84 @@
+"""
+Test script to verify thumbnail rendering, caching and eviction
+"""
+
+import os
+import time
+import tempfile
+
+from PIL import Image
+
+from thumbnails import ThumbnailCache, snap_width
+
+
+def make_cache(max_bytes=10 * 1024 * 1024):
+    root = tempfile.mkdtemp()
+    upload_folder = os.path.join(root, 'shared')
+    os.makedirs(upload_folder)
+    return ThumbnailCache(upload_folder, os.path.join(root, 'thumbs'), max_bytes=max_bytes), upload_folder
+
+
+def save_image(folder, name, size=(1600, 900), color=(200, 40, 40)):
+    Image.new('RGB', size, color).save(os.path.join(folder, name))
+
+
+def test_render_and_cache_hit():
+    """A thumbnail is rendered once at the snapped width, then served from the cache"""
+    cache, folder = make_cache()
+    save_image(folder, 'photo.jpg')
+
+    path, etag, fmt = cache.get('photo.jpg', 200, 'jpeg')
+    assert fmt == 'jpeg' and etag.endswith('_256_jpeg')
+    with Image.open(path) as thumb:
+        assert thumb.size[0] == 256
+    mtime = os.path.getmtime(path)
+
+    time.sleep(0.01)
+    assert cache.get('photo.jpg', 256, 'jpeg') == (path, etag, fmt)
+    assert os.path.getmtime(path) >= mtime  # Hit refreshes recency
+
+    # A changed file gets a new key
+    save_image(folder, 'photo.jpg', color=(10, 10, 200))
+    assert cache.get('photo.jpg', 256, 'jpeg')[1] != etag
+
+
+def test_widths_and_non_images():
+    """Widths snap to the standard sizes; other files have no thumbnail"""
+    assert snap_width(1) == 128
+    assert snap_width(300) == 512
+    assert snap_width(5000) == 1024
+
+    cache, folder = make_cache()
+    with open(os.path.join(folder, 'notes.txt'), 'w') as f:
+        f.write('hello')
+    assert cache.get('notes.txt') is None
+    if not cache.ffmpeg:
+        assert cache.get('clip.mp4') is None
+
+
+def test_eviction_keeps_cache_bounded():
+    """Least recently used thumbnails are dropped once the cache is over its limit"""
+    cache, folder = make_cache(max_bytes=1)
+    for i in range(3):
+        save_image(folder, f'img{i}.png', size=(300, 300), color=(i * 80, 0, 0))
+        cache.get(f'img{i}.png', 128, 'jpeg')
+    assert cache.stats()['bytes'] <= 1
+    assert len(os.listdir(cache.cache_dir)) == 0
+
+    cache.max_bytes = 10 * 1024 * 1024
+    path, _, _ = cache.get('img0.png', 128, 'jpeg')
+    assert os.path.exists(path) and cache.stats()['bytes'] == os.path.getsize(path)
+
+
+def main():
+    print("=" * 60)
+    print("THUMBNAIL CACHE VERIFICATION")
+    print("=" * 60)
+    for test in (test_render_and_cache_hit, test_widths_and_non_images, test_eviction_keeps_cache_bounded):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,105 @@
+"""
+Test script to verify the trash: instant soft deletes, restore, retention and paced purging
+"""
+
+import os
+import time
+import tempfile
+
+import trash as trash_module
+from trash import Trash
+
+
+def make_trash(**kwargs):
+    folder = tempfile.mkdtemp()
+    for name in ('a.txt', 'b.txt', 'c.txt'):
+        with open(os.path.join(folder, name), 'w') as f:
+            f.write(name * 10)
+    return folder, Trash(folder, path=os.path.join(tempfile.mkdtemp(), 'trash.db'), **kwargs)
+
+
+def test_move_list_and_restore():
+    """Deleted files leave the folder at once and come back with their metadata"""
+    folder, trash = make_trash()
+    moved = trash.move_many(folder, [('a.txt', {'owner': 'alice', 'permission': 'private'}),
+                                     ('b.txt', None), ('missing.txt', None)], 'alice')
+    assert set(moved) == {'a.txt', 'b.txt'} and moved['a.txt']['size'] == 50
+    assert sorted(os.listdir(folder)) == ['.trash', 'c.txt']
+
+    entries, cursor = trash.list(limit=1)
+    assert [e['filename'] for e in entries] == ['b.txt'] and cursor is not None
+    assert [e['filename'] for e in trash.list('alice')[0]] == ['b.txt', 'a.txt']
+    assert trash.list('bob') == ([], None)
+
+    open(os.path.join(folder, 'a.txt'), 'w').close()  # Name taken again meanwhile
+    trash_id = moved['a.txt']['id']
+    try:
+        trash.restore(trash_id, folder)
+        assert False, 'restore over an existing file'
+    except FileExistsError:
+        pass
+    entry = trash.restore(trash_id, folder, 'a (restored).txt')
+    assert entry['metadata'] == {'owner': 'alice', 'permission': 'private'}
+    with open(os.path.join(folder, 'a (restored).txt')) as f:
+        assert f.read() == 'a.txt' * 10
+    assert trash.get(trash_id) is None
+
+
+def test_retention_and_paced_purge():
+    """Expired entries are unlinked; large files are truncated in steps at the purge rate"""
+    slept = []
+    folder, trash = make_trash(retention_days=1, rate=1024 * 1024 * 1024, sleep=slept.append)
+    with open(os.path.join(folder, 'big.bin'), 'wb') as f:
+        f.truncate(trash_module.PURGE_STEP * 2 + 10)  # Sparse, so cheap to create
+    moved = trash.move_many(folder, [('big.bin', None), ('a.txt', None), ('b.txt', None)], 'admin')
+
+    assert trash.purge() == 0  # Nothing expired yet
+    assert trash.expire([moved['a.txt']['id']]) == 1 and trash.wake.is_set()
+    assert trash.purge() == 1 and trash.get(moved['a.txt']['id']) is None
+
+    assert trash.purge(now=time.time() + 2 * 86400) == 2
+    assert os.listdir(trash.folder) == []
+    assert len(slept) == 5 and abs(sum(slept) - (trash_module.PURGE_STEP * 2 + 10 + 100) / 2 ** 30) < 1e-9
+    assert trash.stats()['files'] == 0 and trash.stats()['purged'] == 3
+
+
+def test_stuck_entry_backs_off_and_due_entries_stay_put():
+    """An entry that can't be unlinked is retried later, not in a loop; due entries can't be restored"""
+    folder, trash = make_trash()
+    moved = trash.move_many(folder, [('a.txt', None), ('b.txt', None)], 'admin')
+    stuck, due = moved['a.txt']['id'], moved['b.txt']['id']
+    os.remove(os.path.join(trash.folder, stuck))
+    os.mkdir(os.path.join(trash.folder, stuck))  # os.remove() fails on it with an error other than not-found
+
+    trash.expire([stuck, due])
+    try:
+        trash.restore(due, folder)
+        assert False, 'restored an entry the purger may be truncating'
+    except FileNotFoundError:
+        pass
+    assert trash.purge() == 1 and trash.get(due) is None
+    assert trash.get(stuck)['purge_at'] > time.time() + trash_module.PURGE_RETRY - 5
+    assert trash.purge() == 0  # Nothing due until the retry time
+
+    trash.purge(now=time.time() + trash_module.PURGE_RETRY + 1)  # Fails again: the delay doubles
+    assert trash.get(stuck)['purge_at'] > time.time() + 2 * trash_module.PURGE_RETRY - 5
+    try:
+        trash.restore(stuck, folder)  # Not due, but a purge already started on it
+        assert False, 'restored a partly purged entry'
+    except FileNotFoundError:
+        pass
+
+
+def main():
+    print("=" * 60)
+    print("TRASH VERIFICATION")
+    print("=" * 60)
+    for test in (test_move_list_and_restore, test_retention_and_paced_purge,
+                 test_stuck_entry_backs_off_and_due_entries_stay_put):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,118 @@
+"""
+Test script to verify streamed bulk/folder uploads: multipart parsing, tar streams and safe paths
+"""
+
+import io
+import os
+import tarfile
+import tempfile
+
+from file_catalog import FileCatalog, is_shared_path
+from upload_stream import UploadReceiver, clean_relative_path
+
+BOUNDARY = 'xYzBoundary'
+
+
+class Trickle(io.RawIOBase):
+    """A request body that arrives a few bytes at a time"""
+
+    def __init__(self, data, step=7):
+        self.data = data
+        self.step = step
+
+    def read(self, size=-1):
+        chunk, self.data = self.data[:self.step], self.data[self.step:]
+        return chunk
+
+
+def multipart(parts):
+    body = b''
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        body += f'--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n'.encode() + value + b'\r\n'
+    return body + f'--{BOUNDARY}--\r\n'.encode()
+
+
+def test_clean_paths():
+    """Client paths keep their folders but can't climb out or hide"""
+    assert clean_relative_path('photos/2024/a b.jpg') == 'photos/2024/a_b.jpg'
+    assert clean_relative_path('../../etc/passwd') == 'etc/passwd'
+    assert clean_relative_path('C:\\Users\\.ssh\\key') == 'C/Users/ssh/key'
+    assert clean_relative_path('/../..') is None
+    assert is_shared_path('photos/2024/a.jpg') and not is_shared_path('.trash/x')
+    assert not is_shared_path('a/../b') and not is_shared_path('/etc/passwd')
+
+
+def test_multipart_streams_to_nested_folders():
+    """Parts are written as they arrive, paths come from the field before each file"""
+    folder = tempfile.mkdtemp()
+    body = multipart([
+        ('permission', b'private', None),
+        ('paths', b'album/inner/one.bin', None),
+        ('files', b'\r\n--' + os.urandom(3000), 'one.bin'),  # Data that looks like a boundary start
+        ('files', b'plain', 'two.txt'),  # No path field: the part's own name
+        ('paths', b'album/one.bin', None),
+        ('files', b'again', 'x'),
+    ])
+    receiver = UploadReceiver(folder)
+    receiver.receive_multipart(Trickle(body), BOUNDARY)
+
+    assert [name for name, _ in receiver.saved] == ['album/inner/one.bin', 'two.txt', 'album/one.bin']
+    assert receiver.saved[0][1] == 3004 and receiver.fields == {'permission': 'private'}
+    catalog = FileCatalog(folder)
+    assert sorted(catalog.entries) == ['album/inner/one.bin', 'album/one.bin', 'two.txt']
+
+    receiver = UploadReceiver(folder)  # Same names again are numbered, not overwritten
+    receiver.receive_multipart(io.BytesIO(multipart([('files', b'new', 'two.txt')])), BOUNDARY)
+    assert receiver.saved == [('two_1.txt', 3)]
+
+
+def test_cut_off_upload_leaves_no_temp_files():
+    """A body that ends mid-file keeps the finished files and drops the partial one"""
+    folder = tempfile.mkdtemp()
+    body = multipart([('files', b'complete', 'a.txt'), ('files', b'x' * 5000, 'b.txt')])
+    receiver = UploadReceiver(folder)
+    try:
+        receiver.receive_multipart(io.BytesIO(body[:-2000]), BOUNDARY)
+        assert False, 'truncated body accepted'
+    except ValueError:
+        pass  # The route answers 400 and still records the finished files
+    assert receiver.saved == [('a.txt', 8)] and receiver.errors[0]['file'] == 'b.txt'
+    assert os.listdir(folder) == ['a.txt']
+
+
+def test_tar_stream():
+    """Tar members land in their folders; links and escapes are refused or contained"""
+    data = io.BytesIO()
+    with tarfile.open(fileobj=data, mode='w:gz') as archive:
+        for name, content in (('site/index.html', b'<h1>'), ('site/css/a.css', b'a{}'), ('../escape.txt', b'!')):
+            member = tarfile.TarInfo(name)
+            member.size = len(content)
+            archive.addfile(member, io.BytesIO(content))
+        link = tarfile.TarInfo('site/passwd')
+        link.type = tarfile.SYMTYPE
+        link.linkname = '/etc/passwd'
+        archive.addfile(link)
+
+    folder = os.path.join(tempfile.mkdtemp(), 'shared')
+    os.makedirs(folder)
+    receiver = UploadReceiver(folder)
+    receiver.receive_tar(io.BytesIO(data.getvalue()))
+    assert [name for name, _ in receiver.saved] == ['site/index.html', 'site/css/a.css', 'escape.txt']
+    assert receiver.errors == [{'file': 'site/passwd', 'error': 'Only regular files are accepted'}]
+    assert os.listdir(os.path.dirname(folder)) == ['shared']
+
+
+def main():
+    print("=" * 60)
+    print("UPLOAD STREAM VERIFICATION")
+    print("=" * 60)
+    for test in (test_clean_paths, test_multipart_streams_to_nested_folders,
+                 test_cut_off_upload_leaves_no_temp_files, test_tar_stream):
+        test()
+        print(f"  ✓ {test.__doc__}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,275 @@
+"""
+Text Preview
+Windows of lines from large text files: a sparse line-offset index built lazily
+per file, tail reads from the end, and memory-mapped search, all with capped responses
+"""
+
+import os
+import re
+import mmap
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+
+from disk_io import DiskIO
+
+INDEX_STRIDE = 1024 * 1024  # One checkpoint (newlines seen so far) per MB of file
+MAX_RESPONSE_BYTES = 256 * 1024
+MAX_LINES = 2000
+MAX_LINE_BYTES = 4096  # Longer lines (minified JSON, one-line dumps) are cut
+SEARCH_SCAN_BYTES = 64 * 1024 * 1024  # Per request; the cursor resumes the scan
+INDEX_CACHE_SIZE = 32
+
+
+def _decode(raw):
+    return raw.rstrip(b'\r\n').decode('utf-8', errors='replace')
+
+
+def is_text(path):
+    """Heuristic: no NUL bytes in the first 8 KB"""
+    with open(path, 'rb') as f:
+        return b'\0' not in f.read(8192)
+
+
+class LineIndex:
+    """Newline counts at every INDEX_STRIDE bytes of one version of a file.
+
+    lines[i] is the number of newlines before byte i * stride, so any line can
+    be found by seeking to the checkpoint before it and counting at most one
+    stride of newlines. Checkpoints are added only as far as requests need.
+    """
+
+    def __init__(self, size, stride=INDEX_STRIDE):
+        self.size = size
+        self.stride = stride
+        self.lines = array('q', [0])
+        self.scanned_to = 0
+        self.newlines = 0  # Newlines before scanned_to
+        self.ends_with_newline = False
+        self.lock = threading.Lock()
+
+    @property
+    def complete(self):
+        return self.scanned_to >= self.size
+
+    @property
+    def total_lines(self):
+        """Number of lines once the whole file has been scanned, else None"""
+        if not self.complete:
+            return None
+        if self.size == 0 or self.ends_with_newline:
+            return self.newlines
+        return self.newlines + 1
+
+    def extend(self, f, line=None, offset=None):
+        """Scan forward until line (0-based) starts before scanned_to, or offset is covered"""
+        with self.lock:
+            while not self.complete:
+                if line is not None and self.newlines >= line:
+                    break
+                if offset is not None and self.scanned_to > offset:
+                    break
+                f.seek(self.scanned_to)
+                block = f.read(self.stride)
+                if not block:
+                    self.size = self.scanned_to  # Shrunk since indexing began
+                    break
+                self.newlines += block.count(b'\n')
+                self.scanned_to += len(block)
+                if len(block) == self.stride:
+                    self.lines.append(self.newlines)
+                if self.complete:
+                    self.ends_with_newline = block.endswith(b'\n')
+
+    def line_offset(self, f, line):
+        """Byte offset where line (0-based) starts, or None past the end of the file"""
+        if line <= 0:
+            return 0
+        self.extend(f, line=line)
+        if self.newlines < line:
+            return None
+        # Last checkpoint with fewer than `line` newlines before it; the one we want is in its block
+        i = bisect.bisect_left(self.lines, line) - 1
+        f.seek(i * self.stride)
+        block = f.read(self.stride)
+        need = line - self.lines[i]
+        pos = -1
+        for _ in range(need):
+            pos = block.find(b'\n', pos + 1)
+        offset = i * self.stride + pos + 1
+        return offset if offset < self.size else None
+
+    def line_of(self, f, offset):
+        """0-based number of the line containing byte offset"""
+        self.extend(f, offset=offset)
+        i = min(offset // self.stride, len(self.lines) - 1)
+        f.seek(i * self.stride)
+        return self.lines[i] + f.read(offset - i * self.stride).count(b'\n')
+
+
+class TextPreview:
+    """Line windows, tails and searches over shared files, never reading more than needed"""
+
+    def __init__(self, max_bytes=MAX_RESPONSE_BYTES, max_lines=MAX_LINES, workers=2):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.disk = DiskIO(max_concurrency=workers)  # Scans run off the event loop
+        self.lock = threading.Lock()
+        self.indexes = OrderedDict()  # path -> (size, mtime_ns, LineIndex), most recent last
+
+    def _index(self, path, f):
+        st = os.fstat(f.fileno())
+        with self.lock:
+            cached = self.indexes.get(path)
+            if cached and cached[:2] == (st.st_size, st.st_mtime_ns):
+                self.indexes.move_to_end(path)
+                return cached[2]
+            index = LineIndex(st.st_size)
+            self.indexes[path] = (st.st_size, st.st_mtime_ns, index)
+            if len(self.indexes) > INDEX_CACHE_SIZE:
+                self.indexes.popitem(last=False)
+            return index
+
+    def window(self, path, line=1, count=200):
+        """Up to count lines starting at line (1-based)"""
+        return self.disk.run('preview', self._window, path, max(int(line), 1), min(max(int(count), 1), self.max_lines))
+
+    def tail(self, path, count=200):
+        """The last count lines"""
+        return self.disk.run('preview', self._tail, path, min(max(int(count), 1), self.max_lines))
+
+    def search(self, path, query, cursor=0, limit=50, ignore_case=True):
+        """Lines containing query, scanning at most SEARCH_SCAN_BYTES from the byte cursor"""
+        return self.disk.run('preview', self._search, path, query, max(int(cursor), 0),
+                             min(max(int(limit), 1), self.max_lines), ignore_case)
+
+    # ---- workers (native threads) ----
+
+    def _window(self, path, line, count):
+        with open(path, 'rb') as f:
+            index = self._index(path, f)
+            start = index.line_offset(f, line - 1)
+            lines, truncated = [], False
+            if start is not None:
+                f.seek(start)
+                lines, truncated = self._read_lines(f, count)
+            eof = start is None or not f.read(1)
+            return {
+                'line': line,
+                'lines': lines,
+                'next_line': None if eof else line + len(lines),
+                'eof': eof,
+                'truncated': truncated,
+                'total_lines': index.total_lines,
+                'size': index.size
+            }
+
+    def _read_lines(self, f, count):
+        """Read up to count lines from the current position within the byte budget"""
+        lines, used = [], 0
+        while len(lines) < count:
+            position = f.tell()
+            raw = f.readline(MAX_LINE_BYTES + 1)
+            if not raw:
+                break
+            if len(raw) > MAX_LINE_BYTES:
+                rest = raw
+                while rest[-1:] != b'\n':  # Skip the remainder of the long line
+                    rest = f.readline(1024 * 1024)
+                    if not rest:
+                        break
+                raw = raw[:MAX_LINE_BYTES]
+            if lines and used + len(raw) > self.max_bytes:
+                f.seek(position)
+                return lines, True
+            used += len(raw)
+            lines.append(_decode(raw))
+        return lines, False
+
+    def _tail(self, path, count):
+        with open(path, 'rb') as f:
+            size = f.seek(0, os.SEEK_END)
+            pos, data = size, b''
+            # Read backwards until there are enough newlines (one more for the partial first line)
+            while pos > 0 and data.count(b'\n') <= count and len(data) < self.max_bytes:
+                step = min(64 * 1024, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+
+            parts = data.split(b'\n')
+            if data.endswith(b'\n'):
+                parts.pop()
+            if pos > 0 and len(parts) > 1:
+                parts.pop(0)  # Started mid-line
+            truncated = pos > 0 and len(parts) < count  # Hit the byte budget first
+            parts = parts[-count:]
+            while len(parts) > 1 and sum(min(len(p), MAX_LINE_BYTES) + 1 for p in parts) > self.max_bytes:
+                parts.pop(0)
+                truncated = True
+
+            index = self._index(path, f)
+            total = index.total_lines
+            return {
+                'line': total - len(parts) + 1 if total is not None else None,
+                'lines': [_decode(p[:MAX_LINE_BYTES]) for p in parts],
+                'next_line': None,
+                'eof': True,
+                'truncated': truncated,
+                'total_lines': total,
+                'size': size
+            }
+
+    def _search(self, path, query, cursor, limit, ignore_case):
+        needle = query.encode('utf-8')
+        pattern = re.compile(re.escape(needle), re.IGNORECASE if ignore_case else 0)
+        matches, used = [], 0
+        with open(path, 'rb') as f:
+            index = self._index(path, f)
+            size = index.size
+            if size == 0 or cursor >= size:
+                return {'matches': [], 'next_cursor': None, 'scanned_to': size, 'size': size}
+            end = min(size, cursor + SEARCH_SCAN_BYTES)
+            next_cursor = end if end < size else None
+            last_line_end = -1
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Let a match that starts before `end` run past it; later ones belong to the next request
+                for m in pattern.finditer(mm, cursor, min(size, end + len(needle))):
+                    if m.start() >= end:
+                        break
+                    if m.start() < last_line_end:
+                        continue  # One result per line
+                    floor = max(0, m.start() - MAX_LINE_BYTES)
+                    line_start = mm.rfind(b'\n', floor, m.start()) + 1 or floor
+                    line_end = mm.find(b'\n', m.end(), m.end() + MAX_LINE_BYTES)
+                    if line_end == -1:
+                        line_end = min(size, m.end() + MAX_LINE_BYTES)
+                    last_line_end = line_end
+
+                    # Long lines: keep the part around the match
+                    snippet_start = max(line_start, m.start() - MAX_LINE_BYTES // 2)
+                    snippet = mm[snippet_start:min(line_end, snippet_start + MAX_LINE_BYTES)]
+                    if matches and used + len(snippet) > self.max_bytes:
+                        next_cursor = line_start
+                        break
+                    used += len(snippet)
+                    matches.append({
+                        'line': index.line_of(f, m.start()) + 1,
+                        'offset': m.start(),
+                        'text': _decode(snippet)
+                    })
+                    if len(matches) >= limit:
+                        next_cursor = line_end + 1 if line_end + 1 < size else None
+                        break
+        return {
+            'matches': matches,
+            'next_cursor': next_cursor,
+            'scanned_to': next_cursor if next_cursor is not None else size,
+            'size': size
+        }
+
+    def stats(self):
+        with self.lock:
+            return {'indexed_files': len(self.indexes),
+                    'indexed_bytes': sum(index.scanned_to for _, _, index in self.indexes.values())}
@@ -0,0 +1,204 @@
+"""
+Shared Text Store
+Text snippets with O(1) add and delete by id, a per-author index, size limits,
+and an append-only log (compacted as it grows) so they survive restarts
+"""
+
+import os
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+SHARED_TEXTS_LOG = 'data/shared_texts.jsonl'
+MAX_TEXTS = int(os.environ.get('SHARED_TEXT_LIMIT', 100))
+MAX_TEXT_BYTES = int(os.environ.get('SHARED_TEXT_MAX_KB', 64)) * 1024
+PAGE_SIZE = 50
+
+
+def _page(entries, before, limit):
+    """Up to limit entries (newest first) with ids below before, and the cursor for the next page"""
+    result = []
+    for entry in entries:
+        if before is not None and int(entry['id']) >= before:
+            continue
+        result.append(entry)
+        if len(result) > limit:
+            return result[:limit], int(result[limit - 1]['id'])
+    return result, None
+
+
+class TextStore:
+    """Snippets in insertion order, indexed by id and by author.
+
+    The OrderedDict is the deque-plus-index: appends, deletes by id and
+    trimming the oldest entry are all O(1), and newest-first pages are read by
+    iterating it backwards. Every change is appended to a JSON-lines log that
+    is replayed on startup and rewritten once it holds mostly dead records.
+    """
+
+    def __init__(self, log_path=SHARED_TEXTS_LOG, limit=MAX_TEXTS, max_bytes=MAX_TEXT_BYTES):
+        self.log_path = log_path
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.texts = OrderedDict()  # id -> entry, oldest first
+        self.by_author = {}  # author -> OrderedDict of ids, oldest first
+        self.last_id = 0
+        self.log = None
+        self.log_records = 0
+        if log_path:
+            self._load()
+            self.log = open(log_path, 'a', encoding='utf-8')
+            if self.log.tell() and not self._ends_with_newline():
+                self.log.write('\n')  # Keep the next record off a torn line
+            self._maybe_compact()
+
+    def check(self, text):
+        """Error message if text can't be shared, else None"""
+        if not text:
+            return 'Text cannot be empty'
+        if len(text.encode('utf-8')) > self.max_bytes:
+            return f'Text is larger than {self.max_bytes // 1024} KB'
+        return None
+
+    # ---- in-memory structure ----
+
+    def _insert(self, entry):
+        self.texts[entry['id']] = entry
+        self.by_author.setdefault(entry['author'], OrderedDict())[entry['id']] = None
+        self.last_id = max(self.last_id, int(entry['id']))
+        while len(self.texts) > self.limit:
+            self._remove(next(iter(self.texts)))
+
+    def _remove(self, text_id):
+        entry = self.texts.pop(text_id, None)
+        if entry is not None:
+            ids = self.by_author.get(entry['author'])
+            if ids is not None:
+                ids.pop(text_id, None)
+                if not ids:
+                    del self.by_author[entry['author']]
+        return entry
+
+    # ---- log ----
+
+    def _load(self):
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash
+                self.log_records += 1
+                if record.get('op') == 'add':
+                    self._insert(record['text'])
+                elif record.get('op') == 'del':
+                    self._remove(record['id'])
+                elif record.get('op') == 'meta':
+                    self.last_id = max(self.last_id, record['last_id'])
+
+    def _ends_with_newline(self):
+        with open(self.log_path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def _append(self, record):
+        if self.log:
+            self.log.write(json.dumps(record) + '\n')
+            self.log.flush()
+            self.log_records += 1
+
+    def _maybe_compact(self):
+        """Rewrite the log with only live entries once dead records dominate"""
+        if self.log and self.log_records > 2 * len(self.texts) + 100:
+            self.compact()
+
+    def compact(self):
+        with self.lock:
+            temp_path = self.log_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                # Ids of deleted newest entries must not be handed out again
+                f.write(json.dumps({'op': 'meta', 'last_id': self.last_id}) + '\n')
+                for entry in self.texts.values():
+                    f.write(json.dumps({'op': 'add', 'text': entry}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.log.close()
+            os.replace(temp_path, self.log_path)
+            self.log = open(self.log_path, 'a', encoding='utf-8')
+            self.log_records = len(self.texts) + 1
+
+    # ---- API ----
+
+    def add(self, text, author):
+        with self.lock:
+            entry = {
+                'id': str(self.last_id + 1),
+                'text': text,
+                'author': author,
+                'timestamp': datetime.now().isoformat()
+            }
+            self._insert(entry)
+            self._append({'op': 'add', 'text': entry})  # Trimming is replayed from the limit
+            self._maybe_compact()
+            return entry
+
+    def get(self, text_id):
+        return self.texts.get(text_id)
+
+    def delete(self, text_id):
+        with self.lock:
+            entry = self._remove(text_id)
+            if entry is not None:
+                self._append({'op': 'del', 'id': text_id})
+                self._maybe_compact()
+            return entry
+
+    def page(self, before=None, limit=PAGE_SIZE, author=None):
+        """(entries newest first, next cursor or None), optionally only one author's"""
+        with self.lock:
+            ids = self.by_author.get(author, ()) if author is not None else self.texts
+            return _page((self.texts[text_id] for text_id in reversed(ids)), before, limit)
+
+    def __len__(self):
+        return len(self.texts)
+
+
+class SharedTextStore(TextStore):
+    """The same API over a shared-store namespace, for multi-worker mode.
+
+    The store already persists, so there is no log; ordering comes from the
+    numeric ids (allocated with a shared counter) and the set is bounded by limit.
+    """
+
+    def __init__(self, store, texts, limit=MAX_TEXTS, max_bytes=MAX_TEXT_BYTES):
+        super().__init__(log_path=None, limit=limit, max_bytes=max_bytes)
+        self.store = store
+        self.texts = texts  # SharedDict of id -> entry
+
+    def _newest(self):
+        return sorted(self.texts.values(), key=lambda entry: int(entry['id']), reverse=True)
+
+    def add(self, text, author):
+        entry = {
+            'id': str(self.store.incr('text_id')),
+            'text': text,
+            'author': author,
+            'timestamp': datetime.now().isoformat()
+        }
+        self.texts[entry['id']] = entry
+        for old in self._newest()[self.limit:]:
+            self.texts.pop(old['id'], None)
+        return entry
+
+    def delete(self, text_id):
+        return self.texts.pop(text_id, None)
+
+    def page(self, before=None, limit=PAGE_SIZE, author=None):
+        entries = self._newest()
+        if author is not None:
+            entries = [entry for entry in entries if entry['author'] == author]
+        return _page(entries, before, limit)
@@ -0,0 +1,195 @@
+"""
+Thumbnail Cache
+Resized WebP/JPEG derivatives of images (and first-frame posters of videos when
+ffmpeg is installed) in a size-bounded LRU directory keyed by content hash
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import subprocess
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from disk_io import DiskIO
+from file_catalog import CatalogListener
+
+THUMB_DIR = 'data/thumbnails'
+THUMB_CACHE_BYTES = int(os.environ.get('THUMB_CACHE_MB', 256)) * 1024 * 1024
+THUMB_WIDTHS = (128, 256, 512, 1024)  # Requested widths snap up to one of these
+DEFAULT_WIDTH = 256
+
+IMAGE_EXTENSIONS = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tif', 'tiff'}
+VIDEO_EXTENSIONS = {'mp4', 'webm', 'mov', 'mkv', 'avi', 'ogg'}
+
+# Large photos shouldn't exhaust memory while decoding, but 30+ MP cameras are normal
+Image.MAX_IMAGE_PIXELS = 200_000_000
+
+
+def snap_width(width):
+    """Smallest standard width >= the requested one (bounds how many variants get cached)"""
+    for candidate in THUMB_WIDTHS:
+        if width <= candidate:
+            return candidate
+    return THUMB_WIDTHS[-1]
+
+
+def file_kind(filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if ext in IMAGE_EXTENSIONS:
+        return 'image'
+    if ext in VIDEO_EXTENSIONS:
+        return 'video'
+    return None
+
+
+class ThumbnailCache(CatalogListener):
+    """Derivatives on disk; new uploads are rendered ahead of time by a small pool"""
+
+    def __init__(self, upload_folder, cache_dir=THUMB_DIR, max_bytes=THUMB_CACHE_BYTES, workers=2):
+        self.upload_folder = upload_folder
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.webp = features.check('webp')
+        self.ffmpeg = shutil.which('ffmpeg')
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix='thumbnails')
+        self.disk = DiskIO(max_concurrency=workers)  # On-demand renders, off the event loop
+        self.lock = threading.Lock()
+        self.hashes = OrderedDict()  # (path, size, mtime_ns) -> content hash, most recent last
+        os.makedirs(cache_dir, exist_ok=True)
+        self.total_bytes = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.is_file())
+
+    # ---- keys ----
+
+    def content_hash(self, filepath):
+        """blake2b of the file, remembered per size and mtime so each version is read once"""
+        st = os.stat(filepath)
+        key = (filepath, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            if key in self.hashes:
+                self.hashes.move_to_end(key)
+                return self.hashes[key]
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        with self.lock:
+            self.hashes[key] = digest.hexdigest()
+            if len(self.hashes) > 10000:
+                self.hashes.popitem(last=False)
+        return digest.hexdigest()
+
+    def thumbnail_format(self, accepts_webp):
+        return 'webp' if accepts_webp and self.webp else 'jpeg'
+
+    # ---- rendering ----
+
+    def get(self, filename, width=DEFAULT_WIDTH, fmt='jpeg'):
+        """(path, etag, format) of the thumbnail, rendering it if needed; None if the file has none"""
+        kind = file_kind(filename)
+        if kind is None or (kind == 'video' and not self.ffmpeg):
+            return None
+        source = os.path.join(self.upload_folder, filename)
+        return self.disk.run('thumbnail', self._ensure, source, kind, snap_width(width), fmt)
+
+    def _ensure(self, source, kind, width, fmt):
+        if kind == 'video':
+            fmt = 'jpeg'  # ffmpeg posters are always JPEG
+        etag = f"{self.content_hash(source)}_{width}_{fmt}"
+        path = os.path.join(self.cache_dir, f"{etag}.{'jpg' if fmt == 'jpeg' else fmt}")
+        try:
+            os.utime(path)  # Hit: mark recently used
+            return path, etag, fmt
+        except FileNotFoundError:
+            pass
+
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            if kind == 'video':
+                self._render_poster(source, temp_path, width)
+            else:
+                self._render_image(source, temp_path, width, fmt)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._added(os.path.getsize(path))
+        return path, etag, fmt
+
+    def _render_image(self, source, target, width, fmt):
+        with Image.open(source) as image:
+            image.draft('RGB', (width, width))  # JPEG: decode at reduced scale, much faster
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, width * 4))
+            if fmt == 'jpeg':
+                image = image.convert('RGB')
+            elif image.mode not in ('RGB', 'RGBA'):
+                has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+            options = {'quality': 80}
+            if fmt == 'webp':
+                options['method'] = 4  # Slower encode, smaller files; thumbnails are rendered once
+            image.save(target, format=fmt.upper(), **options)
+
+    def _render_poster(self, source, target, width):
+        """First frame (1 s in, or the start of short clips) scaled by ffmpeg, as JPEG"""
+        for seek in ('1', '0'):
+            subprocess.run([self.ffmpeg, '-v', 'error', '-y', '-ss', seek, '-i', source, '-frames:v', '1',
+                            '-vf', f'scale={width}:-2', '-f', 'image2', '-c:v', 'mjpeg', target],
+                           check=True, timeout=30, stdin=subprocess.DEVNULL)
+            if os.path.exists(target) and os.path.getsize(target) > 0:
+                return
+        raise RuntimeError('no video frame decoded')
+
+    # ---- size bound ----
+
+    def _added(self, size):
+        with self.lock:
+            self.total_bytes += size
+            over = self.total_bytes > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used thumbnails until the cache is at 90% of its limit"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self.lock:
+            self.total_bytes = total
+
+    def stats(self):
+        return {'bytes': self.total_bytes, 'max_bytes': self.max_bytes, 'webp': self.webp,
+                'video_posters': bool(self.ffmpeg)}
+
+    # ---- catalog ----
+
+    def catalog_added(self, filename, entry):
+        """Warm the grid-size thumbnail of each new upload in the background"""
+        kind = file_kind(filename)
+        if kind == 'image' or (kind == 'video' and self.ffmpeg):
+            source = os.path.join(self.upload_folder, filename)
+            self.pool.submit(self._warm, source, kind, filename)
+
+    def _warm(self, source, kind, filename):
+        try:
+            self._ensure(source, kind, DEFAULT_WIDTH, 'webp' if self.webp else 'jpeg')
+        except Exception as e:
+            print(f"Error creating thumbnail for {filename}: {e}")
@@ -0,0 +1,66 @@
+"""
+Transfer Trace
+Per-chunk trace records for HTTP and WebSocket transfers kept in a fixed-size
+ring buffer, dumped as JSONL on demand and read back by analyze_trace.py
+"""
+
+import os
+import json
+import time
+import itertools
+from collections import deque
+
+TRACE_DIR = 'logs'
+
+# Record layout: (t, transfer id, event, chunk index, bytes, io seconds, wait seconds, info)
+#   t     wall time the chunk was in hand (received, or read from disk for downloads)
+#   io    disk write/read time for chunks; rename time for 'end'
+#   wait  time spent waiting on the network (HTTP body read, or the client consuming a yield)
+FIELDS = ('t', 'id', 'ev', 'i', 'n', 'io', 'wait', 'info')
+
+
+class TransferTrace:
+    def __init__(self, capacity=50000):
+        self.records = deque(maxlen=capacity)  # Oldest records fall off; append is thread-safe
+        self.ids = itertools.count(1)
+
+    def start(self, transport, direction, filename, size=None, chunk_size=None):
+        """Open a traced transfer and return its id"""
+        transfer_id = next(self.ids)
+        self.records.append((time.time(), transfer_id, 'start', None, size, 0, 0, {
+            'transport': transport, 'direction': direction, 'filename': filename, 'chunk_size': chunk_size
+        }))
+        return transfer_id
+
+    def chunk(self, transfer_id, index, nbytes, t, io=0, wait=0):
+        """Record one chunk (t from time.time(), io and wait in seconds); no-op for closed transfers"""
+        if transfer_id is None:
+            return
+        self.records.append((t, transfer_id, 'chunk', index, nbytes, io, wait, None))
+
+    def end(self, transfer_id, nbytes, io=0, status='ok'):
+        """Close a traced transfer"""
+        self.records.append((time.time(), transfer_id, 'end', None, nbytes, io, 0, {'status': status}))
+
+    def __len__(self):
+        return len(self.records)
+
+    def lines(self):
+        """JSONL lines for the records currently in the buffer, oldest first"""
+        for record in list(self.records):
+            item = {key: value for key, value in zip(FIELDS, record) if value is not None}
+            item['io'] = round(item['io'], 6)
+            item['wait'] = round(item['wait'], 6)
+            yield json.dumps(item, separators=(',', ':')) + '\n'
+
+    def dump(self, folder=TRACE_DIR):
+        """Write the buffer to a timestamped JSONL file and return its path"""
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"transfer_trace_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+        with open(path, 'w') as f:
+            f.writelines(self.lines())
+        return path
+
+
+# Global trace buffer shared by the HTTP routes and HighSpeedTransfer
+transfer_trace = TransferTrace(int(os.environ.get('TRACE_BUFFER_SIZE', 50000)))
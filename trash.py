@@ -0,0 +1,224 @@
+"""
+Trash
+Soft deletes: a deleted file is renamed into a trash folder on the same
+volume (instant, whatever its size) and indexed in SQLite; a background
+worker unlinks expired entries at a limited rate, and entries can be restored
+"""
+
+import os
+import json
+import time
+import secrets
+import sqlite3
+import threading
+
+TRASH_DIR = '.trash'  # Inside the shared folder, so moving a file there is a rename
+TRASH_SQLITE_DB = 'data/trash.db'
+RETENTION_DAYS = float(os.environ.get('TRASH_RETENTION_DAYS', 7))
+PURGE_RATE = int(os.environ.get('TRASH_PURGE_RATE_MB', 64)) * 1024 * 1024  # Bytes freed per second
+PURGE_STEP = 64 * 1024 * 1024  # Large files are truncated in steps of this size before the unlink
+PURGE_INTERVAL = 60  # Seconds between retention checks when nothing is due
+PURGE_RETRY = 60  # First retry delay for an entry that couldn't be unlinked; doubles per attempt
+PURGE_RETRY_MAX = 86400
+PAGE_SIZE = 100
+
+TRASH_COLUMNS = ('id', 'filename', 'size', 'owner', 'deleted_by', 'deleted_at', 'purge_at', 'metadata')
+
+
+class Trash:
+    """Trash folder plus an index of (id, filename, size, owner, metadata, purge_at)"""
+
+    def __init__(self, folder, path=TRASH_SQLITE_DB, retention_days=RETENTION_DAYS, rate=PURGE_RATE,
+                 interval=PURGE_INTERVAL, sleep=time.sleep):
+        self.folder = os.path.join(folder, TRASH_DIR)
+        self.path = path
+        self.retention = retention_days * 86400
+        self.rate = rate
+        self.interval = interval
+        self.sleep = sleep
+        self.wake = threading.Event()
+        self._local = threading.local()
+        self.purged = 0
+        self.purged_bytes = 0
+        os.makedirs(self.folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS trash (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE, '
+                         'filename TEXT, size INTEGER, owner TEXT, deleted_by TEXT, deleted_at REAL, '
+                         'purge_at REAL, metadata TEXT, purge_attempts INTEGER DEFAULT 0)')
+            if 'purge_attempts' not in [row[1] for row in conn.execute('PRAGMA table_info(trash)')]:
+                conn.execute('ALTER TABLE trash ADD COLUMN purge_attempts INTEGER DEFAULT 0')
+            conn.execute('CREATE INDEX IF NOT EXISTS trash_by_purge ON trash (purge_at)')
+
+    def _connect(self):
+        """One connection per thread (and per process, since forks must not share one)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _row(row):
+        return {
+            'id': row['id'],
+            'filename': row['filename'],
+            'size': row['size'],
+            'owner': row['owner'],
+            'deleted_by': row['deleted_by'],
+            'deleted_at': row['deleted_at'],
+            'purge_at': row['purge_at'],
+            'metadata': json.loads(row['metadata']) if row['metadata'] else None
+        }
+
+    def move_many(self, source_folder, files, deleted_by):
+        """Move [(filename, metadata)] into the trash with one index commit.
+
+        Returns {filename: entry}, with None for files that could not be
+        moved; files that don't exist are left out.
+        """
+        now = time.time()
+        rows = []
+        for filename, metadata in files:
+            try:
+                size = os.stat(os.path.join(source_folder, filename)).st_size
+            except FileNotFoundError:
+                continue
+            rows.append((secrets.token_hex(8), filename, size, (metadata or {}).get('owner'), deleted_by,
+                         now, now + self.retention, json.dumps(metadata) if metadata else None))
+
+        # Index first: a crash mid-batch leaves entries pointing at files still in place, never orphans
+        with self._connect() as conn:
+            conn.executemany(f"INSERT INTO trash ({', '.join(TRASH_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        moved = {}
+        failed = []
+        for row in rows:
+            trash_id, filename = row[:2]
+            try:
+                os.rename(os.path.join(source_folder, filename), os.path.join(self.folder, trash_id))
+                moved[filename] = self._row(dict(zip(TRASH_COLUMNS, row)))
+            except FileNotFoundError:
+                failed.append(trash_id)
+            except OSError as e:
+                print(f"Error moving {filename} to the trash: {e}")
+                failed.append(trash_id)
+                moved[filename] = None
+        if failed:
+            with self._connect() as conn:
+                conn.executemany('DELETE FROM trash WHERE id = ?', [(trash_id,) for trash_id in failed])
+        return moved
+
+    def get(self, trash_id):
+        row = self._connect().execute('SELECT * FROM trash WHERE id = ?', (trash_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def list(self, username=None, before=None, limit=PAGE_SIZE):
+        """(entries newest first, next cursor or None); username limits to files they owned or deleted"""
+        query = 'SELECT * FROM trash WHERE seq < ?'
+        params = [before or 2 ** 62]
+        if username is not None:
+            query += ' AND (owner = ? OR deleted_by = ?)'
+            params += [username, username]
+        rows = self._connect().execute(query + ' ORDER BY seq DESC LIMIT ?', params + [limit + 1]).fetchall()
+        return [self._row(row) for row in rows[:limit]], rows[limit - 1]['seq'] if len(rows) > limit else None
+
+    def restore(self, trash_id, target_folder, filename=None):
+        """Move an entry back as filename (default: its old name); returns the entry.
+
+        Raises FileExistsError if the name is taken and FileNotFoundError if
+        the entry is gone or due for purging (the purger may be truncating it).
+        """
+        entry = self.get(trash_id)
+        if entry is None or entry['purge_at'] <= time.time():
+            raise FileNotFoundError(trash_id)
+        filename = filename or entry['filename']
+        target = os.path.join(target_folder, filename)
+        if os.path.exists(target):
+            raise FileExistsError(filename)
+        with self._connect() as conn:
+            if conn.execute('DELETE FROM trash WHERE id = ? AND purge_at > ? AND purge_attempts = 0',
+                            (trash_id, time.time())).rowcount == 0:
+                raise FileNotFoundError(trash_id)  # Restored, expired or claimed by the purger meanwhile
+            os.makedirs(os.path.dirname(target), exist_ok=True)  # Its folder went away if it emptied
+            os.rename(os.path.join(self.folder, trash_id), target)
+        return dict(entry, filename=filename)
+
+    def expire(self, trash_ids):
+        """Make entries due for purging now; returns how many were found"""
+        with self._connect() as conn:
+            count = conn.execute(f"UPDATE trash SET purge_at = 0 WHERE id IN ({','.join('?' * len(trash_ids))})",
+                                 list(trash_ids)).rowcount
+        if count:
+            self.wake.set()
+        return count
+
+    def purge(self, now=None, limit=100):
+        """Unlink up to limit expired entries at the configured rate; returns how many were purged.
+
+        Each entry is claimed (its attempt counted, which also blocks restore)
+        before truncating starts; one that can't be unlinked is retried later
+        with a doubling delay.
+        """
+        now = now or time.time()
+        rows = self._connect().execute('SELECT id, size, purge_attempts FROM trash WHERE purge_at <= ? '
+                                       'ORDER BY purge_at LIMIT ?', (now, limit)).fetchall()
+        purged = 0
+        for row in rows:
+            with self._connect() as conn:
+                if conn.execute('UPDATE trash SET purge_attempts = purge_attempts + 1 WHERE id = ? AND purge_at <= ?',
+                                (row['id'], now)).rowcount == 0:
+                    continue  # Restored meanwhile
+            try:
+                self._unlink_slowly(os.path.join(self.folder, row['id']), row['size'])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                delay = min(PURGE_RETRY * 2 ** row['purge_attempts'], PURGE_RETRY_MAX)
+                print(f"Error purging {row['id']} from the trash (retrying in {delay}s): {e}")
+                with self._connect() as conn:
+                    conn.execute('UPDATE trash SET purge_at = ? WHERE id = ?', (time.time() + delay, row['id']))
+                continue
+            with self._connect() as conn:
+                conn.execute('DELETE FROM trash WHERE id = ?', (row['id'],))
+            purged += 1
+            self.purged += 1
+            self.purged_bytes += row['size']
+        return purged
+
+    def _unlink_slowly(self, path, size):
+        """Free a large file in truncate steps paced to the purge rate, then unlink it.
+
+        Unlinking a multi-GB file frees all its extents at once, which some
+        filesystems do synchronously; stepping keeps each operation short.
+        """
+        while size > PURGE_STEP:
+            size -= PURGE_STEP
+            os.truncate(path, size)
+            self.sleep(PURGE_STEP / self.rate)
+        os.remove(path)
+        if size:
+            self.sleep(size / self.rate)
+
+    def run(self):
+        """Purge expired entries; wait for the next interval (or an expire()) when none are due"""
+        while True:
+            try:
+                if self.purge():
+                    continue
+            except Exception as e:
+                print(f"Trash purge failed: {e}")
+            self.wake.wait(self.interval)
+            self.wake.clear()
+
+    def start(self):
+        threading.Thread(target=self.run, name='trash-purge', daemon=True).start()
+
+    def stats(self):
+        row = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM trash').fetchone()
+        return {'files': row[0], 'bytes': row[1], 'purged': self.purged, 'purged_bytes': self.purged_bytes,
+                'retention_days': self.retention / 86400, 'purge_rate': self.rate}
@@ -0,0 +1,155 @@
+"""
+Upload Stream
+Receives bulk and folder uploads without spooling: multipart parts and tar
+members are written to their destination as the bytes arrive, keeping each
+file's relative folder
+"""
+
+import os
+import secrets
+import tarfile
+from collections import deque
+
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+from werkzeug.utils import secure_filename
+
+from file_catalog import TEMP_PREFIX
+
+READ_SIZE = 1024 * 1024
+MAX_FIELD_BYTES = 64 * 1024  # Form fields (paths, permission) are kept in memory
+PATH_FIELDS = ('paths', 'path')  # Sent before each file part to give its relative path
+
+
+def clean_relative_path(path):
+    """A client-supplied relative path made safe (each folder name sanitized, no parents); None if nothing is left"""
+    parts = [secure_filename(part) for part in str(path).replace('\\', '/').split('/')]
+    return '/'.join(part for part in parts if part) or None
+
+
+class UploadReceiver:
+    """Writes uploaded files under folder, recording what was saved and what failed"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.saved = []  # [(relative name, size)]
+        self.errors = []  # [{'file': name as sent, 'error': message}]
+        self.fields = {}
+
+    def _open(self):
+        """A temp file at the top of the folder (where leftover temps are cleaned up)"""
+        temp_path = os.path.join(self.folder, f"{TEMP_PREFIX}{secrets.token_hex(8)}")
+        return temp_path, open(temp_path, 'wb')
+
+    def _commit(self, temp_path, path):
+        """Move a finished temp file to path, numbering it if the name is taken; returns the name used"""
+        name = clean_relative_path(path)
+        if name is None:
+            raise ValueError('Invalid file name')
+        base, extension = os.path.splitext(name)
+        counter = 1
+        while os.path.exists(os.path.join(self.folder, name)):
+            name = f"{base}_{counter}{extension}"
+            counter += 1
+        target = os.path.join(self.folder, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)
+        return name
+
+    def _discard(self, temp_path, f, sent_name, error):
+        f.close()
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        self.errors.append({'file': sent_name, 'error': str(error)})
+
+    def save(self, path, source):
+        """Copy one file-like source to path in READ_SIZE pieces"""
+        temp_path, f = self._open()
+        try:
+            while True:
+                chunk = source.read(READ_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+        except OSError as e:
+            self._finish_part(path, temp_path, f, e)
+        except BaseException:  # The source itself broke off (e.g. a truncated archive)
+            self._discard(temp_path, f, path, 'Upload was cut off')
+            raise
+        else:
+            self._finish_part(path, temp_path, f, None)
+
+    def receive_multipart(self, stream, boundary):
+        """Parse multipart/form-data from stream, writing each file part as it arrives.
+
+        A 'paths' field sent before a file part gives that file's relative
+        path; otherwise the part's own filename is used.
+        """
+        decoder = MultipartDecoder(boundary.encode())
+        paths = deque()
+        field = None  # (name, [bytes]) of the form field being read
+        upload = None  # [sent path, temp path, file, error] of the file being written
+
+        try:
+            while True:
+                chunk = stream.read(READ_SIZE)
+                decoder.receive_data(chunk or None)
+                event = decoder.next_event()
+                while not isinstance(event, (NeedData, Epilogue)):
+                    if isinstance(event, File):
+                        sent = paths.popleft() if paths else event.filename
+                        if sent:
+                            upload = [sent, *self._open(), None]
+                    elif isinstance(event, Field):
+                        field = (event.name, [])
+                    elif isinstance(event, Data):
+                        if upload is not None:
+                            if upload[3] is None:
+                                try:
+                                    upload[2].write(event.data)
+                                except OSError as e:
+                                    upload[3] = e
+                            if not event.more_data:
+                                self._finish_part(*upload)
+                                upload = None
+                        elif field is not None:
+                            field[1].append(event.data)
+                            if sum(map(len, field[1])) > MAX_FIELD_BYTES:
+                                raise ValueError(f"Form field {field[0]} is too large")
+                            if not event.more_data:
+                                value = b''.join(field[1]).decode('utf-8', 'replace')
+                                if field[0] in PATH_FIELDS:
+                                    paths.append(value)
+                                else:
+                                    self.fields[field[0]] = value
+                                field = None
+                    event = decoder.next_event()
+                if isinstance(event, Epilogue) or not chunk:
+                    break
+        finally:
+            if upload is not None:  # Body ended (or failed to parse) inside a file part
+                self._discard(upload[1], upload[2], upload[0], 'Upload was cut off')
+
+    def _finish_part(self, sent, temp_path, f, error):
+        """Commit a written part, or drop it if writing failed"""
+        if error is not None:
+            self._discard(temp_path, f, sent, error)
+            return
+        try:
+            size = f.tell()
+            f.close()
+            self.saved.append((self._commit(temp_path, sent), size))
+        except (OSError, ValueError) as e:
+            self._discard(temp_path, f, sent, e)
+
+    def receive_tar(self, stream):
+        """Unpack a tar stream (optionally gzipped) member by member; only regular files are kept"""
+        with tarfile.open(fileobj=stream, mode='r|*') as archive:
+            for member in archive:
+                if member.isdir():
+                    continue
+                if not member.isfile():
+                    self.errors.append({'file': member.name, 'error': 'Only regular files are accepted'})
+                    continue
+                self.save(member.name, archive.extractfile(member))